@@ -10,13 +10,17 @@ from sqlalchemy import engine_from_config, pool
 from sqlalchemy.engine import Engine
 
 from alembic import context
-from app.db.database import Base
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
 
+from app.db.database import Base  # noqa: E402
+from app.model import models  # noqa: E402,F401
+
 load_dotenv()
 config = context.config
-fileConfig(config.config_file_name)
+# Sem arquivo de configuração quando as migrações são disparadas pela própria aplicação
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
 target_metadata = Base.metadata
 
 
@@ -48,12 +52,20 @@ def run_migrations_online() -> None:
     Um engine é criado e usado para conectar ao banco de dados. As migrações
     são executadas dentro de uma transação ativa.
     """
+    connection = config.attributes.get('connection')
+    if connection is not None:
+        # Conexão entregue pela aplicação (ver `app.tools.bootstrap`)
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
+        with context.begin_transaction():
+            context.run_migrations()
+        return
+
     connectable: Engine = engine_from_config(
-        config.get_section(config.config_ini_section), prefix='sqlalchemy.', poolclass=pool.NullPool, url=get_url()
+        config.get_section(config.config_ini_section, {}), prefix='sqlalchemy.', poolclass=pool.NullPool, url=get_url()
     )
 
     with connectable.connect() as connection:
-        context.configure(connection=connection, target_metadata=target_metadata)
+        context.configure(connection=connection, target_metadata=target_metadata, transaction_per_migration=True)
 
         with context.begin_transaction():
             context.run_migrations()
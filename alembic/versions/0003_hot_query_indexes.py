@@ -0,0 +1,42 @@
+"""hot query indexes
+
+Índices para os caminhos de acesso mais frequentes: listagem de pedidos por data, fila da
+cozinha por status, itens e rastreamento de um pedido e cardápio por categoria. No PostgreSQL
+os índices são criados com CONCURRENTLY, sem bloquear escritas nas tabelas.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 04:20:11.402318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_orders_created_at_id', 'orders', ['created_at', 'id']),
+    ('ix_orders_status_created_at', 'orders', ['status', 'created_at']),
+    ('ix_order_products_order_id', 'order_products', ['order_id']),
+    ('ix_products_category_id', 'products', ['category_id']),
+    ('ix_tracking_order_id_created_at', 'tracking', ['order_id', 'created_at']),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
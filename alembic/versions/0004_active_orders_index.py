@@ -0,0 +1,49 @@
+"""active orders index
+
+Índice parcial para a fila da cozinha: cobre apenas os pedidos ativos (Pronto, Em preparação e
+Recebido), na ordem de prioridade de atendimento e de criação. Pedidos finalizados ficam fora do
+índice, que não cresce com o histórico. No PostgreSQL o índice é criado com CONCURRENTLY.
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 05:02:47.913208
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Deve ser idêntica a `ORDER_QUEUE_PRIORITY` e `ACTIVE_ORDER_FILTER` em app/model/models.py
+PRIORITY = (
+    "(CASE WHEN (status = 'Pronto') THEN 0 WHEN (status = 'Em preparação') THEN 1 "
+    "WHEN (status = 'Recebido') THEN 2 END)"
+)
+ACTIVE = "status IN ('Pronto', 'Em preparação', 'Recebido')"
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_orders_active_queue',
+            'orders',
+            [sa.text(PRIORITY), 'created_at', 'id'],
+            unique=False,
+            postgresql_where=sa.text(ACTIVE),
+            sqlite_where=sa.text(ACTIVE),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_orders_active_queue', table_name='orders', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,36 @@
+"""menu version
+
+Cria o metadado `menu_version`, contador incrementado a cada escrita em produtos ou categorias
+e usado nos ETags das rotas do cardápio.
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 05:41:09.276530
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+app_metadata = sa.table(
+    'app_metadata',
+    sa.column('key', sa.String),
+    sa.column('value', sa.String),
+    sa.column('updated_at', sa.DateTime),
+)
+
+
+def upgrade() -> None:
+    op.execute(app_metadata.insert().values(key='menu_version', value='0', updated_at=sa.func.now()))
+
+
+def downgrade() -> None:
+    op.execute(app_metadata.delete().where(app_metadata.c.key == 'menu_version'))
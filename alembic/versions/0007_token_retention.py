@@ -0,0 +1,46 @@
+"""token retention
+
+Adiciona `tokens.expires_at` e índices por expiração em `tokens` e `refresh_tokens`, usados pela
+limpeza em lotes dos tokens expirados. Os tokens existentes não guardam a expiração: recebem o
+instante da migração e são removidos depois do período de carência da limpeza, que cobre a
+validade de um token de acesso. No PostgreSQL os índices são criados com CONCURRENTLY.
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 06:48:22.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0007'
+down_revision: Union[str, None] = '0006'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEXES = [
+    ('ix_tokens_expires_at', 'tokens', ['expires_at']),
+    ('ix_refresh_tokens_expires_at', 'refresh_tokens', ['expires_at']),
+]
+
+
+def upgrade() -> None:
+    op.add_column('tokens', sa.Column('expires_at', sa.DateTime(), nullable=True))
+    tokens = sa.table('tokens', sa.column('expires_at', sa.DateTime))
+    op.execute(tokens.update().where(tokens.c.expires_at.is_(None)).values(expires_at=sa.func.current_timestamp()))
+    # CREATE INDEX CONCURRENTLY não pode rodar dentro de uma transação
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True, if_not_exists=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    with op.batch_alter_table('tokens') as batch_op:
+        batch_op.drop_column('expires_at')
@@ -1,31 +1,293 @@
+import math
+from contextlib import asynccontextmanager
 from os import environ as env
-from typing import Generator
+from typing import Any, AsyncGenerator, AsyncIterator, Callable, Dict, Generator, Optional, TypeVar, Union
 
 from dotenv import load_dotenv
+from fastapi import Depends
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Session, sessionmaker
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import Response
+
+from .pool import pool_options, pool_status, resolve_pool_profile
+from .replica import SAFE_METHODS, PrimaryStickiness, ReplicaLagMonitor, request_identity
 
 load_dotenv()
 
+T = TypeVar('T')
+
+# Sessão entregue por `get_session`: síncrona ou assíncrona, conforme `DATABASE_MODE`
+DBSession = Union[Session, AsyncSession]
+
 SQLALCHEMY_DATABASE_URL: str = env.get('DATABASE_URL', '')
 
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Modo de acesso ao banco usado pelos roteadores: 'sync' (threadpool) ou 'async' (AsyncSession)
+DATABASE_MODE: str = env.get('DATABASE_MODE', 'sync').lower()
+
+# Drivers assíncronos equivalentes aos drivers síncronos suportados
+ASYNC_DRIVERS = {
+    'postgres': 'postgresql+asyncpg',
+    'postgresql': 'postgresql+asyncpg',
+    'postgresql+psycopg2': 'postgresql+asyncpg',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+def to_async_url(url: str) -> str:
+    """Converte a URL de conexão síncrona para o driver assíncrono equivalente.
+
+    Args:
+        url (str): URL de conexão configurada em `DATABASE_URL`.
+
+    Returns:
+        str: A URL usando o driver assíncrono (`asyncpg` para PostgreSQL, `aiosqlite` para SQLite).
+    """
+    scheme, separator, rest = url.partition('://')
+    if not separator:
+        return url
+    return f'{ASYNC_DRIVERS.get(scheme, scheme)}://{rest}'
+
+# Perfil de pool escolhido pela implantação (DB_POOL_PROFILE ou detecção de Lambda/Kubernetes)
+POOL_PROFILE: str = resolve_pool_profile()
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **pool_options(POOL_PROFILE, SQLALCHEMY_DATABASE_URL))
+# Sem expirar atributos no commit: as escritas já conhecem os valores gravados (o id volta via RETURNING)
+# e a serialização da resposta não precisa recarregar o objeto com um novo SELECT
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=engine)
+
+# Réplica de leitura opcional para as rotas GET; sem ela as leituras usam o primário
+SQLALCHEMY_REPLICA_URL: str = env.get('DATABASE_REPLICA_URL', '')
+REPLICA_MAX_LAG_SECONDS: float = float(env.get('REPLICA_MAX_LAG_SECONDS', 5))
+REPLICA_LAG_CHECK_INTERVAL: float = float(env.get('REPLICA_LAG_CHECK_INTERVAL', 2))
+PRIMARY_STICKY_SECONDS: float = float(env.get('PRIMARY_STICKY_SECONDS', 5))
+
+replica_engine = None
+ReplicaSessionLocal: Optional[sessionmaker] = None
+replica_monitor: Optional[ReplicaLagMonitor] = None
+primary_stickiness = PrimaryStickiness(PRIMARY_STICKY_SECONDS)
+
+if SQLALCHEMY_REPLICA_URL:
+    replica_engine = create_engine(SQLALCHEMY_REPLICA_URL, **pool_options(POOL_PROFILE, SQLALCHEMY_REPLICA_URL))
+    ReplicaSessionLocal = sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False, bind=replica_engine)
+    replica_monitor = ReplicaLagMonitor(replica_engine, REPLICA_MAX_LAG_SECONDS, REPLICA_LAG_CHECK_INTERVAL)
+
+async_engine = None
+AsyncSessionLocal: Optional[async_sessionmaker] = None
+async_replica_engine = None
+AsyncReplicaSessionLocal: Optional[async_sessionmaker] = None
+
+if DATABASE_MODE == 'async':
+    async_engine = create_async_engine(
+        make_url(to_async_url(SQLALCHEMY_DATABASE_URL)),
+        **pool_options(POOL_PROFILE, SQLALCHEMY_DATABASE_URL, is_async=True),
+    )
+    # Como no modo síncrono, e também porque a serialização não pode disparar lazy loads fora do greenlet
+    AsyncSessionLocal = async_sessionmaker(bind=async_engine, autoflush=False, expire_on_commit=False)
+    if SQLALCHEMY_REPLICA_URL:
+        async_replica_engine = create_async_engine(
+            make_url(to_async_url(SQLALCHEMY_REPLICA_URL)),
+            **pool_options(POOL_PROFILE, SQLALCHEMY_REPLICA_URL, is_async=True),
+        )
+        AsyncReplicaSessionLocal = async_sessionmaker(
+            bind=async_replica_engine, autoflush=False, expire_on_commit=False
+        )
 
 Base = declarative_base()
 
-def get_db() -> Generator[Session, None, None]:
+def stick_to_primary(request: Optional[Request]) -> None:
+    """Mantém o cliente lendo do primário após uma requisição de escrita.
+
+    Args:
+        request (Optional[Request]): A requisição atual. Métodos seguros (GET, HEAD, OPTIONS) são ignorados.
+    """
+    if request is not None and request.method not in SAFE_METHODS:
+        primary_stickiness.mark(request_identity(request))
+
+def set_primary_cookie(request: Optional[Request], response: Optional[Response]) -> None:
+    """Envia ao cliente de uma requisição de escrita o cookie que o mantém lendo do primário em qualquer pod.
+
+    Chamada antes de a rota executar: cabeçalhos definidos depois do `yield` da dependência não chegam à resposta.
+
+    Args:
+        request (Optional[Request]): A requisição atual. Métodos seguros (GET, HEAD, OPTIONS) são ignorados.
+        response (Optional[Response]): A resposta em construção.
+    """
+    if request is not None and request.method not in SAFE_METHODS:
+        primary_stickiness.set_cookie(response)
+
+def use_replica(request: Optional[Request]) -> bool:
+    """Decide se as leituras da requisição podem ir para a réplica.
+
+    Args:
+        request (Optional[Request]): A requisição atual.
+
+    Returns:
+        bool: True se há réplica configurada, dentro do atraso máximo, e o cliente não escreveu recentemente.
+    """
+    if replica_monitor is None:
+        return False
+    if primary_stickiness.is_sticky(request_identity(request)) or primary_stickiness.has_cookie(request):
+        return False
+    return replica_monitor.is_healthy()
+
+def get_db(request: Request = None, response: Response = None) -> Generator[Session, None, None]:
     """Cria uma sessão de banco de dados e garante que ela seja fechada ao final.
 
     Esta função é usada como uma dependência em frameworks como FastAPI para garantir
     que cada requisição tenha sua própria sessão de banco de dados.
 
+    Args:
+        request (Request, optional): A requisição atual; requisições de escrita fixam o cliente no primário.
+        response (Response, optional): A resposta em construção, que recebe o cookie de leitura no primário.
+
+    Yields:
+        Generator[Session, None, None]: Uma sessão de banco de dados.
+    """
+    set_primary_cookie(request, response)
+    db = SessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+        stick_to_primary(request)
+
+def get_read_db(request: Request = None, primary: Session = Depends(get_db)) -> Generator[Session, None, None]:
+    """Entrega uma sessão somente leitura, na réplica quando disponível.
+
+    Usa o primário quando não há réplica configurada, quando o atraso de replicação excede
+    `REPLICA_MAX_LAG_SECONDS` ou quando o cliente escreveu nos últimos `PRIMARY_STICKY_SECONDS`
+    (neste pod, ou em qualquer pod se o cliente devolver o cookie `primary_until`). No primário,
+    reaproveita a sessão da requisição, a mesma da autenticação: duas sessões abertas na mesma
+    requisição esgotariam um pool de uma conexão, como o do perfil `lambda`.
+
+    Args:
+        request (Request, optional): A requisição atual.
+        primary (Session, optional): A sessão da requisição no primário. Defaults to Depends(get_db).
+
     Yields:
         Generator[Session, None, None]: Uma sessão de banco de dados.
     """
+    if not use_replica(request):
+        yield primary
+        return
+    db = ReplicaSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def get_async_db(request: Request = None, response: Response = None) -> AsyncGenerator[AsyncSession, None]:
+    """Cria uma sessão assíncrona de banco de dados e garante que ela seja fechada ao final.
+
+    Args:
+        request (Request, optional): A requisição atual; requisições de escrita fixam o cliente no primário.
+        response (Response, optional): A resposta em construção, que recebe o cookie de leitura no primário.
+
+    Yields:
+        AsyncGenerator[AsyncSession, None]: Uma sessão assíncrona de banco de dados.
+    """
+    set_primary_cookie(request, response)
+    try:
+        async with AsyncSessionLocal() as db:
+            yield db
+    finally:
+        stick_to_primary(request)
+
+async def get_async_read_db(
+    request: Request = None, primary: AsyncSession = Depends(get_async_db)
+) -> AsyncGenerator[AsyncSession, None]:
+    """Versão assíncrona de `get_read_db`.
+
+    Args:
+        request (Request, optional): A requisição atual.
+        primary (AsyncSession, optional): A sessão da requisição no primário. Defaults to Depends(get_async_db).
+
+    Yields:
+        AsyncGenerator[AsyncSession, None]: Uma sessão assíncrona de banco de dados.
+    """
+    if replica_monitor is not None and replica_monitor.is_stale():
+        # A medição do atraso usa o engine síncrono da réplica e não pode bloquear o event loop
+        await run_in_threadpool(replica_monitor.refresh)
+    if not use_replica(request):
+        yield primary
+        return
+    async with AsyncReplicaSessionLocal() as db:
+        yield db
+
+# Dependências usadas pelos roteadores, escolhidas pelo modo configurado na implantação
+get_session: Callable[..., Any] = get_async_db if DATABASE_MODE == 'async' else get_db
+get_read_session: Callable[..., Any] = get_async_read_db if DATABASE_MODE == 'async' else get_read_db
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[DBSession]:
+    """Abre uma sessão no primário fora de uma requisição, como em tarefas em segundo plano.
+
+    Yields:
+        AsyncIterator[DBSession]: Uma sessão síncrona ou assíncrona, conforme `DATABASE_MODE`.
+    """
+    if DATABASE_MODE == 'async':
+        async with AsyncSessionLocal() as db:
+            yield db
+        return
     db = SessionLocal()
     try:
         yield db
     finally:
         db.close()
+
+async def run_db(db: DBSession, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Executa uma função síncrona do repositório sem bloquear o event loop.
+
+    Com uma `AsyncSession` a função roda via `run_sync`, usando o driver assíncrono; com uma `Session`
+    síncrona ela é despachada para o threadpool, ocupando uma thread apenas durante o acesso ao banco.
+
+    Args:
+        db (DBSession): Sessão obtida de `get_session`.
+        fn (Callable[..., T]): Função que recebe uma `Session` síncrona como primeiro argumento.
+        *args (Any): Argumentos posicionais repassados para `fn`.
+        **kwargs (Any): Argumentos nomeados repassados para `fn`.
+
+    Returns:
+        T: O retorno de `fn`.
+    """
+    if isinstance(db, AsyncSession):
+        return await db.run_sync(fn, *args, **kwargs)
+    return await run_in_threadpool(fn, db, *args, **kwargs)
+
+def get_engines() -> Dict[str, Engine]:
+    """Retorna os engines configurados da aplicação, pelo nome do pool.
+
+    Returns:
+        Dict[str, Engine]: `primary` e, se configurados, `replica`, `async` e `async_replica`; dos
+        engines assíncronos, o `sync_engine`, onde ficam o pool e os eventos.
+    """
+    engines = {
+        'primary': engine,
+        'replica': replica_engine,
+        'async': async_engine.sync_engine if async_engine else None,
+        'async_replica': async_replica_engine.sync_engine if async_replica_engine else None,
+    }
+    return {name: bind for name, bind in engines.items() if bind is not None}
+
+def get_pool_status() -> Dict[str, Any]:
+    """Retorna o estado dos pools de conexão da aplicação.
+
+    Returns:
+        Dict[str, Any]: O perfil ativo e, para cada engine, conexões em uso, ociosas, em overflow
+        e o tempo de espera por conexão, além do atraso da réplica de leitura.
+    """
+    status = {
+        'profile': POOL_PROFILE,
+        'pools': {name: pool_status(bind) for name, bind in get_engines().items()},
+    }
+    if replica_monitor is not None:
+        lag = replica_monitor.lag
+        status['replica'] = {
+            'lag_seconds': lag if math.isfinite(lag) else None,
+            'healthy': lag <= replica_monitor.max_lag,
+        }
+    return status
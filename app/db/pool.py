@@ -0,0 +1,225 @@
+import threading
+import time
+from os import environ as env
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Tamanho do threadpool do anyio que executa dependências e rotas síncronas
+THREADPOOL_SIZE: int = int(env.get('THREADPOOL_SIZE', 40))
+
+# Bancos sem servidor: o dialeto escolhe o próprio pool (ex.: `SingletonThreadPool` para SQLite em memória)
+EMBEDDED_BACKENDS = frozenset({'sqlite'})
+
+# Contadores de `pool_status` e os métodos que os fornecem, existentes só nos pools com fila
+POOL_COUNTERS = {'size': 'size', 'checked_in': 'checkedin', 'checked_out': 'checkedout', 'overflow': 'overflow'}
+
+# Perfis de pool por tipo de implantação. Os valores podem ser sobrescritos por
+# DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT e DB_POOL_RECYCLE.
+POOL_PROFILES: Dict[str, Dict[str, Any]] = {
+    # Padrões do SQLAlchemy (pool_size 5, max_overflow 10, sem pre-ping e sem recycle)
+    'default': {},
+    # Uma conexão mantida entre invocações do mesmo container; o pre-ping descarta
+    # conexões encerradas pelo banco enquanto o container estava congelado
+    'lambda': {
+        'pool_size': 1,
+        'max_overflow': 0,
+        'pool_timeout': 10,
+        'pool_recycle': 300,
+        'pool_pre_ping': True,
+    },
+    # Pods de longa duração: pool + overflow limitados ao threadpool, reciclando conexões
+    # antes dos timeouts de balanceadores e do próprio PostgreSQL
+    'k8s': {
+        'pool_size': min(10, THREADPOOL_SIZE),
+        'max_overflow': max(THREADPOOL_SIZE - 10, 0),
+        'pool_timeout': 10,
+        'pool_recycle': 1800,
+        'pool_pre_ping': True,
+        'pool_use_lifo': True,
+    },
+}
+
+POOL_OVERRIDES = {
+    'DB_POOL_SIZE': ('pool_size', int),
+    'DB_MAX_OVERFLOW': ('max_overflow', int),
+    'DB_POOL_TIMEOUT': ('pool_timeout', float),
+    'DB_POOL_RECYCLE': ('pool_recycle', int),
+}
+
+class PoolStats:
+    """
+    Estatísticas de espera por conexões de um pool.
+
+    Attributes:
+        checkouts (int): Número de conexões entregues pelo pool.
+        timeouts (int): Número de checkouts que esgotaram `pool_timeout`.
+        wait_total (float): Tempo total (em segundos) aguardando uma conexão.
+        wait_max (float): Maior espera (em segundos) observada.
+        last_wait (float): Espera (em segundos) do último checkout.
+        observer (Optional[Callable[[float], None]]): Recebe cada espera, para o histograma do `/metrics`.
+    """
+
+    def __init__(self):
+        """
+        Inicializa as estatísticas zeradas.
+        """
+        self._lock = threading.Lock()
+        self.observer: Optional[Callable[[float], None]] = None
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.last_wait = 0.0
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        """
+        Registra a espera de um checkout.
+
+        Args:
+            seconds: Tempo (em segundos) aguardando a conexão.
+            timed_out: Se o checkout falhou por esgotar o tempo limite.
+        """
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_total += seconds
+            self.wait_max = max(self.wait_max, seconds)
+            self.last_wait = seconds
+        if self.observer is not None:
+            self.observer(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Retorna uma cópia consistente das estatísticas.
+
+        Returns:
+            Dict[str, Any]: Contadores e tempos de espera (em milissegundos).
+        """
+        with self._lock:
+            attempts = self.checkouts + self.timeouts
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'wait_avg_ms': (self.wait_total / attempts * 1000) if attempts else 0.0,
+                'wait_max_ms': self.wait_max * 1000,
+                'wait_last_ms': self.last_wait * 1000,
+            }
+
+class TimedPoolMixin:
+    """
+    Mede o tempo que cada checkout passa aguardando uma conexão livre no pool.
+    """
+
+    stats: PoolStats
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        """
+        Inicializa o pool com estatísticas próprias.
+        """
+        super().__init__(*args, **kwargs)
+        self.stats = PoolStats()
+
+    def _do_get(self):
+        """
+        Obtém uma conexão do pool registrando o tempo de espera.
+        """
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except TimeoutError:
+            self.stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        """
+        Recria o pool (ex.: após `engine.dispose()`) preservando as estatísticas acumuladas.
+        """
+        pool = super().recreate()
+        pool.stats = self.stats
+        return pool
+
+class TimedQueuePool(TimedPoolMixin, QueuePool):
+    """
+    `QueuePool` com medição do tempo de espera por conexão.
+    """
+
+class TimedAsyncQueuePool(TimedPoolMixin, AsyncAdaptedQueuePool):
+    """
+    `AsyncAdaptedQueuePool` com medição do tempo de espera por conexão.
+    """
+
+def resolve_pool_profile() -> str:
+    """Determina o perfil de pool da implantação atual.
+
+    Usa `DB_POOL_PROFILE` quando definido; caso contrário detecta AWS Lambda
+    (`AWS_LAMBDA_FUNCTION_NAME`) ou Kubernetes (`KUBERNETES_SERVICE_HOST`).
+
+    Returns:
+        str: O nome do perfil (`default`, `lambda` ou `k8s`).
+
+    Raises:
+        ValueError: Se `DB_POOL_PROFILE` não corresponder a um perfil conhecido.
+    """
+    profile = env.get('DB_POOL_PROFILE', '').lower()
+    if not profile:
+        if env.get('AWS_LAMBDA_FUNCTION_NAME'):
+            profile = 'lambda'
+        elif env.get('KUBERNETES_SERVICE_HOST'):
+            profile = 'k8s'
+        else:
+            profile = 'default'
+    if profile not in POOL_PROFILES:
+        raise ValueError(f'Perfil de pool desconhecido: {profile}. Use um de {sorted(POOL_PROFILES)}')
+    return profile
+
+def pool_options(profile: str, url: str, is_async: bool = False) -> Dict[str, Any]:
+    """Monta os argumentos de pool de `create_engine`/`create_async_engine` para um perfil.
+
+    Os perfis e o pool com medição de espera valem só para bancos com servidor; para SQLite o
+    dialeto mantém o pool padrão, que não aceita as opções de tamanho (ex.: em memória).
+
+    Args:
+        profile (str): Nome do perfil em `POOL_PROFILES`.
+        url (str): URL de conexão do engine.
+        is_async (bool): Se o engine usa um driver assíncrono.
+
+    Returns:
+        Dict[str, Any]: Argumentos nomeados para a criação do engine.
+    """
+    if make_url(url).get_backend_name() in EMBEDDED_BACKENDS:
+        return {}
+    options = dict(POOL_PROFILES[profile])
+    for variable, (option, cast) in POOL_OVERRIDES.items():
+        if env.get(variable):
+            options[option] = cast(env[variable])
+    options['poolclass'] = TimedAsyncQueuePool if is_async else TimedQueuePool
+    return options
+
+def pool_status(bind: Optional[Engine]) -> Optional[Dict[str, Any]]:
+    """Retorna o estado atual do pool de um engine.
+
+    Args:
+        bind (Optional[Engine]): Engine (síncrono ou o `sync_engine` de um engine assíncrono).
+
+    Returns:
+        Optional[Dict[str, Any]]: Conexões em uso, ociosas e em overflow, além das estatísticas
+        de espera, ou None se o engine não existir. Pools sem fila (ex.: SQLite) trazem só o que
+        fornecem.
+    """
+    if bind is None:
+        return None
+    pool = bind.pool
+    status = {
+        key: getattr(pool, method)() for key, method in POOL_COUNTERS.items() if callable(getattr(pool, method, None))
+    }
+    stats = getattr(pool, 'stats', None)
+    if stats is not None:
+        status.update(stats.snapshot())
+    return status
@@ -0,0 +1,226 @@
+import base64
+import binascii
+import json
+import math
+import threading
+import time
+from typing import Dict, Optional
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from starlette.requests import Request
+from starlette.responses import Response
+
+from ..tools.logging import logger
+
+# Atraso de replicação no PostgreSQL. Uma réplica ociosa e em dia tem o mesmo LSN recebido e
+# aplicado, mesmo que a última transação aplicada seja antiga.
+POSTGRES_LAG_QUERY = text(
+    'SELECT CASE '
+    'WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 '
+    'ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END'
+)
+
+# Métodos que não alteram dados e, portanto, não fixam o cliente no primário
+SAFE_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS'})
+
+# Cookie com o fim da janela de leitura no primário (segundos desde a época), lido por qualquer pod
+PRIMARY_STICKY_COOKIE = 'primary_until'
+CLOCK_SKEW_SECONDS = 1.0
+
+def request_identity(request: Optional[Request]) -> Optional[str]:
+    """Identifica o cliente de uma requisição para a janela de leitura no primário.
+
+    Usa o `sub` do token Bearer, que é o mesmo entre os tokens de um cliente, e o IP como alternativa.
+    O token não é validado aqui: a identidade só escolhe o banco de leitura, nunca concede acesso.
+
+    Args:
+        request (Optional[Request]): A requisição atual.
+
+    Returns:
+        Optional[str]: A identidade do cliente, ou None se não for possível determiná-la.
+    """
+    if request is None:
+        return None
+    scheme, _, token = request.headers.get('authorization', '').partition(' ')
+    if scheme.lower() == 'bearer' and token.count('.') == 2:
+        payload = token.split('.')[1]
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(payload + '=' * (-len(payload) % 4)))
+            if isinstance(claims, dict) and claims.get('sub') is not None:
+                return f"sub:{claims['sub']}"
+        except (binascii.Error, ValueError):
+            pass
+    if request.client:
+        return f'ip:{request.client.host}'
+    return None
+
+class PrimaryStickiness:
+    """
+    Mantém clientes que acabaram de escrever lendo do primário por uma janela curta.
+
+    Garante leitura das próprias escritas (ex.: `create_order` seguido de `read_order`)
+    enquanto a réplica ainda não aplicou a transação.
+
+    A marca em memória só vale no processo que recebeu a escrita. Com vários pods, o fim da janela
+    também vai ao cliente no cookie `primary_until`, e qualquer pod o respeita; clientes que não
+    guardam cookies só têm a leitura das próprias escritas quando voltam ao mesmo pod.
+
+    Attributes:
+        window: Duração (em segundos) da janela de leitura no primário.
+        max_entries: Número de clientes acima do qual entradas expiradas são descartadas.
+    """
+
+    def __init__(self, window: float, max_entries: int = 10000):
+        """
+        Inicializa a janela de leitura no primário.
+
+        Args:
+            window: Duração (em segundos) da janela de leitura no primário.
+            max_entries: Número de clientes acima do qual entradas expiradas são descartadas.
+        """
+        self.window = window
+        self.max_entries = max_entries
+        self._until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, key: Optional[str]) -> None:
+        """
+        Fixa o cliente no primário pela duração da janela.
+
+        Args:
+            key: Identidade do cliente.
+        """
+        if key is None or self.window <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_entries:
+                self._until = {k: until for k, until in self._until.items() if until > now}
+            self._until[key] = now + self.window
+
+    def is_sticky(self, key: Optional[str]) -> bool:
+        """
+        Verifica se o cliente ainda deve ler do primário.
+
+        Args:
+            key: Identidade do cliente.
+
+        Returns:
+            bool: True se a janela do cliente ainda não expirou.
+        """
+        if key is None:
+            return False
+        return self._until.get(key, 0.0) > time.monotonic()
+
+    def set_cookie(self, response: Optional[Response]) -> None:
+        """
+        Envia ao cliente o fim da janela de leitura no primário.
+
+        Args:
+            response: A resposta da requisição de escrita.
+        """
+        if response is None or self.window <= 0:
+            return
+        response.set_cookie(
+            PRIMARY_STICKY_COOKIE,
+            f'{time.time() + self.window:.3f}',
+            max_age=math.ceil(self.window),
+            httponly=True,
+            samesite='lax',
+        )
+
+    def has_cookie(self, request: Optional[Request]) -> bool:
+        """
+        Verifica se o cookie do cliente ainda o fixa no primário.
+
+        Args:
+            request: A requisição atual.
+
+        Returns:
+            bool: True se o cookie indica uma janela ainda não expirada.
+        """
+        if request is None:
+            return False
+        try:
+            until = float(request.cookies.get(PRIMARY_STICKY_COOKIE, 0))
+        except ValueError:
+            return False
+        # Um valor além da janela (com tolerância para a diferença de relógio entre os pods) é descartado:
+        # um cookie alterado não fixa o cliente no primário para sempre
+        now = time.time()
+        return now < until <= now + self.window + CLOCK_SKEW_SECONDS
+
+class ReplicaLagMonitor:
+    """
+    Mede periodicamente o atraso de replicação de uma réplica de leitura.
+
+    A medição é reaproveitada por `interval` segundos, de modo que as requisições não pagam
+    uma consulta extra. Se a réplica não responder, ela é considerada indisponível.
+
+    Attributes:
+        engine: Engine conectado à réplica.
+        max_lag: Atraso máximo (em segundos) aceito para leituras.
+        interval: Intervalo (em segundos) entre medições.
+        lag: Último atraso medido (infinito se a réplica estiver indisponível).
+    """
+
+    def __init__(self, engine: Engine, max_lag: float, interval: float):
+        """
+        Inicializa o monitor sem nenhuma medição.
+
+        Args:
+            engine: Engine conectado à réplica.
+            max_lag: Atraso máximo (em segundos) aceito para leituras.
+            interval: Intervalo (em segundos) entre medições.
+        """
+        self.engine = engine
+        self.max_lag = max_lag
+        self.interval = interval
+        self.lag = math.inf
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def is_stale(self) -> bool:
+        """
+        Verifica se a última medição já expirou.
+
+        Returns:
+            bool: True se uma nova medição é necessária.
+        """
+        return self._checked_at is None or time.monotonic() - self._checked_at >= self.interval
+
+    def refresh(self) -> float:
+        """
+        Mede o atraso da réplica, se nenhuma outra thread estiver medindo.
+
+        Returns:
+            float: O atraso (em segundos) mais recente.
+        """
+        if not self._lock.acquire(blocking=False):
+            return self.lag
+        try:
+            with self.engine.connect() as connection:
+                if self.engine.dialect.name == 'postgresql':
+                    self.lag = float(connection.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+                else:
+                    connection.execute(text('SELECT 1'))
+                    self.lag = 0.0
+        except Exception as e:
+            logger.warning('Réplica de leitura indisponível, usando o primário: %s', e)
+            self.lag = math.inf
+        finally:
+            self._checked_at = time.monotonic()
+            self._lock.release()
+        return self.lag
+
+    def is_healthy(self) -> bool:
+        """
+        Verifica se a réplica pode atender leituras, medindo o atraso se necessário.
+
+        Returns:
+            bool: True se o atraso está dentro do limite.
+        """
+        if self.is_stale():
+            self.refresh()
+        return self.lag <= self.max_lag
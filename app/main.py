@@ -6,34 +6,48 @@ from fastapi.openapi.docs import get_redoc_html
 from fastapi.responses import JSONResponse
 from starlette.status import HTTP_500_INTERNAL_SERVER_ERROR
 
-from .db.database import Base, SessionLocal, engine
-from .middleware import ExceptionLoggingMiddleware
+from .middleware import ExceptionLoggingMiddleware, MetricsMiddleware
 from .model import schemas
 from .routers import auth, category, customer, order, product
-from .services.repository import create_admin_user
+from .services.cache import start_menu_invalidation, stop_menu_invalidation
+from .services.metrics import instrument_engines, start_metrics_server, stop_metrics_server
+from .services.passwords import configure_password_hashing
+from .services.retention import start_token_cleanup, stop_token_cleanup
 from .services.security import get_current_user
-from .tools.initialize_db import initialize_db
+from .services.token_ledger import token_ledger
+from .tools.bootstrap import bootstrap
 from .tools.logging import logger
 
-# Criando todas as tabelas no banco de dados
-Base.metadata.create_all(bind=engine)
+# Se o banco já foi preparado por este processo
+_bootstrapped = False
 
-def init_admin_user() -> None:
-    """Inicializa o usuário admin e configura o banco de dados.
+def bootstrap_database() -> None:
+    """Aplica migrações pendentes e carrega os dados iniciais, se necessário.
 
-    Cria um usuário administrador e inicializa o banco de dados com dados padrão.
+    O esquema é gerenciado pelo Alembic. Quando o banco já está na revisão atual e com os
+    dados iniciais carregados, a inicialização faz apenas uma consulta, e só na primeira vez
+    em que o processo inicia: na AWS Lambda o Mangum executa o lifespan a cada invocação.
+    Uma falha não é memorizada, e a próxima inicialização tenta de novo.
 
     Returns:
         None
     """
-    db = SessionLocal()
-    try:
-        create_admin_user(db)
-        initialize_db(db)
-    finally:
-        db.close()
-
-app = FastAPI(on_startup=[init_admin_user])
+    global _bootstrapped
+    if _bootstrapped:
+        return
+    bootstrap()
+    _bootstrapped = True
+
+app = FastAPI(
+    on_startup=[
+        configure_password_hashing,
+        bootstrap_database,
+        start_menu_invalidation,
+        start_token_cleanup,
+        start_metrics_server,
+    ],
+    on_shutdown=[stop_menu_invalidation, stop_token_cleanup, token_ledger.close, stop_metrics_server],
+)
 
 logger.info('Application startup')
 
@@ -53,6 +67,9 @@ app.add_middleware(
 
 # Incluindo os roteadores
 app.add_middleware(ExceptionLoggingMiddleware)
+# Por último, para envolver toda a pilha e medir também as respostas de erro
+app.add_middleware(MetricsMiddleware)
+instrument_engines()
 app.include_router(auth.router)
 app.include_router(customer.router, prefix='/customers', tags=['customers'])
 app.include_router(product.router, prefix='/products', tags=['products'])
@@ -61,18 +78,19 @@ app.include_router(category.router, prefix='/category', tags=['category'])
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
-    logger.error(f"HTTP error: {exc.detail}")
+    logger.error("HTTP error: %s", exc.detail)
     return JSONResponse(
         status_code=exc.status_code,
         content={
             "status code": exc.status_code,
             "msg": exc.detail,
         },
+        headers=exc.headers,
     )
 
 @app.exception_handler(Exception)
 async def global_exception_handler(request, exc):
-    logger.error(f"Unexpected server error: {str(exc)}", exc_info=True)
+    logger.error("Unexpected server error: %s", str(exc), exc_info=True)
     return JSONResponse(
         status_code=HTTP_500_INTERNAL_SERVER_ERROR,
         content={
@@ -101,7 +119,7 @@ def read_users_me(current_user: schemas.Customer = Depends(get_current_user)) ->
     Returns:
         schemas.Customer: As informações do usuário atual.
     """
-    logger.debug(f'User endpoint accessed by {current_user.id}')
+    logger.debug('User endpoint accessed by %s', current_user.id)
     return current_user
 
 # Adiciona a rota para a documentação do ReDoc
@@ -1,3 +1,4 @@
+from .metrics import MetricsMiddleware
 from .middleware import ExceptionLoggingMiddleware, RateLimitMiddleware
 
-__all__ = ['RateLimitMiddleware', 'ExceptionLoggingMiddleware']
+__all__ = ['RateLimitMiddleware', 'ExceptionLoggingMiddleware', 'MetricsMiddleware']
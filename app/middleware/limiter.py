@@ -0,0 +1,328 @@
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from os import environ as env
+from typing import Dict, NamedTuple, Optional, Set
+
+from aioredis import Redis
+
+from ..tools.circuit_breaker import CircuitBreaker
+from ..tools.logging import logger
+
+# Processos da aplicação que aplicam o mesmo limite (réplicas × workers), para dividir a margem do
+# limitador em dois níveis entre eles
+RATE_LIMIT_REPLICAS = int(env.get('RATE_LIMIT_REPLICAS', '1'))
+
+# Os scripts rodam atomicamente no Redis: verificar e registrar a requisição custa uma única ida ao
+# servidor e não há corrida entre réplicas. O relógio é o `TIME` do próprio Redis, em milissegundos,
+# o mesmo para todas as réplicas da aplicação. Todos retornam {permitida, restantes, espera em ms}.
+
+# Registro deslizante: guarda o instante de cada requisição da janela em um sorted set. Exato, com
+# memória proporcional ao limite.
+SLIDING_LOG = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, time[1] .. time[2] .. ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+# Janela deslizante aproximada: contadores da janela fixa atual e da anterior, com a anterior
+# ponderada pela fração que ainda se sobrepõe à janela deslizante. Memória constante.
+SLIDING_WINDOW = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local current = math.floor(now / window)
+local state = redis.call('HMGET', KEYS[1], 'window', 'current', 'previous')
+local stored = tonumber(state[1])
+local count = tonumber(state[2]) or 0
+local previous = tonumber(state[3]) or 0
+if stored ~= current then
+    previous = (stored == current - 1) and count or 0
+    count = 0
+end
+local elapsed = now - current * window
+local estimate = previous * (window - elapsed) / window + count
+if estimate + 1 > limit then
+    local wait = window - elapsed
+    if previous > 0 and count + 1 <= limit then
+        wait = math.ceil((count + 1 - limit) * window / previous + window - elapsed)
+    end
+    return {0, 0, math.max(wait, 1)}
+end
+redis.call('HSET', KEYS[1], 'window', current, 'current', count + 1, 'previous', previous)
+redis.call('PEXPIRE', KEYS[1], window * 2)
+return {1, math.floor(limit - estimate - 1), 0}
+"""
+
+# Balde de fichas: até `limit` fichas, repostas continuamente à taxa de `limit` por janela. Permite
+# rajadas do tamanho do balde e suaviza a vazão. Memória constante.
+TOKEN_BUCKET = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = limit / window
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(now - updated, 0) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = math.ceil((1 - tokens) / rate)
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), wait}
+"""
+
+# Sincronização do limitador em dois níveis: debita do balde global as requisições já permitidas
+# localmente, sem recusar nenhuma, e retorna as fichas restantes. O saldo pode ficar negativo (até
+# -limit) para que o excesso de um lote seja descontado das próximas reposições.
+TOKEN_BUCKET_SYNC = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) * 1000 + math.floor(tonumber(time[2]) / 1000)
+local rate = limit / window
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(state[1]) or limit
+local updated = tonumber(state[2]) or now
+tokens = math.min(limit, tokens + math.max(now - updated, 0) * rate)
+tokens = math.max(tokens - cost, -limit)
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return tostring(tokens)
+"""
+
+ALGORITHMS: Dict[str, str] = {
+    'sliding_log': SLIDING_LOG,
+    'sliding_window': SLIDING_WINDOW,
+    'token_bucket': TOKEN_BUCKET,
+}
+
+class RateLimitResult(NamedTuple):
+    """
+    Resultado da verificação de uma requisição.
+
+    Attributes:
+        allowed: Se a requisição está dentro do limite.
+        remaining: Requisições ainda permitidas na janela.
+        retry_after: Tempo, em segundos, até a próxima requisição ser permitida (0 se permitida).
+    """
+
+    allowed: bool
+    remaining: int
+    retry_after: float
+
+class RateLimiter:
+    """
+    Limitador de taxa no Redis, com o algoritmo escolhido executado em um script Lua atômico.
+
+    Attributes:
+        redis: Cliente Redis.
+        limit: Número máximo de requisições por janela (ou capacidade do balde).
+        period: Duração da janela, em segundos.
+        algorithm: `sliding_log`, `sliding_window` ou `token_bucket`.
+        prefix: Prefixo das chaves no Redis.
+    """
+
+    def __init__(self, redis: Redis, limit: int, period: float, algorithm: str = 'sliding_log'):
+        """
+        Registra o script do algoritmo no cliente; ele é carregado no Redis na primeira chamada.
+
+        Args:
+            redis: Cliente Redis.
+            limit: Número máximo de requisições por janela.
+            period: Duração da janela, em segundos.
+            algorithm: `sliding_log`, `sliding_window` ou `token_bucket`.
+
+        Raises:
+            ValueError: Se o algoritmo não for conhecido.
+        """
+        if algorithm not in ALGORITHMS:
+            raise ValueError(f'Algoritmo de limitação desconhecido: {algorithm}. Use um de {tuple(ALGORITHMS)}')
+        self.redis = redis
+        self.limit = limit
+        self.period = period
+        self.algorithm = algorithm
+        self.prefix = f'ratelimit:{algorithm}'
+        self._window_ms = max(int(period * 1000), 1)
+        self._script = redis.register_script(ALGORITHMS[algorithm])
+
+    async def hit(self, identity: str) -> RateLimitResult:
+        """
+        Registra uma requisição e verifica se ela está dentro do limite, em uma única chamada ao Redis.
+
+        Args:
+            identity: Quem é limitado (ex.: o IP do cliente).
+
+        Returns:
+            RateLimitResult: Se a requisição é permitida, quantas restam e quanto esperar.
+        """
+        # O sufixo aleatório diferencia requisições no mesmo microssegundo no registro deslizante
+        allowed, remaining, wait_ms = await self._script(
+            keys=[f'{self.prefix}:{identity}'], args=[self.limit, self._window_ms, uuid.uuid4().hex[:8]]
+        )
+        return RateLimitResult(bool(allowed), int(remaining), int(wait_ms) / 1000)
+
+class _LocalBucket:
+    """Estado local de um cliente no limitador em dois níveis."""
+
+    __slots__ = ('tokens', 'updated', 'pending', 'synced', 'syncing')
+
+    def __init__(self, tokens: float, now: float):
+        self.tokens = tokens
+        self.updated = now
+        self.pending = 0
+        # Um cliente novo é sincronizado na primeira requisição
+        self.synced = float('-inf')
+        self.syncing = False
+
+class TwoTierRateLimiter:
+    """
+    Limitador de taxa em dois níveis: um balde de fichas local, em memória, decide cada requisição e
+    o balde global no Redis é atualizado em lotes, em segundo plano.
+
+    Cada processo desconta localmente as requisições permitidas e as envia ao Redis quando acumula
+    `batch_size` requisições ou a cada `sync_interval` segundos; a resposta do Redis substitui o saldo
+    local pelo global. Entre duas sincronizações cada processo pode permitir até `batch_size` requisições
+    a mais do que o global permitiria. Como o excesso se soma entre os processos, o lote é a margem
+    dividida por `replicas`: com o número de processos correto, o erro total fica em até `error_margin`
+    do limite; com mais processos do que o informado, ele cresce na mesma proporção.
+
+    Se o Redis ficar indisponível, o disjuntor abre e o limite passa a ser aplicado só localmente, por
+    processo, até o Redis voltar.
+
+    Attributes:
+        redis: Cliente Redis.
+        limit: Capacidade do balde e número de requisições repostas por janela.
+        period: Duração da janela, em segundos.
+        batch_size: Requisições acumuladas que disparam uma sincronização (a margem de cada processo).
+        sync_interval: Tempo máximo, em segundos, entre sincronizações de um cliente ativo.
+        max_clients: Número máximo de clientes mantidos em memória (os menos recentes são descartados).
+        breaker: Disjuntor das chamadas ao Redis.
+        prefix: Prefixo das chaves no Redis, o mesmo do algoritmo `token_bucket`.
+    """
+
+    def __init__(
+        self,
+        redis: Redis,
+        limit: int,
+        period: float,
+        error_margin: float = 0.1,
+        sync_interval: float = 1.0,
+        max_clients: int = 10000,
+        breaker: Optional[CircuitBreaker] = None,
+        replicas: int = RATE_LIMIT_REPLICAS,
+    ):
+        """
+        Inicializa o limitador e registra o script de sincronização no cliente.
+
+        Args:
+            redis: Cliente Redis.
+            limit: Capacidade do balde e número de requisições repostas por janela.
+            period: Duração da janela, em segundos.
+            error_margin: Fração do limite que todos os processos juntos podem exceder entre sincronizações.
+            sync_interval: Tempo máximo, em segundos, entre sincronizações de um cliente ativo.
+            max_clients: Número máximo de clientes mantidos em memória.
+            breaker: Disjuntor das chamadas ao Redis; por padrão, 3 falhas abrem o circuito por 30 segundos.
+            replicas: Número esperado de processos aplicando o limite; por padrão, `RATE_LIMIT_REPLICAS`.
+        """
+        self.redis = redis
+        self.limit = limit
+        self.period = period
+        self.batch_size = max(int(limit * error_margin / max(replicas, 1)), 1)
+        self.sync_interval = sync_interval
+        self.max_clients = max_clients
+        self.breaker = breaker or CircuitBreaker(name='limitação de taxa')
+        self.prefix = 'ratelimit:token_bucket'
+        self._rate = limit / period
+        self._window_ms = max(int(period * 1000), 1)
+        self._script = redis.register_script(TOKEN_BUCKET_SYNC)
+        self._buckets: 'OrderedDict[str, _LocalBucket]' = OrderedDict()
+        self._tasks: Set[asyncio.Task] = set()
+
+    def _bucket(self, identity: str, now: float) -> _LocalBucket:
+        """Retorna o balde local do cliente, já reposto até agora, criando-o se necessário."""
+        bucket = self._buckets.get(identity)
+        if bucket is None:
+            bucket = self._buckets[identity] = _LocalBucket(self.limit, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+            return bucket
+        self._buckets.move_to_end(identity)
+        bucket.tokens = min(self.limit, bucket.tokens + (now - bucket.updated) * self._rate)
+        bucket.updated = now
+        return bucket
+
+    async def hit(self, identity: str) -> RateLimitResult:
+        """
+        Registra uma requisição e verifica se ela está dentro do limite, sem esperar pelo Redis.
+
+        Args:
+            identity: Quem é limitado (ex.: o IP do cliente).
+
+        Returns:
+            RateLimitResult: Se a requisição é permitida, quantas restam e quanto esperar.
+        """
+        now = time.monotonic()
+        bucket = self._bucket(identity, now)
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.pending += 1
+            result = RateLimitResult(True, int(bucket.tokens), 0)
+        else:
+            result = RateLimitResult(False, 0, (1 - bucket.tokens) / self._rate)
+
+        due = bucket.pending >= self.batch_size or now - bucket.synced >= self.sync_interval
+        if due and not bucket.syncing and self.breaker.allow():
+            bucket.syncing = True
+            task = asyncio.create_task(self._sync(identity, bucket))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return result
+
+    async def _sync(self, identity: str, bucket: _LocalBucket) -> None:
+        """
+        Envia ao Redis as requisições permitidas localmente e adota o saldo global.
+
+        Args:
+            identity: Quem é limitado.
+            bucket: O balde local do cliente.
+        """
+        sent, bucket.pending = bucket.pending, 0
+        try:
+            tokens = float(
+                await self._script(keys=[f'{self.prefix}:{identity}'], args=[self.limit, self._window_ms, sent])
+            )
+        except Exception as e:
+            self.breaker.failure()
+            # Com o circuito aberto o limite é só local e o lote não enviado é descartado
+            if not self.breaker.is_open:
+                bucket.pending = min(bucket.pending + sent, self.limit)
+            logger.debug('Falha ao sincronizar o limite de taxa de %s: %s', identity, e)
+        else:
+            self.breaker.success()
+            # O global já inclui o lote enviado; as requisições permitidas durante a chamada ainda não
+            bucket.tokens = tokens - bucket.pending
+            bucket.updated = time.monotonic()
+        finally:
+            bucket.synced = time.monotonic()
+            bucket.syncing = False
@@ -0,0 +1,92 @@
+import time
+from contextvars import ContextVar
+from typing import List, Optional
+
+from prometheus_client import Counter, Gauge, Histogram
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+# Comandos SQL e tempo no banco da requisição em andamento, somados pelos eventos do engine
+request_sql: ContextVar[Optional[List[float]]] = ContextVar('request_sql', default=None)
+
+REQUEST_DURATION = Histogram(
+    'http_request_duration_seconds',
+    'Duração das requisições HTTP, por método, template da rota e status.',
+    ('method', 'route', 'status'),
+)
+REQUESTS_IN_FLIGHT = Gauge('http_requests_in_flight', 'Requisições HTTP em andamento.')
+REQUEST_SQL_STATEMENTS = Histogram(
+    'http_request_sql_statements',
+    'Comandos SQL executados por requisição, por método e template da rota.',
+    ('method', 'route'),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_SQL_DURATION = Histogram(
+    'http_request_sql_duration_seconds',
+    'Tempo no banco por requisição, por método e template da rota.',
+    ('method', 'route'),
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+RATE_LIMIT_DECISIONS = Counter(
+    'rate_limit_decisions_total',
+    'Decisões do limitador de taxa: allowed, rejected ou error (Redis indisponível, requisição liberada).',
+    ('decision',),
+)
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI que mede cada requisição HTTP para o servidor de métricas.
+
+    Registra a duração por método, template da rota (ex.: `/orders/{order_id}`, nunca o caminho com
+    o identificador) e status, as requisições em andamento e o número de comandos SQL e o tempo no
+    banco de cada requisição. Rotas inexistentes são agrupadas em `unmatched`.
+
+    Attributes:
+        app: A aplicação ASGI seguinte na pilha.
+    """
+
+    def __init__(self, app: ASGIApp):
+        """
+        Inicializa o middleware.
+
+        Args:
+            app: A aplicação ASGI seguinte na pilha.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Repassa a requisição à aplicação e registra as métricas ao final da resposta.
+
+        Args:
+            scope: O escopo ASGI da conexão.
+            receive: Canal de recebimento de mensagens ASGI.
+            send: Canal de envio de mensagens ASGI.
+        """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        sql = [0, 0.0]
+        token = request_sql.set(sql)
+        REQUESTS_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - start
+            REQUESTS_IN_FLIGHT.dec()
+            request_sql.reset(token)
+            # O roteador do FastAPI guarda a rota encontrada no próprio escopo
+            route = getattr(scope.get('route'), 'path', None) or 'unmatched'
+            method = scope['method']
+            REQUEST_DURATION.labels(method, route, str(status)).observe(elapsed)
+            REQUEST_SQL_STATEMENTS.labels(method, route).observe(sql[0])
+            REQUEST_SQL_DURATION.labels(method, route).observe(sql[1])
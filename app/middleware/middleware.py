@@ -1,18 +1,33 @@
-import time
+import math
 from typing import Optional
+
 from aioredis import Redis, from_url
-from fastapi import HTTPException, Request
-from starlette.middleware.base import BaseHTTPMiddleware
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..tools.logging import get_logger, logger, request_route
+from .limiter import RateLimiter, TwoTierRateLimiter
+from .metrics import RATE_LIMIT_DECISIONS
 
-from ..tools.logging import logger
+RATE_LIMIT_MESSAGE = 'Muitas Requisições deste IP. Tente Novamente Mais Tarde!'
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
+# Sob ataque, cada requisição recusada gera um aviso: as repetições são suprimidas pelo `LogSampler`
+rate_limit_logger = get_logger('ratelimit')
+
+class RateLimitMiddleware:
     """
-    Middleware para limitar a taxa de requisições por IP.
+    Middleware ASGI para limitar a taxa de requisições por IP.
+
+    Cada requisição é verificada e registrada no Redis por um script Lua atômico (uma única ida ao
+    servidor, com precisão de milissegundos), segundo o algoritmo escolhido. Se o IP exceder o limite,
+    a resposta é HTTP 429 (Too Many Requests) com o cabeçalho `Retry-After`. Se o Redis estiver
+    indisponível, a requisição segue sem limitação.
 
-    Este middleware utiliza o Redis para armazenar o número de requisições feitas por um determinado IP
-    em um período de tempo especificado. Se o número de requisições exceder o limite permitido, uma exceção
-    HTTP 429 (Too Many Requests) é lançada.
+    Com `local_error_margin`, cada processo decide localmente, com um balde de fichas em memória, e
+    sincroniza com o Redis em lotes (veja `TwoTierRateLimiter`); se o Redis cair, o limite continua
+    sendo aplicado por processo.
 
     Attributes:
         app: A aplicação FastAPI à qual o middleware está associado.
@@ -20,106 +35,133 @@ class RateLimitMiddleware(BaseHTTPMiddleware):
         rate_limit: O número máximo de requisições permitidas por IP no período especificado.
         rate_limit_period: O período de tempo (em segundos) durante o qual as requisições são contadas.
         redis: Instância do cliente Redis.
+        limiter: O limitador que executa o algoritmo no Redis.
     """
 
-    def __init__(self, app, redis_url: str, rate_limit: int, rate_limit_period: int):
+    def __init__(
+        self,
+        app: ASGIApp,
+        redis_url: str,
+        rate_limit: int,
+        rate_limit_period: int,
+        algorithm: str = 'sliding_log',
+        local_error_margin: Optional[float] = None,
+    ):
         """
         Inicializa o middleware com os parâmetros fornecidos.
 
+        O cliente Redis é criado aqui; a conexão é aberta pelo pool na primeira requisição.
+
         Args:
             app: A aplicação FastAPI à qual o middleware está associado.
             redis_url: A URL de conexão ao Redis.
             rate_limit: O número máximo de requisições permitidas por IP no período especificado.
             rate_limit_period: O período de tempo (em segundos) durante o qual as requisições são contadas.
+            algorithm: `sliding_log` (exato), `sliding_window` (aproximado, memória constante) ou
+                `token_bucket` (permite rajadas do tamanho do limite).
+            local_error_margin: Se informado, usa o limitador em dois níveis (balde de fichas local
+                sincronizado em lotes), com esta fração do limite como erro máximo somado entre os
+                `RATE_LIMIT_REPLICAS` processos; o `algorithm` é ignorado.
         """
-        super().__init__(app)
+        self.app = app
         self.redis_url = redis_url
         self.rate_limit = rate_limit
         self.rate_limit_period = rate_limit_period
-        self.redis: Optional[Redis] = None
+        self.redis: Redis = from_url(redis_url, decode_responses=True)
+        if local_error_margin is None:
+            self.limiter = RateLimiter(self.redis, rate_limit, rate_limit_period, algorithm)
+        else:
+            self.limiter = TwoTierRateLimiter(self.redis, rate_limit, rate_limit_period, local_error_margin)
 
-    async def dispatch(self, request: Request, call_next):
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
         """
-        Manipula cada requisição, verificando se o IP ultrapassou o limite de requisições.
-
-        Args:
-            request: A requisição atual.
-            call_next: Função que chama o próximo middleware ou endpoint.
+        Manipula cada requisição HTTP, verificando se o IP ultrapassou o limite de requisições.
 
-        Returns:
-            A resposta da aplicação, caso o limite de requisições não tenha sido excedido.
+        Se o limite foi excedido, envia uma resposta 429; caso contrário, repassa a requisição à
+        aplicação e acrescenta os cabeçalhos `X-RateLimit-*` ao início da resposta.
 
-        Raises:
-            HTTPException: Se o limite de requisições for excedido, uma exceção 429 é lançada.
+        Args:
+            scope: O escopo ASGI da conexão.
+            receive: Canal de recebimento de mensagens ASGI.
+            send: Canal de envio de mensagens ASGI.
         """
-        if not self.redis:
-            self.redis = await from_url(self.redis_url, decode_responses=True)
-
-        ip = request.client.host
-        key = f'ratelimit:{ip}'
-
-        current_time = int(time.time())
-        start_time = current_time - self.rate_limit_period
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
 
+        ip = scope['client'][0] if scope.get('client') else 'unknown'
         try:
-            logger.info(f'Recebendo Requisição do IP: {ip} no Tempo: {current_time}')
-
-            # Remove Requisições Antigas
-            removed = await self.redis.zremrangebyscore(key, 0, start_time)
-            logger.info(f'Removi {removed} Requisições Antigas para a Chave: {key}')
-
-            # Obtém o Número Atual de Requisições
-            request_count = await self.redis.zcard(key)
-            logger.info(f'Número Atual de Requisições para a Chave {key}: {request_count}')
-
-            if request_count >= self.rate_limit:
-                logger.warning(f'Limite de Requisições Excedido para a Chave {key}')
-                raise HTTPException(status_code=429, detail='Muitas Requisições deste IP. Tente Novamente Mais Tarde!')
-
-            # Adiciona a Requisição Atual
-            added = await self.redis.zadd(key, {str(current_time): current_time})
-            logger.info(f'Adicionadas {added} Requisições no Tempo {current_time} para a Chave {key}')
-
-            # Define o Tempo de Expiração da Chave
-            expiration_set = await self.redis.expire(key, self.rate_limit_period)
-            logger.info(f'Tempo de Expiração Definido para a Chave {key}: {expiration_set}')
-
-            response = await call_next(request)
-            logger.info(f'Requisição Processada com Sucesso para o IP: {ip}')
-            return response
-
+            result = await self.limiter.hit(ip)
         except Exception as e:
-            logger.error(f'Erro no RateLimitMiddleware: {e}')
-            raise HTTPException(status_code=500, detail='Erro Interno do Servidor!!!')
-
-class ExceptionLoggingMiddleware(BaseHTTPMiddleware):
+            RATE_LIMIT_DECISIONS.labels('error').inc()
+            rate_limit_logger.error('Erro no RateLimitMiddleware, requisição liberada sem limitação: %s', e)
+            await self.app(scope, receive, send)
+            return
+
+        headers = {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Remaining': str(result.remaining)}
+        RATE_LIMIT_DECISIONS.labels('allowed' if result.allowed else 'rejected').inc()
+        if not result.allowed:
+            rate_limit_logger.warning('Limite de Requisições Excedido para o IP %s', ip)
+            headers['Retry-After'] = str(max(math.ceil(result.retry_after), 1))
+            response = JSONResponse(
+                status_code=429, content={'status code': 429, 'msg': RATE_LIMIT_MESSAGE}, headers=headers
+            )
+            await response(scope, receive, send)
+            return
+
+        async def send_with_headers(message: Message) -> None:
+            if message['type'] == 'http.response.start':
+                MutableHeaders(scope=message).update(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+class ExceptionLoggingMiddleware:
     """
-    Middleware para capturar e registrar exceções não tratadas.
+    Middleware ASGI para capturar e registrar exceções não tratadas.
 
     Este middleware captura todas as exceções não tratadas durante o processamento das requisições
     e as registra no logger. Em seguida, retorna uma exceção HTTP 500 (Internal Server Error).
+    Também registra o método e o caminho da requisição em `request_route`, usado pelas regras de
+    amostragem de logs por rota.
 
     Atributos:
-        Nenhum.
+        app: A aplicação ASGI seguinte na pilha.
     """
 
-    async def dispatch(self, request: Request, call_next):  # noqa PLR6301
+    def __init__(self, app: ASGIApp):
         """
-        Manipula cada requisição, capturando e registrando exceções não tratadas.
+        Inicializa o middleware.
 
         Args:
-            request: A requisição atual.
-            call_next: Função que chama o próximo middleware ou endpoint.
+            app: A aplicação ASGI seguinte na pilha.
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        """
+        Manipula cada requisição HTTP, capturando e registrando exceções não tratadas.
 
-        Returns:
-            A resposta da aplicação, caso nenhuma exceção ocorra.
+        As mensagens da resposta passam direto, sem cópia, então respostas em streaming são enviadas
+        à medida que são geradas.
+
+        Args:
+            scope: O escopo ASGI da conexão.
+            receive: Canal de recebimento de mensagens ASGI.
+            send: Canal de envio de mensagens ASGI.
 
         Raises:
             HTTPException: Se ocorrer uma exceção não tratada, uma exceção 500 é lançada.
         """
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        token = request_route.set(f"{scope['method']} {scope['path']}")
         try:
-            response = await call_next(request)
-            return response
+            await self.app(scope, receive, send)
         except Exception as e:
-            logger.error(f'Erro Não Tratado: {e}', exc_info=True)
+            logger.error('Erro Não Tratado: %s', e, exc_info=True)
             raise HTTPException(status_code=500, detail='Erro Interno do Servidor!!!')
+        finally:
+            request_route.reset(token)
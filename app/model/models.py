@@ -1,6 +1,7 @@
 from datetime import datetime, timezone
-from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Integer, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Float, ForeignKey, Index, Integer, String, Text, case, literal_column
 from sqlalchemy.orm import relationship
+from sqlalchemy.sql.expression import Grouping
 
 from ..db.database import Base
 
@@ -41,6 +42,8 @@ class Product(Base):
     """
 
     __tablename__ = 'products'
+    # Cardápio filtrado por categoria
+    __table_args__ = (Index('ix_products_category_id', 'category_id'),)
 
     id = Column(Integer, primary_key=True, index=True)
     name = Column(String, index=True)
@@ -74,6 +77,11 @@ class Order(Base):
     """
 
     __tablename__ = 'orders'
+    # Listagem por data (com o id como desempate) e fila da cozinha por status
+    __table_args__ = (
+        Index('ix_orders_created_at_id', 'created_at', 'id'),
+        Index('ix_orders_status_created_at', 'status', 'created_at'),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     status = Column(String, index=True, default='created')
@@ -96,6 +104,30 @@ class Order(Base):
     tracking = relationship('Tracking', back_populates='order')
     webhook = relationship('Webhook', back_populates='order')
 
+# Status dos pedidos na fila da cozinha, do mais ao menos prioritário
+ACTIVE_ORDER_STATUSES = ('Pronto', 'Em preparação', 'Recebido')
+
+# Os status entram como literais, e não como parâmetros, para que o filtro e a prioridade das consultas
+# sejam idênticos aos do índice parcial abaixo: só assim o planejador reconhece que pode usá-lo
+ACTIVE_ORDER_FILTER = Order.status.in_([literal_column(f"'{status}'") for status in ACTIVE_ORDER_STATUSES])
+ORDER_QUEUE_PRIORITY = case(
+    *[
+        (Order.status == literal_column(f"'{status}'"), literal_column(str(priority)))
+        for priority, status in enumerate(ACTIVE_ORDER_STATUSES)
+    ]
+)
+
+# Fila da cozinha: só indexa os pedidos ativos, e o tamanho do índice não cresce com o histórico de finalizados.
+# O PostgreSQL exige parênteses em volta de expressões que não são chamadas de função
+Index(
+    'ix_orders_active_queue',
+    Grouping(ORDER_QUEUE_PRIORITY),
+    Order.created_at,
+    Order.id,
+    postgresql_where=ACTIVE_ORDER_FILTER,
+    sqlite_where=ACTIVE_ORDER_FILTER,
+)
+
 class OrderItem(Base):
     """
     Representa um Item em um Pedido.
@@ -133,6 +165,7 @@ class OrderProduct(Base):
     """
 
     __tablename__ = 'order_products'
+    __table_args__ = (Index('ix_order_products_order_id', 'order_id'),)
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey('orders.id'))
@@ -155,6 +188,8 @@ class Tracking(Base):
     """
 
     __tablename__ = 'tracking'
+    # Histórico de um pedido em ordem cronológica
+    __table_args__ = (Index('ix_tracking_order_id_created_at', 'order_id', 'created_at'),)
 
     id = Column(Integer, primary_key=True, index=True)
     order_id = Column(Integer, ForeignKey('orders.id'))
@@ -172,6 +207,7 @@ class Token(Base):
         token (str): Valor do token.
         is_used (bool): Indica se o token foi utilizado.
         user_id (int): Identificador do cliente associado ao token.
+        expires_at (datetime): Data e hora de expiração do token; depois dela o registro é removido.
         user (relationship): Relacionamento com o cliente associado ao token.
     """
 
@@ -181,9 +217,39 @@ class Token(Base):
     token = Column(String, unique=True, index=True)
     is_used = Column(Boolean, default=False)
     user_id = Column(Integer, ForeignKey('customers.id'))
+    expires_at = Column(DateTime, index=True)
 
     user = relationship('Customer')
 
+class RefreshToken(Base):
+    """
+    Representa um Token de Atualização, de longa duração, usado para obter novos tokens de acesso.
+
+    Cada uso troca o token por um novo da mesma família (sessão). Um token já trocado que volte a
+    ser apresentado indica vazamento: a família inteira é revogada.
+
+    Attributes:
+        id (int): Identificador único do token.
+        token_hash (str): SHA-256 do token; o valor do token não é armazenado.
+        family_id (str): Identificador da sessão à qual o token pertence.
+        customer_id (int): Identificador do cliente associado ao token.
+        expires_at (datetime): Data e hora em que o token deixa de ser aceito.
+        used_at (datetime): Data e hora em que o token foi trocado, ou None se ainda não foi.
+        revoked (bool): Indica se a sessão do token foi revogada.
+        created_at (datetime): Data e hora de emissão do token.
+    """
+
+    __tablename__ = 'refresh_tokens'
+
+    id = Column(Integer, primary_key=True)
+    token_hash = Column(String, unique=True, nullable=False)
+    family_id = Column(String, index=True, nullable=False)
+    customer_id = Column(Integer, ForeignKey('customers.id'), nullable=False)
+    expires_at = Column(DateTime, nullable=False, index=True)
+    used_at = Column(DateTime)
+    revoked = Column(Boolean, default=False, nullable=False)
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+
 class Category(Base):
     """
     Representa uma Categoria de Produtos.
@@ -210,3 +276,23 @@ class Webhook(Base):
 
     customer_id = Column(Integer)
     order = relationship('Order', back_populates='webhook')
+
+class AppMetadata(Base):
+    """
+    Representa um Metadado da Aplicação armazenado no próprio banco.
+
+    Usado na inicialização para saber se os dados iniciais já foram carregados, sem consultar as tabelas.
+
+    Attributes:
+        key (str): Nome do metadado.
+        value (str): Valor do metadado.
+        updated_at (datetime): Data e hora da última atualização.
+    """
+
+    __tablename__ = 'app_metadata'
+
+    key = Column(String, primary_key=True)
+    value = Column(String, nullable=False)
+    updated_at = Column(
+        DateTime, default=lambda: datetime.now(timezone.utc), onupdate=lambda: datetime.now(timezone.utc)
+    )
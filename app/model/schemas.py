@@ -61,10 +61,23 @@ class Token(BaseModel):
     Attributes:
         access_token (str): Token de acesso.
         customer_id (int): Identificador do cliente associado ao token.
+        refresh_token (Optional[str]): Token de atualização, trocado em `/token/refresh` por um novo
+            token de acesso sem repetir o login.
     """
 
     access_token: str
     customer_id: int
+    refresh_token: Optional[str] = None
+
+class RefreshTokenRequest(BaseModel):
+    """
+    Modelo para a Troca de um Token de Atualização.
+
+    Attributes:
+        refresh_token (str): Token de atualização recebido no login ou na última troca.
+    """
+
+    refresh_token: str
 
 class TokenData(BaseModel):
     """
@@ -181,6 +194,18 @@ class Category(CategoryBase):
 
         from_attributes = True
 
+class CategoryPage(BaseModel):
+    """
+    Modelo para uma Página de Categorias.
+
+    Attributes:
+        categories (List[Category]): Categorias da página.
+        next_cursor (Optional[str]): Cursor da próxima página, ou None na última página.
+    """
+
+    categories: List[Category]
+    next_cursor: Optional[str] = None
+
 class OrderBase(BaseModel):
     """
     Modelo Base para Dados de Pedidos.
@@ -307,6 +332,18 @@ class OrderResponse(BaseModel):
 
         from_attributes = True
 
+class OrderPage(BaseModel):
+    """
+    Modelo para uma Página de Pedidos.
+
+    Attributes:
+        orders (List[OrderResponse]): Pedidos da página.
+        next_cursor (Optional[str]): Cursor da próxima página, ou None na última página.
+    """
+
+    orders: List[OrderResponse]
+    next_cursor: Optional[str] = None
+
 class OrderCustomerView(BaseModel):
     """
     Modelo para Visualizar um Pedido com Detalhes do Cliente.
@@ -1,18 +1,21 @@
-from datetime import timedelta
+import uuid
+from datetime import datetime, timedelta, timezone
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
 
-from ..db.database import get_db
+from ..db.database import DBSession, get_session
 from ..model import schemas
-from ..services import repository, security
+from ..services import async_repository, security
+from ..services.passwords import password_pool
 from ..tools.logging import logger
 
 router = APIRouter()
 
 
 @router.post('/token', response_model=schemas.Token)
-def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_for_access_token(
+    db: DBSession = Depends(get_session), form_data: OAuth2PasswordRequestForm = Depends()
+):
     """
     Autentica o Usuário e Gera um Token de Acesso.
 
@@ -20,7 +23,7 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     fornecendo um nome de usuário e senha válidos.
 
     Args:
-        db (Session, opcional): Instância de sessão do banco de dados.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
         form_data (OAuth2PasswordRequestForm, opcional): Dados do formulário de login.
 
     Returns:
@@ -29,9 +32,10 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     Raises:
         HTTPException: Se o nome de usuário ou a senha estiverem incorretos.
     """
-    user = repository.get_user_by_email(db, email=form_data.username)
-    if not user or not security.verify_password(form_data.password, user.hashed_password):
-        logger.warning(f'Login falhou para o usuário: {form_data.username}')
+    user = await async_repository.get_user_by_email(db, email=form_data.username)
+    # A verificação do bcrypt é CPU-bound: roda no pool de senhas, fora do event loop e do threadpool das rotas
+    if not user or not await password_pool.run(security.verify_password, form_data.password, user.hashed_password):
+        logger.warning('Login falhou para o usuário: %s', form_data.username)
         raise HTTPException(
             status_code=400,
             detail='Nome de usuário ou senha incorretos',
@@ -40,5 +44,55 @@ def login_for_access_token(db: Session = Depends(get_db), form_data: OAuth2Passw
     access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = security.create_access_token(data={'sub': str(user.id)}, expires_delta=access_token_expires)
 
-    logger.info(f'Token criado para o ID do usuário: {user.id}')
-    return {'access_token': f'{access_token}', 'customer_id': str(user.id)}
+    # Inicia a sessão: os próximos tokens de acesso vêm de /token/refresh, sem o bcrypt
+    refresh_token = security.create_refresh_token()
+    await async_repository.create_refresh_token(
+        db,
+        token_hash=security.hash_token(refresh_token),
+        customer_id=user.id,
+        expires_at=datetime.now(timezone.utc) + timedelta(days=security.REFRESH_TOKEN_EXPIRE_DAYS),
+        family_id=uuid.uuid4().hex,
+    )
+
+    logger.info('Token criado para o ID do usuário: %s', user.id)
+    return {'access_token': f'{access_token}', 'customer_id': str(user.id), 'refresh_token': refresh_token}
+
+
+@router.post('/token/refresh', response_model=schemas.Token)
+async def refresh_access_token(request: schemas.RefreshTokenRequest, db: DBSession = Depends(get_session)):
+    """
+    Troca um Token de Atualização por um Novo Token de Acesso.
+
+    O token de atualização é de uso único: a resposta traz um novo, da mesma sessão, que deve ser
+    usado na próxima troca. Reapresentar um token já trocado revoga a sessão inteira, e o cliente
+    precisa fazer login novamente.
+
+    Args:
+        request (schemas.RefreshTokenRequest): O token de atualização atual.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
+
+    Returns:
+        dict: O novo token de acesso, o ID do cliente e o novo token de atualização.
+
+    Raises:
+        HTTPException: Se o token de atualização for desconhecido, expirado, revogado ou reutilizado.
+    """
+    refresh_token = security.create_refresh_token()
+    customer_id = await async_repository.rotate_refresh_token(
+        db,
+        token_hash=security.hash_token(request.refresh_token),
+        new_token_hash=security.hash_token(refresh_token),
+        expires_at=datetime.now(timezone.utc) + timedelta(days=security.REFRESH_TOKEN_EXPIRE_DAYS),
+    )
+    if customer_id is None:
+        logger.warning('Token de atualização inválido, expirado ou reutilizado')
+        raise HTTPException(
+            status_code=401,
+            detail='Token de atualização inválido ou expirado',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+    access_token_expires = timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+    access_token = security.create_access_token(data={'sub': str(customer_id)}, expires_delta=access_token_expires)
+
+    logger.info('Token renovado para o ID do usuário: %s', customer_id)
+    return {'access_token': access_token, 'customer_id': str(customer_id), 'refresh_token': refresh_token}
@@ -1,11 +1,9 @@
-from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy import and_
-from sqlalchemy.orm import Session
+from typing import Optional, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
 from ..db import database
-from ..model import models, schemas
-from ..services import repository
+from ..model import schemas
+from ..services import async_repository, cache, conditional, pagination, snapshot
 from ..tools.logging import logger
 
 router = APIRouter()
@@ -13,42 +11,96 @@ router = APIRouter()
 CATEGORY_NOT_FOUND = 'Categoria não encontrada'
 
 
-@router.get('/', response_model=Dict[str, List[schemas.Category]])
-def list_categories(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(database.get_db),
+async def build_categories_page(
+    db: database.DBSession, skip: int, limit: int, cursor: Optional[str]
+) -> Tuple[snapshot.Snapshot, Set[str]]:
+    """
+    Compila uma página da listagem de categorias em um snapshot do cardápio.
+
+    Args:
+        db (DBSession): Instância de sessão do banco de dados.
+        skip (int): Número de categorias a serem ignoradas.
+        limit (int): Número máximo de categorias.
+        cursor (Optional[str]): Cursor da página.
+
+    Returns:
+        Tuple[snapshot.Snapshot, Set[str]]: A página compilada e as tags das categorias que contém.
+
+    Raises:
+        HTTPException: Se o cursor for inválido.
+    """
+    key = pagination.parse_cursor(cursor, int)
+    categories = await async_repository.get_categories(
+        db, skip=skip, limit=limit + 1, after=key[0] if key else None
+    )
+    categories, next_cursor = pagination.paginate(categories, limit, lambda category: [category.id])
+    tags = {f'category:{category.id}' for category in categories}
+    if next_cursor is None:
+        tags.add('categories:tail')
+    if key is None and skip:
+        tags.add('categories:offset')
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    page = snapshot.Snapshot({'categories': categories, 'next_cursor': next_cursor}, headers)
+    return page, tags
+
+cache.register_menu_builder('categories', build_categories_page)
+
+
+@router.get('/', response_model=schemas.CategoryPage)
+async def list_categories(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: database.DBSession = Depends(database.get_read_session),
 ):
     """
     Lista todas as categorias com paginação.
 
-    Este endpoint retorna uma lista de categorias com base nos parâmetros de paginação fornecidos.
+    Este endpoint retorna uma página de categorias ordenadas pelo ID. A página seguinte é obtida
+    enviando o `next_cursor` da resposta no parâmetro `cursor`. Cada página é servida de um snapshot
+    do cardápio, já serializado em JSON e em gzip, que é recompilado em segundo plano quando uma escrita
+    altera alguma das categorias que contém ou seus produtos. Com `If-None-Match` igual ao ETag da
+    versão atual do cardápio, a resposta é 304.
 
     Args:
-        skip (int): Número de categorias a serem ignoradas (pular). Padrão é 0.
-        limit (int): Número máximo de categorias a serem retornadas. Padrão é 10.
-        db (Session, opcional): Instância de sessão do banco de dados.
+        request (Request): Requisição HTTP, com os cabeçalhos `If-None-Match` e `Accept-Encoding` opcionais.
+        skip (int): Número de categorias a serem ignoradas (pular) (obsoleto: use `cursor`). Padrão é 0.
+        limit (int): Número máximo de categorias a serem retornadas, de 1 a `pagination.MAX_PAGE_SIZE`. Padrão é 10.
+        cursor (Optional[str]): Cursor da página, recebido em `next_cursor`.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
 
     Returns:
-        dict: Um dicionário contendo uma lista de categorias.
+        schemas.CategoryPage: As categorias da página e o cursor da próxima.
     """
-    categories = repository.get_categories(db, skip=skip, limit=limit)
-    return {'categories': categories}
+    version = await cache.get_menu_version(db)
+    # Representações com e sem gzip têm bytes diferentes e, portanto, ETags diferentes
+    etag = conditional.make_etag('categories', version, skip, limit, cursor, snapshot.accepts_gzip(request))
+    if conditional.etag_matches(request, etag):
+        return conditional.not_modified(etag, conditional.MENU_CACHE_CONTROL, vary='Accept-Encoding')
+
+    page = await cache.get_menu_entry(db, ('categories', skip, limit, cursor))
+    return snapshot.snapshot_response(request, page, {'ETag': etag, 'Cache-Control': conditional.MENU_CACHE_CONTROL})
 
 
 @router.get('/{category_id}', response_model=schemas.Category)
-def get_category(
+async def get_category(
     category_id: int,
-    db: Session = Depends(database.get_db),
+    request: Request,
+    response: Response,
+    db: database.DBSession = Depends(database.get_read_session),
 ):
     """
     Obtém uma categoria específica pelo ID.
 
     Este endpoint retorna os detalhes de uma categoria específica identificada pelo ID fornecido.
+    Com `If-None-Match` igual ao ETag da versão atual do cardápio, a resposta é 304.
 
     Args:
         category_id (int): ID da categoria a ser recuperada.
-        db (Session, opcional): Instância de sessão do banco de dados.
+        request (Request): Requisição HTTP, com o cabeçalho `If-None-Match` opcional.
+        response (Response): Resposta HTTP, que recebe os cabeçalhos `ETag` e `Cache-Control`.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
 
     Returns:
         schemas.Category: Detalhes da categoria solicitada.
@@ -56,37 +108,29 @@ def get_category(
     Raises:
         HTTPException: Se a categoria não for encontrada.
     """
-    logger.info(f'Recebido ID da categoria: {category_id}')
-
-    db_category = repository.get_category(db, category_id=category_id)
-
-    if not db_category:
-        logger.error(f'Categoria não encontrada para ID: {category_id}')
-        raise HTTPException(status_code=404, detail=CATEGORY_NOT_FOUND)
-
-    category_response = schemas.Category(
-        id=str(db_category.id),
-        name=db_category.name,
-        products=[
-            schemas.Product(
-                id=str(product.id),
-                name=product.name,
-                description=product.description,
-                price=product.price,
-                category=db_category.name,
-            )
-            for product in db_category.products
-        ],
-    )
-
-    logger.info(f'Retorno da categoria: {category_response}')
+    logger.info('Recebido ID da categoria: %s', category_id)
+
+    etag = conditional.make_etag('category', await cache.get_menu_version(db), category_id)
+    if conditional.etag_matches(request, etag):
+        return conditional.not_modified(etag, conditional.MENU_CACHE_CONTROL)
+
+    category_response = cache.menu_cache.get(('category', category_id))
+    if category_response is None:
+        category_response = await async_repository.get_category_with_products(db, category_id=category_id)
+        if not category_response:
+            logger.error('Categoria não encontrada para ID: %s', category_id)
+            raise HTTPException(status_code=404, detail=CATEGORY_NOT_FOUND)
+        cache.menu_cache.set(('category', category_id), category_response, [f'category:{category_id}'])
+
+    logger.info('Retorno da categoria: %s', category_response)
+    conditional.set_cache_headers(response, etag, conditional.MENU_CACHE_CONTROL)
     return category_response
 
 
 @router.post('/', response_model=schemas.Category)
-def create_category(
+async def create_category(
     category: schemas.CategoryCreate,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
 ):
     """
     Cria uma nova categoria.
@@ -95,7 +139,7 @@ def create_category(
 
     Args:
         category (schemas.CategoryCreate): Dados da nova categoria a ser criada.
-        db (Session, opcional): Instância de sessão do banco de dados.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
 
     Returns:
         schemas.Category: A categoria criada.
@@ -103,32 +147,30 @@ def create_category(
     Raises:
         HTTPException: Se uma categoria com o mesmo nome já existir ou se ocorrer um erro interno.
     """
-    logger.info(f'Recebido pedido para criar a categoria com nome: {category.name}')
+    logger.info('Recebido pedido para criar a categoria com nome: %s', category.name)
 
     try:
-        existing_category = db.query(models.Category).filter(and_(models.Category.name == category.name)).first()
+        existing_category = await async_repository.get_category_by_name(db, name=category.name)
         if existing_category:
-            logger.warning(f"Categoria com o nome '{category.name}' já existe")
+            logger.warning("Categoria com o nome '%s' já existe", category.name)
             raise HTTPException(status_code=400, detail='Categoria já existe')
 
-        db_category = models.Category(name=category.name)
-        db.add(db_category)
-        db.commit()
-        db.refresh(db_category)
-        logger.info(f'Categoria criada com sucesso com ID: {db_category.id}')
+        db_category = await async_repository.create_category(db, category=category)
+        logger.info('Categoria criada com sucesso com ID: %s', db_category.id)
+        await cache.invalidate_menu('categories:tail', 'categories:offset')
 
         return schemas.Category(id=db_category.id, name=db_category.name, products=[])
 
     except Exception as e:
-        logger.error(f'Erro ao criar categoria: {e}')
+        logger.error('Erro ao criar categoria: %s', e)
         raise HTTPException(status_code=500, detail='Erro interno do servidor')
 
 
 @router.put('/{category_id}', response_model=schemas.Category)
-def update_category(
+async def update_category(
     category_id: int,
     category: schemas.CategoryCreate,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
 ):
     """
     Atualiza uma categoria existente.
@@ -138,7 +180,7 @@ def update_category(
     Args:
         category_id (int): ID da categoria a ser atualizada.
         category (schemas.CategoryCreate): Novos dados da categoria.
-        db (Session, opcional): Instância de sessão do banco de dados.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
 
     Returns:
         schemas.Category: A categoria atualizada.
@@ -146,36 +188,23 @@ def update_category(
     Raises:
         HTTPException: Se a categoria não for encontrada.
     """
-    db_category = repository.get_category(db, category_id=category_id)
+    db_category = await async_repository.get_category(db, category_id=category_id)
     if db_category is None:
         raise HTTPException(status_code=404, detail=CATEGORY_NOT_FOUND)
 
-    db_category.name = category.name
-    db.commit()
-    db.refresh(db_category)
-
-    category_response = schemas.Category(
-        id=str(db_category.id),
-        name=db_category.name,
-        products=[
-            schemas.Product(
-                id=str(product.id),
-                name=product.name,
-                description=product.description,
-                price=product.price,
-                category=db_category.name,
-            )
-            for product in db_category.products
-        ],
-    )
+    db_category = await async_repository.update_category(db, db_category=db_category, category=category)
+    if db_category is None:
+        raise HTTPException(status_code=500, detail='Erro interno do servidor')
+    await cache.invalidate_menu(f'category:{category_id}')
 
+    category_response = await async_repository.get_category_with_products(db, category_id=category_id)
     return category_response
 
 
 @router.delete('/{category_id}', response_model=schemas.Category)
-def delete_category(
+async def delete_category(
     category_id: str,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
 ):
     """
     Remove uma categoria pelo ID.
@@ -184,7 +213,7 @@ def delete_category(
 
     Args:
         category_id (str): ID da categoria a ser removida.
-        db (Session, opcional): Instância de sessão do banco de dados.
+        db (DBSession, opcional): Instância de sessão do banco de dados.
 
     Returns:
         schemas.Category: A categoria removida.
@@ -197,9 +226,11 @@ def delete_category(
     except (ValueError, IndexError):
         raise HTTPException(status_code=400, detail='Formato de ID de categoria inválido')
 
-    db_category = repository.get_category(db, category_id=category_id_int)
-    if db_category is None:
+    category_response = await async_repository.get_category_with_products(db, category_id=category_id_int)
+    if category_response is None:
         raise HTTPException(status_code=404, detail=CATEGORY_NOT_FOUND)
 
-    repository.delete_category(db, db_category=db_category)
-    return db_category
+    db_category = await async_repository.get_category(db, category_id=category_id_int)
+    await async_repository.delete_category(db, db_category=db_category)
+    await cache.invalidate_menu(f'category:{category_id_int}', 'categories:offset')
+    return category_response
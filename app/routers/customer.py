@@ -1,22 +1,22 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 
-from ..db.database import get_db
+from ..db.database import DBSession, get_read_session, get_session
 from ..model import schemas
-from ..services import repository
+from ..services import async_repository, pagination, security
+from ..services.passwords import password_pool
 from ..tools.logging import logger
 
 router = APIRouter()
 
 
 @router.post('/admin', response_model=schemas.Customer)
-def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)) -> schemas.Customer:
+async def create_customer(customer: schemas.CustomerCreate, db: DBSession = Depends(get_session)) -> schemas.Customer:
     """Cria um novo cliente com as informações fornecidas.
 
     Args:
         customer (schemas.CustomerCreate): Os dados do cliente para criar.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
 
     Raises:
         HTTPException: Se um cliente com o e-mail fornecido já existir.
@@ -24,23 +24,24 @@ def create_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_
     Returns:
         schemas.Customer: O cliente criado.
     """
-    logger.info(f'Criando cliente com o e-mail: {customer.email}')
-    db_customer = repository.get_user_by_email(db, email=customer.email)
+    logger.info('Criando cliente com o e-mail: %s', customer.email)
+    db_customer = await async_repository.get_user_by_email(db, email=customer.email)
     if db_customer:
-        logger.warning(f'Cliente com o e-mail {customer.email} já existe')
+        logger.warning('Cliente com o e-mail %s já existe', customer.email)
         raise HTTPException(status_code=400, detail='E-mail já registrado')
-    created_customer = repository.create_user(db=db, user=customer)
-    logger.info(f'Cliente criado com ID: {created_customer.id}')
+    hashed_password = await password_pool.run(security.get_password_hash, customer.password)
+    created_customer = await async_repository.create_user(db=db, user=customer, hashed_password=hashed_password)
+    logger.info('Cliente criado com ID: %s', created_customer.id)
     return created_customer
 
 
 @router.get('/{customer_id}', response_model=schemas.Customer)
-def read_customer(customer_id: str, db: Session = Depends(get_db)) -> schemas.Customer:
+async def read_customer(customer_id: str, db: DBSession = Depends(get_read_session)) -> schemas.Customer:
     """Recupera um cliente pelo ID.
 
     Args:
         customer_id (str): O ID do cliente para recuperar.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
 
     Raises:
         HTTPException: Se o formato do ID do cliente for inválido ou se o cliente não for encontrado.
@@ -48,44 +49,58 @@ def read_customer(customer_id: str, db: Session = Depends(get_db)) -> schemas.Cu
     Returns:
         schemas.Customer: Os dados do cliente.
     """
-    logger.info(f'Buscando cliente com ID: {customer_id}')
+    logger.info('Buscando cliente com ID: %s', customer_id)
     try:
         customer_id_int = customer_id
     except (ValueError, IndexError):
-        logger.warning(f'Formato inválido de ID de cliente: {customer_id}')
+        logger.warning('Formato inválido de ID de cliente: %s', customer_id)
         raise HTTPException(status_code=400, detail='Formato de ID de cliente inválido')
 
-    db_customer = repository.get_customer(db, customer_id=customer_id_int)
+    db_customer = await async_repository.get_customer(db, customer_id=customer_id_int)
     if db_customer is None:
-        logger.warning(f'Cliente com ID {customer_id} não encontrado')
+        logger.warning('Cliente com ID %s não encontrado', customer_id)
         raise HTTPException(status_code=404, detail='Cliente não encontrado')
     return db_customer
 
 
 @router.get('/', response_model=List[schemas.Customer])
-def read_customers(skip: int = 0, limit: int = 10, db: Session = Depends(get_db)) -> List[schemas.Customer]:
-    """Recupera uma lista de clientes com paginação.
+async def read_customers(
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+) -> List[schemas.Customer]:
+    """Recupera uma lista de clientes, ordenada pelo ID, com paginação.
+
+    O cursor da próxima página é enviado no cabeçalho `X-Next-Cursor`, ausente na última página.
 
     Args:
-        skip (int): O número de registros a serem ignorados.
-        limit (int): O número máximo de registros a serem retornados.
-        db (Session): A sessão do banco de dados.
+        response (Response): A resposta HTTP, que recebe o cabeçalho `X-Next-Cursor`.
+        skip (int): O número de registros a serem ignorados (obsoleto: use `cursor`).
+        limit (int): O número máximo de registros a serem retornados, de 1 a `pagination.MAX_PAGE_SIZE`.
+        cursor (Optional[str]): O cursor da página, recebido em `X-Next-Cursor`.
+        db (DBSession): A sessão do banco de dados.
 
     Returns:
         List[schemas.Customer]: Uma lista de clientes.
     """
-    logger.info(f'Buscando clientes com skip: {skip}, limit: {limit}')
-    customers = repository.get_customers(db, skip=skip, limit=limit)
+    logger.info('Buscando clientes com skip: %s, limit: %s, cursor: %s', skip, limit, cursor)
+    key = pagination.parse_cursor(cursor, int)
+    customers = await async_repository.get_customers(db, skip=skip, limit=limit + 1, after=key[0] if key else None)
+    customers, next_cursor = pagination.paginate(customers, limit, lambda customer: [customer.id])
+    if next_cursor:
+        response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
     return customers
 
 
 @router.post('/identify', response_model=schemas.Customer)
-def identify_customer(cpf: schemas.CPFIdentify, db: Session = Depends(get_db)) -> schemas.Customer:
+async def identify_customer(cpf: schemas.CPFIdentify, db: DBSession = Depends(get_session)) -> schemas.Customer:
     """Identifica um cliente pelo CPF.
 
     Args:
         cpf (schemas.CPFIdentify): O CPF para identificar o cliente.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
 
     Raises:
         HTTPException: Se o cliente com o CPF fornecido não for encontrado.
@@ -93,21 +108,21 @@ def identify_customer(cpf: schemas.CPFIdentify, db: Session = Depends(get_db)) -
     Returns:
         schemas.Customer: O cliente identificado.
     """
-    logger.info(f'Identificando cliente com CPF: {cpf.cpf}')
-    db_customer = repository.get_customer_by_cpf(db, cpf=cpf.cpf)
+    logger.info('Identificando cliente com CPF: %s', cpf.cpf)
+    db_customer = await async_repository.get_customer_by_cpf(db, cpf=cpf.cpf)
     if db_customer is None:
-        logger.warning(f'Cliente com CPF {cpf.cpf} não encontrado')
+        logger.warning('Cliente com CPF %s não encontrado', cpf.cpf)
         raise HTTPException(status_code=404, detail='Cliente não encontrado')
     return db_customer
 
 
 @router.post('/register', response_model=schemas.Customer)
-def register_customer(customer: schemas.CustomerCreate, db: Session = Depends(get_db)) -> schemas.Customer:
+async def register_customer(customer: schemas.CustomerCreate, db: DBSession = Depends(get_session)) -> schemas.Customer:
     """Registra um novo cliente com as informações fornecidas.
 
     Args:
         customer (schemas.CustomerCreate): Os dados do cliente para registrar.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
 
     Raises:
         HTTPException: Se um cliente com o e-mail fornecido já existir.
@@ -115,27 +130,28 @@ def register_customer(customer: schemas.CustomerCreate, db: Session = Depends(ge
     Returns:
         schemas.Customer: O cliente registrado.
     """
-    logger.info(f'Registrando cliente com e-mail: {customer.email}')
-    db_customer = repository.get_user_by_email(db, email=customer.email)
+    logger.info('Registrando cliente com e-mail: %s', customer.email)
+    db_customer = await async_repository.get_user_by_email(db, email=customer.email)
     if db_customer:
-        logger.warning(f'Cliente com o e-mail {customer.email} já existe')
+        logger.warning('Cliente com o e-mail %s já existe', customer.email)
         raise HTTPException(status_code=400, detail='E-mail já registrado')
-    created_customer = repository.create_user(db=db, user=customer)
-    logger.info(f'Cliente registrado com ID: {created_customer.id}')
+    hashed_password = await password_pool.run(security.get_password_hash, customer.password)
+    created_customer = await async_repository.create_user(db=db, user=customer, hashed_password=hashed_password)
+    logger.info('Cliente registrado com ID: %s', created_customer.id)
     return created_customer
 
 
 @router.post('/anonymous', response_model=schemas.Customer)
-def create_anonymous_customer(db: Session = Depends(get_db)) -> schemas.Customer:
+async def create_anonymous_customer(db: DBSession = Depends(get_session)) -> schemas.Customer:
     """Cria um novo cliente anônimo.
 
     Args:
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
 
     Returns:
         schemas.Customer: O cliente anônimo criado.
     """
     logger.info('Criando cliente anônimo')
-    anonymous_customer = repository.create_anonymous_customer(db)
-    logger.info(f'Cliente anônimo criado com ID: {anonymous_customer.id}')
+    anonymous_customer = await async_repository.create_anonymous_customer(db)
+    logger.info('Cliente anônimo criado com ID: %s', anonymous_customer.id)
     return anonymous_customer
@@ -1,11 +1,11 @@
-from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
 
-from ..db.database import get_db
-from ..model import schemas
+from ..db.database import DBSession, get_read_session, get_session
+from ..model import models, schemas
 from ..model.schemas import OrderStatus
-from ..services import repository, security
+from ..services import async_repository, conditional, pagination, security
 from ..tools.logging import logger
 
 router = APIRouter()
@@ -16,16 +16,16 @@ REQUEST_NOT_FOUND_MSG = "Pedido não encontrado"
 
 
 @router.post('/', response_model=schemas.OrderResponse)
-def create_order(
+async def create_order(
     order: schemas.OrderCreate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.OrderResponse:
     """Cria um novo pedido com os dados fornecidos.
 
     Args:
         order (schemas.OrderCreate): Os dados do pedido a ser criado.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
     Raises:
@@ -36,19 +36,19 @@ def create_order(
     """
     logger.info('Endpoint de criação de pedido chamado')
     try:
-        db_order = repository.create_order(db=db, order=order)
+        db_order = await async_repository.create_order(db=db, order=order)
         logger.info('Pedido criado com sucesso')
         return db_order
     except Exception as e:
-        logger.error(f'Erro ao criar o pedido: {e}', exc_info=True)
+        logger.error('Erro ao criar o pedido: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
 
 
 @router.put('/{order_id}/status', response_model=schemas.OrderResponse)
-def update_order_status(
+async def update_order_status(
     order_id: str,
     update_data: schemas.UpdateOrderStatus,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.OrderResponse:
     """Atualiza o status de um pedido existente.
@@ -56,7 +56,7 @@ def update_order_status(
     Args:
         order_id (str): O ID do pedido a ser atualizado.
         update_data (schemas.UpdateOrderStatus): Os dados de atualização de status.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
     Raises:
@@ -66,13 +66,14 @@ def update_order_status(
         schemas.OrderResponse: O pedido atualizado.
     """
     logger.info(
-        f'Endpoint de atualização de status do pedido chamado para o ID do pedido: {order_id} com status: '
-        f'{update_data.status}'
+        'Endpoint de atualização de status do pedido chamado para o ID do pedido: %s com status: %s',
+        order_id,
+        update_data.status,
     )
     try:
         update_data.status = OrderStatus(update_data.status)
     except (ValueError, IndexError):
-        logger.warning(f'Status {update_data.status} não é permitido')
+        logger.warning('Status %s não é permitido', update_data.status)
         raise HTTPException(status_code=422, detail='Status não permitido')
 
     try:
@@ -81,55 +82,124 @@ def update_order_status(
         raise HTTPException(status_code=400, detail=INVALID_ORDER_ID_MSG)
 
     try:
-        db_order = repository.update_order_status(db, order_id=order_id_int, status=update_data.status)
+        db_order = await async_repository.update_order_status(db, order_id=order_id_int, status=update_data.status)
         if db_order is None:
-            logger.warning(f'Pedido não encontrado: {order_id}')
+            logger.warning('Pedido não encontrado: %s', order_id)
             raise HTTPException(status_code=404, detail=REQUEST_NOT_FOUND_MSG)
-        logger.info(f'Status do ID do pedido {order_id} atualizado para {update_data.status}')
+        logger.info('Status do ID do pedido %s atualizado para %s', order_id, update_data.status)
         return db_order
     except Exception as e:
-        logger.error(f'Erro ao atualizar o status do pedido: {e}', exc_info=True)
+        logger.error('Erro ao atualizar o status do pedido: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
 
 
-@router.get('/', response_model=Dict[str, List[schemas.OrderResponse]])
-def read_orders(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
+@router.get('/', response_model=schemas.OrderPage)
+async def read_orders(
+    response: Response,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
-) -> Dict[str, List[schemas.OrderResponse]]:
-    """Recupera uma lista de pedidos com paginação.
+) -> schemas.OrderPage:
+    """Recupera uma lista de pedidos, ordenada por data de criação, com paginação por cursor.
+
+    A página seguinte é obtida enviando o `next_cursor` da resposta no parâmetro `cursor`.
 
     Args:
-        skip (int): O número de registros a serem ignorados.
-        limit (int): O número máximo de registros a serem retornados.
-        db (Session): A sessão do banco de dados.
+        response (Response): A resposta HTTP, que recebe o cabeçalho `X-Next-Cursor`.
+        skip (int): O número de registros a serem ignorados (obsoleto: use `cursor`).
+        limit (int): O número máximo de registros a serem retornados, de 1 a `pagination.MAX_PAGE_SIZE`.
+        cursor (Optional[str]): O cursor da página, recebido em `next_cursor`.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
+    Raises:
+        HTTPException: Se o cursor for inválido ou ocorrer um erro.
+
     Returns:
-        Dict[str, List[schemas.OrderResponse]]: Um dicionário contendo uma lista de pedidos.
+        schemas.OrderPage: Os pedidos da página e o cursor da próxima.
     """
     logger.info('Endpoint de leitura de pedidos chamado')
+    after = pagination.parse_cursor(cursor, datetime.fromisoformat, int)
     try:
-        orders = repository.get_orders(db, skip=skip, limit=limit)
-        filtered_orders = [order for order in orders if order.status != 'Finalizado']
+        orders = await async_repository.get_orders(
+            db, skip=skip, limit=limit + 1, after=after, exclude_finished=True
+        )
+        orders, next_cursor = pagination.paginate(orders, limit, lambda order: [order.created_at.isoformat(), order.id])
+        if next_cursor:
+            response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
         logger.info('Pedidos recuperados com sucesso')
-        return {'orders': filtered_orders}
+        return {'orders': orders, 'next_cursor': next_cursor}
+    except Exception as e:
+        logger.error('Erro ao recuperar os pedidos: %s', e, exc_info=True)
+        raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
+
+
+@router.get('/active', response_model=schemas.OrderPage)
+async def read_active_orders(
+    response: Response,
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: DBSession = Depends(get_read_session),
+    current_user: schemas.Customer = Depends(security.get_current_user),
+) -> schemas.OrderPage:
+    """Recupera a fila da cozinha: os pedidos ativos, ordenados por status e data de criação.
+
+    Os pedidos `Pronto` vêm antes dos `Em preparação`, que vêm antes dos `Recebido`; dentro de cada status,
+    os mais antigos primeiro. Pedidos finalizados não aparecem.
+
+    Args:
+        response (Response): A resposta HTTP, que recebe o cabeçalho `X-Next-Cursor`.
+        limit (int): O número máximo de registros a serem retornados, de 1 a `pagination.MAX_PAGE_SIZE`.
+        cursor (Optional[str]): O cursor da página, recebido em `next_cursor`.
+        db (DBSession): A sessão do banco de dados.
+        current_user (schemas.Customer): O usuário autenticado atualmente.
+
+    Raises:
+        HTTPException: Se o cursor for inválido ou ocorrer um erro.
+
+    Returns:
+        schemas.OrderPage: Os pedidos da página e o cursor da próxima.
+    """
+    logger.info('Endpoint da fila de pedidos ativos chamado')
+    after = pagination.parse_cursor(cursor, int, datetime.fromisoformat, int)
+    try:
+        orders = await async_repository.get_active_orders(db, limit=limit + 1, after=after)
+        orders, next_cursor = pagination.paginate(
+            orders,
+            limit,
+            lambda order: [
+                models.ACTIVE_ORDER_STATUSES.index(order.status), order.created_at.isoformat(), order.id
+            ],
+        )
+        if next_cursor:
+            response.headers[pagination.NEXT_CURSOR_HEADER] = next_cursor
+        logger.info('Pedidos ativos recuperados com sucesso')
+        return {'orders': orders, 'next_cursor': next_cursor}
     except Exception as e:
-        logger.error(f'Erro ao recuperar os pedidos: {e}', exc_info=True)
+        logger.error('Erro ao recuperar os pedidos ativos: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
 
 
 @router.get('/{order_id}', response_model=schemas.OrderCustomerView)
-def read_order(
-    order_id: str, db: Session = Depends(get_db), current_user: schemas.Customer = Depends(security.get_current_user)
+async def read_order(
+    order_id: str,
+    request: Request,
+    response: Response,
+    db: DBSession = Depends(get_read_session),
+    current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.OrderCustomerView:
     """Recupera um pedido específico pelo seu ID.
 
+    A resposta traz um ETag derivado da última atualização do pedido; com `If-None-Match` igual, a rota
+    responde 304 sem carregar o pedido.
+
     Args:
         order_id (str): O ID do pedido a ser recuperado.
-        db (Session): A sessão do banco de dados.
+        request (Request): A requisição HTTP, com o cabeçalho `If-None-Match` opcional.
+        response (Response): A resposta HTTP, que recebe os cabeçalhos `ETag` e `Cache-Control`.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
     Raises:
@@ -138,36 +208,43 @@ def read_order(
     Returns:
         schemas.OrderCustomerView: Os detalhes do pedido.
     """
-    logger.info(f'Endpoint de leitura de pedido chamado para o ID do pedido: {order_id}')
+    logger.info('Endpoint de leitura de pedido chamado para o ID do pedido: %s', order_id)
     try:
         order_id_int = order_id
     except (ValueError, IndexError):
-        logger.warning(f'Formato de ID do pedido inválido: {order_id}')
+        logger.warning('Formato de ID do pedido inválido: %s', order_id)
         raise HTTPException(status_code=400, detail='Formato de ID do pedido inválido')
 
+    version = await async_repository.get_order_version(db, order_id=order_id_int)
+    if version is not None:
+        etag = conditional.make_etag('order', order_id_int, *version)
+        if conditional.etag_matches(request, etag):
+            return conditional.not_modified(etag, conditional.ORDER_CACHE_CONTROL)
+        conditional.set_cache_headers(response, etag, conditional.ORDER_CACHE_CONTROL)
+
     try:
-        db_order = repository.get_order(db, order_id=order_id_int)
+        db_order = await async_repository.get_order(db, order_id=order_id_int)
         if db_order is None:
-            logger.warning(f'Pedido não encontrado: {order_id}')
+            logger.warning('Pedido não encontrado: %s', order_id)
             raise HTTPException(status_code=404, detail='Pedido não encontrado')
-        logger.info(f'Pedido recuperado com sucesso para o ID do pedido: {order_id}')
+        logger.info('Pedido recuperado com sucesso para o ID do pedido: %s', order_id)
         return db_order
     except Exception as e:
-        logger.error(f'Erro ao recuperar o pedido: {e}', exc_info=True)
+        logger.error('Erro ao recuperar o pedido: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
 
 
 @router.post('/checkout', response_model=schemas.OrderResponse)
-def fake_checkout(
+async def fake_checkout(
     order: schemas.OrderCreate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.OrderResponse:
     """Cria um novo pedido como parte de um processo de checkout fictício.
 
     Args:
         order (schemas.OrderCreate): Os dados do pedido a ser criado.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
     Raises:
@@ -178,19 +255,19 @@ def fake_checkout(
     """
     logger.info('Endpoint de checkout fictício chamado')
     try:
-        db_order = repository.create_order(db=db, order=order)
+        db_order = await async_repository.create_order(db=db, order=order)
         logger.info('Pedido de checkout criado com sucesso')
         return db_order
     except Exception as e:
-        logger.error(f'Erro durante o checkout fictício: {e}', exc_info=True)
+        logger.error('Erro durante o checkout fictício: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail=INTERNAL_SERVER_ERROR_MSG)
 
 
 @router.patch('/{order_id}/payment', response_model=schemas.OrderResponse)
-def update_order_payment_status(
+async def update_order_payment_status(
     order_id: str,
     update_data: schemas.UpdateOrderPaymentStatus,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.OrderResponse:
     """Atualiza o status de pagamento um pedido criado.
@@ -198,7 +275,7 @@ def update_order_payment_status(
     Args:
         order_id (str): O ID do pedido a ser atualizado.
         update_data (schemas.UpdateOrderPaymentStatus): Os dados de atualização de status de pagamento.
-        db (Session): A sessão do banco de dados.
+        db (DBSession): A sessão do banco de dados.
         current_user (schemas.Customer): O usuário autenticado atualmente.
 
     Raises:
@@ -208,43 +285,44 @@ def update_order_payment_status(
         schemas.OrderResponse: O pedido atualizado.
     """
     logger.info(
-        f'Endpoint de atualização de status do pedido chamado para o ID do pedido: {order_id} com status: '
-        f'{update_data.payment_status}'
+        'Endpoint de atualização de status do pedido chamado para o ID do pedido: %s com status: %s',
+        order_id,
+        update_data.payment_status,
     )
     try:
         order_id_int = order_id
     except (ValueError, IndexError):
-        logger.warning(f'Formato de ID do pedido inválido: {order_id}')
+        logger.warning('Formato de ID do pedido inválido: %s', order_id)
         raise HTTPException(status_code=400, detail='Formato de ID do pedido inválido')
 
     try:
-        db_order = repository.update_order_payment_status(
+        db_order = await async_repository.update_order_payment_status(
             db, order_id=order_id_int, payment_status=update_data.payment_status
         )
         if db_order is None:
-            logger.warning(f'Pedido não encontrado: {order_id}')
+            logger.warning('Pedido não encontrado: %s', order_id)
             raise HTTPException(status_code=404, detail='Pedido não encontrado')
-        logger.info(f'Status de pagamento do pedido de ID {order_id} atualizado para {update_data.payment_status}')
+        logger.info('Status de pagamento do pedido de ID %s atualizado para %s', order_id, update_data.payment_status)
         return db_order
     except Exception as e:
-        logger.error(f'Erro ao atualizar o status de pagamento do pedido: {e}', exc_info=True)
+        logger.error('Erro ao atualizar o status de pagamento do pedido: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail='Erro Interno do Servidor')
 
 
 @router.post('/webhook', response_model=schemas.WebhookResponse)
-def create_webhook(
+async def create_webhook(
     webhook: schemas.WebhookCreate,
-    db: Session = Depends(get_db),
+    db: DBSession = Depends(get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.WebhookResponse:
 
     logger.info('Endpoint de criação de webhook chamado')
     try:
-        db_webhook = repository.create_webhook(db=db, webhook=webhook)
+        db_webhook = await async_repository.create_webhook(db=db, webhook=webhook)
         logger.info(
-            f'Endpoint de atualização de status do pedido chamado para o ID de pedido: {webhook.order_id}'
+            'Endpoint de atualização de status do pedido chamado para o ID de pedido: %s', webhook.order_id
         )
         return db_webhook
     except Exception as e:
-        logger.error(f'Erro ao criar o pedido: {e}', exc_info=True)
+        logger.error('Erro ao criar o pedido: %s', e, exc_info=True)
         raise HTTPException(status_code=500, detail='Erro Interno do Servidor')
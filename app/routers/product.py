@@ -1,25 +1,24 @@
-from typing import Dict, List
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
+from typing import Dict, List, Optional, Set, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 
 from ..db import database
-from ..model import models, schemas
-from ..services import repository, security
+from ..model import schemas
+from ..services import async_repository, cache, conditional, pagination, repository, security, snapshot
 
 router = APIRouter()
 
 
 @router.post('/', response_model=schemas.Product)
-def create_product(
+async def create_product(
     product: schemas.ProductCreate,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.Product:
     """Cria um novo produto com os dados fornecidos.
 
     Args:
         product (schemas.ProductCreate): Dados para criação do produto.
-        db (Session): Sessão do banco de dados.
+        db (DBSession): Sessão do banco de dados.
         current_user (schemas.Customer): Usuário autenticado atualmente.
 
     Raises:
@@ -28,16 +27,12 @@ def create_product(
     Returns:
         schemas.Product: O produto criado com seus detalhes.
     """
-    db_category = repository.get_category(db, category_id=product.category_id)
+    db_category = await async_repository.get_category(db, category_id=product.category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail='Category not found')
 
-    db_product = models.Product(
-        name=product.name, description=product.description, price=product.price, category_id=db_category.id
-    )
-    db.add(db_product)
-    db.commit()
-    db.refresh(db_product)
+    db_product = await async_repository.create_product(db, product=product)
+    await cache.invalidate_menu(f'category:{db_category.id}', 'products:tail', 'products:offset')
 
     product_response = schemas.Product(
         id=str(db_product.id),
@@ -49,40 +44,91 @@ def create_product(
     return product_response
 
 
+async def build_products_page(
+    db: database.DBSession, skip: int, limit: int, cursor: Optional[str]
+) -> Tuple[snapshot.Snapshot, Set[str]]:
+    """Compila uma página da listagem de produtos em um snapshot do cardápio.
+
+    Args:
+        db (DBSession): Sessão do banco de dados.
+        skip (int): Número de registros a serem ignorados.
+        limit (int): Número máximo de registros.
+        cursor (Optional[str]): Cursor da página.
+
+    Raises:
+        HTTPException: Se o cursor for inválido.
+
+    Returns:
+        Tuple[snapshot.Snapshot, Set[str]]: A página compilada e as tags dos produtos e categorias que contém.
+    """
+    key = pagination.parse_cursor(cursor, int)
+    products = await async_repository.get_products(db, skip=skip, limit=limit + 1, after=key[0] if key else None)
+    products, next_cursor = pagination.paginate(products, limit, lambda product: [product.id])
+    tags = {f'product:{product.id}' for product in products}
+    tags.update(f'category:{product.category_id}' for product in products)
+    if next_cursor is None:
+        tags.add('products:tail')
+    if key is None and skip:
+        tags.add('products:offset')
+    headers = {pagination.NEXT_CURSOR_HEADER: next_cursor} if next_cursor else {}
+    return snapshot.Snapshot(repository.categorize_products(products), headers), tags
+
+cache.register_menu_builder('products', build_products_page)
+
+
 @router.get('/', response_model=Dict[str, List[schemas.Product]])
-def read_products(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(database.get_db),
+async def read_products(
+    request: Request,
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=pagination.MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    db: database.DBSession = Depends(database.get_read_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> Dict[str, List[schemas.Product]]:
-    """Recupera uma lista de produtos com paginação.
+    """Recupera uma lista de produtos, ordenada pelo ID, com paginação.
+
+    Como a resposta é agrupada por categoria, o cursor da próxima página é enviado no cabeçalho
+    `X-Next-Cursor`, ausente na última página. Cada página é servida de um snapshot do cardápio, já
+    serializado em JSON e em gzip, que é recompilado em segundo plano quando uma escrita altera algum
+    dos produtos ou categorias que contém.
+
+    A resposta traz um ETag derivado da versão do cardápio; com `If-None-Match` igual, a rota responde
+    304 sem consultar os produtos.
 
     Args:
-        skip (int): Número de registros a serem ignorados.
-        limit (int): Número máximo de registros a serem retornados.
-        db (Session): Sessão do banco de dados.
+        request (Request): Requisição HTTP, com os cabeçalhos `If-None-Match` e `Accept-Encoding` opcionais.
+        skip (int): Número de registros a serem ignorados (obsoleto: use `cursor`).
+        limit (int): Número máximo de registros a serem retornados, de 1 a `pagination.MAX_PAGE_SIZE`.
+        cursor (Optional[str]): Cursor da página, recebido em `X-Next-Cursor`.
+        db (DBSession): Sessão do banco de dados.
         current_user (schemas.Customer): Usuário autenticado atualmente.
 
     Returns:
         Dict[str, List[schemas.Product]]: Um dicionário contendo uma lista de produtos categorizados.
     """
-    products = repository.get_products(db, skip=skip, limit=limit)
-    categorized_products = repository.categorize_products(products)
-    return categorized_products
+    version = await cache.get_menu_version(db)
+    # Representações com e sem gzip têm bytes diferentes e, portanto, ETags diferentes
+    etag = conditional.make_etag('products', version, skip, limit, cursor, snapshot.accepts_gzip(request))
+    if conditional.etag_matches(request, etag):
+        return conditional.not_modified(etag, conditional.PRIVATE_MENU_CACHE_CONTROL, vary='Accept-Encoding')
+
+    page = await cache.get_menu_entry(db, ('products', skip, limit, cursor))
+    return snapshot.snapshot_response(
+        request, page, {'ETag': etag, 'Cache-Control': conditional.PRIVATE_MENU_CACHE_CONTROL}
+    )
 
 
 @router.get('/{product_id}', response_model=schemas.Product)
-def read_product(
+async def read_product(
     product_id: int,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_read_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.Product:
     """Recupera um produto específico pelo seu ID.
 
     Args:
         product_id (int): ID do produto a ser recuperado.
-        db (Session): Sessão do banco de dados.
+        db (DBSession): Sessão do banco de dados.
         current_user (schemas.Customer): Usuário autenticado atualmente.
 
     Raises:
@@ -91,7 +137,7 @@ def read_product(
     Returns:
         schemas.Product: Detalhes do produto.
     """
-    db_product = repository.get_product(db, product_id=product_id)
+    db_product = await async_repository.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail='Product not found')
 
@@ -106,10 +152,10 @@ def read_product(
 
 
 @router.put('/{product_id}', response_model=schemas.Product)
-def update_product(
+async def update_product(
     product_id: int,
     product: schemas.ProductCreate,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.Product:
     """Atualiza um produto existente com os dados fornecidos.
@@ -117,7 +163,7 @@ def update_product(
     Args:
         product_id (int): ID do produto a ser atualizado.
         product (schemas.ProductCreate): Novos dados para o produto.
-        db (Session): Sessão do banco de dados.
+        db (DBSession): Sessão do banco de dados.
         current_user (schemas.Customer): Usuário autenticado atualmente.
 
     Raises:
@@ -126,21 +172,19 @@ def update_product(
     Returns:
         schemas.Product: O produto atualizado com seus detalhes.
     """
-    db_product = repository.get_product(db, product_id=product_id)
+    db_product = await async_repository.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail='Product not found')
 
-    db_category = repository.get_category(db, category_id=product.category_id)
+    db_category = await async_repository.get_category(db, category_id=product.category_id)
     if not db_category:
         raise HTTPException(status_code=404, detail='Category not found')
 
-    db_product.name = product.name
-    db_product.description = product.description
-    db_product.price = product.price
-    db_product.category_id = db_category.id
-
-    db.commit()
-    db.refresh(db_product)
+    previous_category_id = db_product.category_id
+    db_product = await async_repository.update_product(db, db_product=db_product, product=product)
+    await cache.invalidate_menu(
+        f'product:{product_id}', f'category:{previous_category_id}', f'category:{db_category.id}'
+    )
 
     product_response = schemas.Product(
         id=str(db_product.id),
@@ -153,16 +197,16 @@ def update_product(
 
 
 @router.delete('/{product_id}', response_model=schemas.Product)
-def delete_product(
+async def delete_product(
     product_id: int,
-    db: Session = Depends(database.get_db),
+    db: database.DBSession = Depends(database.get_session),
     current_user: schemas.Customer = Depends(security.get_current_user),
 ) -> schemas.Product:
     """Exclui um produto pelo seu ID.
 
     Args:
         product_id (int): ID do produto a ser excluído.
-        db (Session): Sessão do banco de dados.
+        db (DBSession): Sessão do banco de dados.
         current_user (schemas.Customer): Usuário autenticado atualmente.
 
     Raises:
@@ -171,7 +215,7 @@ def delete_product(
     Returns:
         schemas.Product: Detalhes do produto excluído.
     """
-    db_product = repository.get_product(db, product_id=product_id)
+    db_product = await async_repository.get_product(db, product_id=product_id)
     if db_product is None:
         raise HTTPException(status_code=404, detail='Product not found')
 
@@ -183,5 +227,6 @@ def delete_product(
         category=db_product.category.name,
     )
 
-    repository.delete_product(db=db, product_id=product_id)
+    await async_repository.delete_product(db=db, product_id=product_id)
+    await cache.invalidate_menu(f'product:{product_id}', f'category:{db_product.category_id}', 'products:offset')
     return product_response
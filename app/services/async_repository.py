@@ -0,0 +1,73 @@
+from typing import Any, Callable, Coroutine
+
+from ..db.database import DBSession, run_db
+from . import repository
+
+def _awaitable(name: str) -> Callable[..., Coroutine[Any, Any, Any]]:
+    """Cria a versão assíncrona de uma função do módulo `repository`.
+
+    A função original é resolvida a cada chamada, de modo que substituições feitas em
+    `repository` (por exemplo, mocks nos testes) continuam valendo.
+
+    Args:
+        name (str): Nome da função em `repository`.
+
+    Returns:
+        Callable[..., Coroutine[Any, Any, Any]]: Corrotina que recebe a sessão e os mesmos argumentos da original.
+    """
+
+    async def wrapper(db: DBSession, *args: Any, **kwargs: Any) -> Any:
+        return await run_db(db, getattr(repository, name), *args, **kwargs)
+
+    # Sem `functools.wraps`: `repository` pode estar parcialmente importado (ele importa `security`)
+    wrapper.__name__ = wrapper.__qualname__ = name
+    return wrapper
+
+# Tokens e usuários
+create_token = _awaitable('create_token')
+mark_token_as_used = _awaitable('mark_token_as_used')
+is_token_used = _awaitable('is_token_used')
+consume_token = _awaitable('consume_token')
+create_refresh_token = _awaitable('create_refresh_token')
+rotate_refresh_token = _awaitable('rotate_refresh_token')
+revoke_refresh_family = _awaitable('revoke_refresh_family')
+delete_expired_tokens = _awaitable('delete_expired_tokens')
+delete_expired_refresh_tokens = _awaitable('delete_expired_refresh_tokens')
+get_user_by_email = _awaitable('get_user_by_email')
+create_user = _awaitable('create_user')
+
+# Clientes
+create_anonymous_customer = _awaitable('create_anonymous_customer')
+get_customer_by_cpf = _awaitable('get_customer_by_cpf')
+get_customers_count = _awaitable('get_customers_count')
+get_customer = _awaitable('get_customer')
+get_customers = _awaitable('get_customers')
+create_customer = _awaitable('create_customer')
+
+# Produtos
+get_product = _awaitable('get_product')
+get_products = _awaitable('get_products')
+create_product = _awaitable('create_product')
+update_product = _awaitable('update_product')
+delete_product = _awaitable('delete_product')
+get_menu_version = _awaitable('get_menu_version')
+
+# Pedidos
+create_order = _awaitable('create_order')
+update_order_status = _awaitable('update_order_status')
+update_order_payment_status = _awaitable('update_order_payment_status')
+create_webhook = _awaitable('create_webhook')
+create_tracking = _awaitable('create_tracking')
+get_orders = _awaitable('get_orders')
+get_active_orders = _awaitable('get_active_orders')
+get_order = _awaitable('get_order')
+get_order_version = _awaitable('get_order_version')
+
+# Categorias
+get_categories = _awaitable('get_categories')
+get_category_with_products = _awaitable('get_category_with_products')
+get_category = _awaitable('get_category')
+get_category_by_name = _awaitable('get_category_by_name')
+create_category = _awaitable('create_category')
+update_category = _awaitable('update_category')
+delete_category = _awaitable('delete_category')
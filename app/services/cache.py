@@ -0,0 +1,434 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from os import environ as env
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+
+from aioredis import Redis, from_url
+
+from ..db.database import DBSession, session_scope
+from ..model import schemas
+from ..tools.logging import logger
+from . import async_repository
+
+# Canal do Redis por onde as réplicas da aplicação avisam umas às outras sobre escritas no cardápio
+INVALIDATION_CHANNEL = 'menu-cache:invalidate'
+
+# Toda escrita no cardápio muda a sua versão, guardada no cache com esta tag
+MENU_VERSION_TAG = 'menu:version'
+
+class TTLCache:
+    """
+    Cache em memória com tamanho máximo, expiração e invalidação por tags.
+
+    Cada entrada é associada a tags (ex.: `product:3`, `category:1`) que descrevem os dados de que ela
+    depende; uma escrita invalida só as entradas marcadas com as tags que alterou. Acima de `maxsize`
+    entradas, a usada há mais tempo é descartada.
+
+    Attributes:
+        maxsize: Número máximo de entradas.
+        ttl: Tempo de vida (em segundos) de cada entrada; limita quanto um dado pode ficar desatualizado
+            se uma invalidação se perder.
+        hits: Número de leituras atendidas pelo cache.
+        misses: Número de leituras que não encontraram uma entrada válida.
+        generation: Contador de invalidações; permite descartar um valor lido do banco antes de uma
+            invalidação concorrente.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        Inicializa o cache vazio.
+
+        Args:
+            maxsize: Número máximo de entradas.
+            ttl: Tempo de vida (em segundos) de cada entrada. Com 0, nada é armazenado.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.generation = 0
+        self._entries: 'OrderedDict[Hashable, Tuple[float, Any, Tuple[str, ...]]]' = OrderedDict()
+        self._keys_by_tag: Dict[str, Set[Hashable]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """
+        Obtém o valor de uma entrada que ainda não expirou.
+
+        Args:
+            key: Chave da entrada.
+
+        Returns:
+            Optional[Any]: O valor armazenado, ou None se ausente ou expirado.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] <= time.monotonic():
+                if entry is not None:
+                    self._discard(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(
+        self,
+        key: Hashable,
+        value: Any,
+        tags: Iterable[str] = (),
+        generation: Optional[int] = None,
+        ttl: Optional[float] = None,
+    ) -> None:
+        """
+        Armazena um valor, descartando a entrada usada há mais tempo se o cache estiver cheio.
+
+        Args:
+            key: Chave da entrada.
+            value: Valor a armazenar.
+            tags: Tags dos dados de que o valor depende.
+            generation: Valor de `generation` lido antes de consultar o banco. Se houve uma invalidação
+                desde então, o valor pode estar desatualizado e não é armazenado.
+            ttl: Tempo de vida desta entrada, em segundos, se menor que o do cache (ex.: até a
+                expiração de um token).
+        """
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        tags = tuple(tags)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._discard(key)
+            self._entries[key] = (time.monotonic() + ttl, value, tags)
+            for tag in tags:
+                self._keys_by_tag.setdefault(tag, set()).add(key)
+            while len(self._entries) > self.maxsize:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, *tags: str) -> List[Hashable]:
+        """
+        Remove as entradas marcadas com qualquer uma das tags.
+
+        Args:
+            *tags: Tags dos dados alterados.
+
+        Returns:
+            List[Hashable]: As chaves das entradas removidas.
+        """
+        with self._lock:
+            self.generation += 1
+            keys = set().union(*(self._keys_by_tag.get(tag, ()) for tag in tags))
+            for key in keys:
+                self._discard(key)
+            return list(keys)
+
+    def clear(self) -> None:
+        """
+        Remove todas as entradas.
+        """
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+            self._keys_by_tag.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _discard(self, key: Hashable) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        for tag in entry[2]:
+            keys = self._keys_by_tag.get(tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_tag[tag]
+
+class RedisInvalidation:
+    """
+    Propaga invalidações do cache entre as réplicas da aplicação via pub/sub do Redis.
+
+    Cada réplica publica as tags que invalidou e assina o canal para aplicar as invalidações das demais.
+    Se a conexão cair, as mensagens do intervalo se perdem: ao reconectar, o cache local é esvaziado.
+
+    Attributes:
+        cache: Cache local a invalidar.
+        redis_url: A URL de conexão ao Redis.
+        channel: Canal de pub/sub.
+        on_invalidate: Chamada com as chaves removidas por uma invalidação remota.
+        origin: Identificador desta réplica, para ignorar as próprias mensagens.
+    """
+
+    def __init__(
+        self,
+        cache: TTLCache,
+        redis_url: str,
+        channel: str = INVALIDATION_CHANNEL,
+        on_invalidate: Optional[Callable[[List[Hashable]], None]] = None,
+    ):
+        """
+        Inicializa a propagação sem conectar ao Redis.
+
+        Args:
+            cache: Cache local a invalidar.
+            redis_url: A URL de conexão ao Redis.
+            channel: Canal de pub/sub.
+            on_invalidate: Chamada com as chaves removidas por uma invalidação remota.
+        """
+        self.cache = cache
+        self.redis_url = redis_url
+        self.channel = channel
+        self.on_invalidate = on_invalidate
+        self.origin = uuid.uuid4().hex
+        self.redis: Optional[Redis] = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def start(self) -> None:
+        """
+        Conecta ao Redis e passa a ouvir as invalidações das outras réplicas.
+        """
+        self.redis = await from_url(self.redis_url, decode_responses=True)
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        """
+        Para de ouvir as invalidações e fecha a conexão.
+        """
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+    async def publish(self, tags: Iterable[str]) -> None:
+        """
+        Avisa as outras réplicas de que as tags foram invalidadas.
+
+        Uma falha é apenas registrada: a escrita já foi feita, e o TTL limita o tempo em que as outras
+        réplicas servem o dado antigo.
+
+        Args:
+            tags: Tags invalidadas.
+        """
+        if self.redis is None:
+            return
+        try:
+            await self.redis.publish(self.channel, json.dumps({'origin': self.origin, 'tags': list(tags)}))
+        except Exception as e:
+            logger.warning('Failed to publish cache invalidation: %s', e)
+
+    def apply(self, message: str) -> None:
+        """
+        Aplica uma invalidação recebida de outra réplica.
+
+        Args:
+            message: Mensagem publicada por `publish`.
+        """
+        payload = json.loads(message)
+        if payload.get('origin') != self.origin:
+            removed = self.cache.invalidate(*payload.get('tags', []))
+            logger.debug("Applied remote cache invalidation %s: %s entries removed", payload.get('tags'), len(removed))
+            if self.on_invalidate is not None:
+                self.on_invalidate(removed)
+
+    async def _listen(self) -> None:
+        connected_before = False
+        while True:
+            pubsub = self.redis.pubsub()
+            try:
+                await pubsub.subscribe(self.channel)
+                if connected_before:
+                    # Invalidações publicadas enquanto a conexão estava fora se perderam
+                    self.cache.clear()
+                connected_before = True
+                async for message in pubsub.listen():
+                    if message.get('type') == 'message':
+                        self.apply(message['data'])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning('Cache invalidation listener disconnected: %s', e)
+                await asyncio.sleep(1)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+# Produtos e categorias mudam poucas vezes ao dia, mas são lidos por todos os totens a cada tela
+menu_cache = TTLCache(maxsize=int(env.get('MENU_CACHE_SIZE', '256')), ttl=float(env.get('MENU_CACHE_TTL', '30')))
+
+# Clientes autenticados: consultados a cada requisição com token, mas nunca alterados pela API
+customer_cache = TTLCache(
+    maxsize=int(env.get('CUSTOMER_CACHE_SIZE', '1024')), ttl=float(env.get('CUSTOMER_CACHE_TTL', '60'))
+)
+
+# Claims de JWTs já verificados, pelo hash do token; cada entrada expira junto com o token
+claims_cache = TTLCache(maxsize=int(env.get('JWT_CACHE_SIZE', '4096')), ttl=float(env.get('JWT_CACHE_TTL', '300')))
+
+# Constrói uma entrada do cardápio a partir dos parâmetros da sua chave; retorna o valor e as tags
+MenuBuilder = Callable[..., Awaitable[Tuple[Any, Iterable[str]]]]
+
+# Construtores das entradas do cardápio pelo tipo (primeiro elemento da chave), registrados pelos roteadores
+menu_builders: Dict[str, MenuBuilder] = {}
+
+# Recompila em segundo plano as entradas invalidadas, para que a leitura seguinte já as encontre prontas
+MENU_SNAPSHOT_REBUILD: bool = env.get('MENU_SNAPSHOT_REBUILD', 'true').lower() == 'true'
+_rebuild_tasks: Set[asyncio.Task] = set()
+
+def register_menu_builder(kind: str, build: MenuBuilder) -> None:
+    """Registra o construtor das entradas do cardápio de um tipo.
+
+    Args:
+        kind (str): Tipo da entrada, o primeiro elemento da chave (ex.: `products`).
+        build (MenuBuilder): Recebe a sessão e os demais elementos da chave e retorna o valor e suas tags.
+    """
+    menu_builders[kind] = build
+
+async def get_menu_entry(db: DBSession, key: Tuple[Any, ...]) -> Any:
+    """Obtém uma entrada do cardápio do cache, construindo-a em caso de ausência.
+
+    Args:
+        db (DBSession): Sessão do banco de dados.
+        key (Tuple[Any, ...]): Tipo da entrada seguido dos parâmetros do construtor.
+
+    Returns:
+        Any: O valor da entrada.
+    """
+    value = menu_cache.get(key)
+    if value is None:
+        generation = menu_cache.generation
+        value, tags = await menu_builders[key[0]](db, *key[1:])
+        menu_cache.set(key, value, tags, generation=generation)
+    return value
+
+async def rebuild_menu(keys: Iterable[Hashable]) -> None:
+    """Reconstrói entradas do cardápio, com uma sessão própria.
+
+    Falhas são apenas registradas: a entrada será construída pela próxima leitura.
+
+    Args:
+        keys (Iterable[Hashable]): Chaves das entradas a reconstruir.
+    """
+    keys = [key for key in keys if isinstance(key, tuple) and key and key[0] in menu_builders]
+    if not keys:
+        return
+    try:
+        async with session_scope() as db:
+            for key in keys:
+                await get_menu_entry(db, key)
+        logger.debug('Rebuilt %s menu cache entries', len(keys))
+    except Exception as e:
+        logger.warning('Failed to rebuild menu cache entries: %s', e)
+
+def schedule_menu_rebuild(keys: List[Hashable]) -> None:
+    """Agenda a reconstrução das entradas removidas por uma invalidação.
+
+    Args:
+        keys (List[Hashable]): Chaves das entradas removidas.
+    """
+    if not MENU_SNAPSHOT_REBUILD or not keys:
+        return
+    task = asyncio.get_running_loop().create_task(rebuild_menu(keys))
+    # O event loop guarda só referências fracas às tarefas
+    _rebuild_tasks.add(task)
+    task.add_done_callback(_rebuild_tasks.discard)
+
+# Propagação entre réplicas, habilitada quando `REDIS_URL` está definida
+REDIS_URL: str = env.get('REDIS_URL', '')
+
+# Na AWS Lambda o Mangum executa o lifespan a cada invocação, e o ambiente fica congelado entre elas:
+# um assinante do pub/sub conectaria e desconectaria a cada requisição sem receber nada no intervalo
+IS_LAMBDA = bool(env.get('AWS_LAMBDA_FUNCTION_NAME'))
+menu_invalidation: Optional[RedisInvalidation] = (
+    RedisInvalidation(menu_cache, REDIS_URL, on_invalidate=schedule_menu_rebuild) if REDIS_URL else None
+)
+
+async def invalidate_menu(*tags: str) -> None:
+    """Invalida as entradas do cardápio que dependem das tags, nesta e nas demais réplicas.
+
+    As entradas removidas são reconstruídas em segundo plano.
+
+    Args:
+        *tags: Tags dos dados alterados (ex.: `product:3`, `category:1`, `products:tail`).
+    """
+    tags = (*tags, MENU_VERSION_TAG)
+    removed = menu_cache.invalidate(*tags)
+    logger.debug('Invalidated menu cache tags %s: %s entries removed', tags, len(removed))
+    schedule_menu_rebuild(removed)
+    if menu_invalidation is not None:
+        await menu_invalidation.publish(tags)
+
+async def get_menu_version(db: DBSession) -> str:
+    """Obtém a versão do cardápio usada nos ETags, do cache ou do banco.
+
+    Args:
+        db (DBSession): Sessão do banco de dados.
+
+    Returns:
+        str: A versão do cardápio.
+    """
+    version = menu_cache.get(MENU_VERSION_TAG)
+    if version is None:
+        generation = menu_cache.generation
+        version = await async_repository.get_menu_version(db)
+        menu_cache.set(MENU_VERSION_TAG, version, [MENU_VERSION_TAG], generation=generation)
+    return version
+
+async def start_menu_invalidation() -> None:
+    """Inicia a propagação de invalidações do cardápio pelo Redis, se configurada.
+
+    Não é iniciada na AWS Lambda: lá o cache de cada ambiente depende só do `MENU_CACHE_TTL`.
+
+    Returns:
+        None
+    """
+    if menu_invalidation is None or IS_LAMBDA:
+        return
+    try:
+        await menu_invalidation.start()
+        logger.info('Menu cache invalidation subscribed to Redis')
+    except Exception as e:
+        logger.warning('Menu cache invalidation disabled, Redis unavailable: %s', e)
+
+async def stop_menu_invalidation() -> None:
+    """Encerra a propagação de invalidações do cardápio.
+
+    Returns:
+        None
+    """
+    if menu_invalidation is not None:
+        await menu_invalidation.stop()
+
+async def get_customer(db: DBSession, customer_id: int) -> Optional[schemas.Customer]:
+    """Obtém um cliente pelo ID, do cache ou do banco.
+
+    Args:
+        db (DBSession): Sessão do banco de dados.
+        customer_id (int): ID do cliente.
+
+    Returns:
+        Optional[schemas.Customer]: O cliente, ou None se não existir (a ausência não é guardada).
+    """
+    key = ('customer', int(customer_id))
+    customer = customer_cache.get(key)
+    if customer is None:
+        db_customer = await async_repository.get_customer(db, customer_id=customer_id)
+        if db_customer is None:
+            return None
+        customer = schemas.Customer(
+            id=db_customer.id, name=db_customer.name, email=db_customer.email, cpf=db_customer.cpf
+        )
+        customer_cache.set(key, customer, [f'customer:{customer.id}'])
+    return customer
@@ -0,0 +1,77 @@
+import hashlib
+import json
+from os import environ as env
+from typing import Any, Optional
+
+from fastapi import Request, Response
+
+MENU_HTTP_MAX_AGE = int(env.get('MENU_HTTP_MAX_AGE', '30'))
+
+# Cardápio público: igual para todos os clientes, pode ser guardado por caches compartilhados (API Gateway, ingress)
+MENU_CACHE_CONTROL = f'public, max-age={MENU_HTTP_MAX_AGE}'
+
+# Cardápio em rotas autenticadas: só o próprio cliente pode guardar; um cache compartilhado não pode servir
+# a resposta de um cliente autenticado a outro
+PRIVATE_MENU_CACHE_CONTROL = f'private, max-age={MENU_HTTP_MAX_AGE}'
+
+# Pedidos: só o próprio cliente pode guardar, e deve revalidar a cada leitura
+ORDER_CACHE_CONTROL = 'private, no-cache'
+
+def make_etag(*parts: Any) -> str:
+    """Gera um ETag forte a partir da versão dos dados e dos parâmetros da representação.
+
+    Args:
+        *parts (Any): Versão dos dados e parâmetros da requisição que alteram a resposta, serializáveis em JSON.
+
+    Returns:
+        str: O ETag, entre aspas.
+    """
+    digest = hashlib.sha256(json.dumps(parts, default=str, separators=(',', ':')).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Verifica se o cliente já possui a representação identificada pelo ETag.
+
+    Segue a comparação fraca exigida para `If-None-Match` (RFC 9110): o prefixo `W/` é ignorado.
+
+    Args:
+        request (Request): A requisição atual.
+        etag (str): O ETag da representação atual.
+
+    Returns:
+        bool: True se algum dos ETags de `If-None-Match` corresponder (ou se o cabeçalho for `*`).
+    """
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    candidates = (candidate.strip() for candidate in header.split(','))
+    return any(candidate.removeprefix('W/') == etag for candidate in candidates)
+
+def not_modified(etag: str, cache_control: str, vary: Optional[str] = None) -> Response:
+    """Cria a resposta 304, sem corpo, para um cliente que já possui a representação atual.
+
+    Args:
+        etag (str): O ETag da representação atual.
+        cache_control (str): Valor do cabeçalho `Cache-Control`.
+        vary (Optional[str]): Valor do cabeçalho `Vary`, se a representação depender de cabeçalhos da requisição.
+
+    Returns:
+        Response: A resposta 304 Not Modified.
+    """
+    headers = {'ETag': etag, 'Cache-Control': cache_control}
+    if vary:
+        headers['Vary'] = vary
+    return Response(status_code=304, headers=headers)
+
+def set_cache_headers(response: Response, etag: str, cache_control: str) -> None:
+    """Adiciona os cabeçalhos `ETag` e `Cache-Control` a uma resposta.
+
+    Args:
+        response (Response): A resposta HTTP.
+        etag (str): O ETag da representação.
+        cache_control (str): Valor do cabeçalho `Cache-Control`.
+    """
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = cache_control
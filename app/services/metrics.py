@@ -0,0 +1,206 @@
+import json
+import threading
+import time
+from os import environ as env
+from typing import Any, Callable, Dict, Iterable, List, Optional
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+
+from prometheus_client import REGISTRY, Histogram, make_wsgi_app
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+from prometheus_client.exposition import ThreadingWSGIServer
+from prometheus_client.registry import Collector
+from sqlalchemy import event
+
+from ..db import database
+from ..db.pool import pool_status
+from ..middleware.metrics import request_sql
+from ..tools import logging as app_logging
+from ..tools.logging import logger
+from .cache import claims_cache, customer_cache, menu_cache
+from .passwords import password_pool
+from .token_ledger import token_ledger
+
+# Porta do servidor de métricas, separado da aplicação pública; 0 o desabilita
+METRICS_PORT = int(env.get('METRICS_PORT', '9100'))
+METRICS_ADDR = env.get('METRICS_ADDR', '0.0.0.0')
+
+IS_LAMBDA = bool(env.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+POOL_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Tempo aguardando uma conexão livre no pool, por pool.',
+    ('pool',),
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+
+_instrumented = set()
+_server: Optional[WSGIServer] = None
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Marca o início do comando, se ele pertencer a uma requisição medida."""
+    if context is not None and request_sql.get() is not None:
+        context._metrics_start = time.perf_counter()
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    """Soma o comando e o seu tempo aos contadores da requisição em andamento."""
+    sql = request_sql.get()
+    if sql is None:
+        return
+    sql[0] += 1
+    start = getattr(context, '_metrics_start', None)
+    if start is not None:
+        sql[1] += time.perf_counter() - start
+
+def instrument_engines() -> None:
+    """Registra os eventos de SQL e a medição da espera por conexão em todos os engines da aplicação.
+
+    Pode ser chamada mais de uma vez: cada engine é instrumentado uma única vez.
+
+    Returns:
+        None
+    """
+    for name, bind in database.get_engines().items():
+        if id(bind) in _instrumented:
+            continue
+        _instrumented.add(id(bind))
+        event.listen(bind, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(bind, 'after_cursor_execute', _after_cursor_execute)
+        stats = getattr(bind.pool, 'stats', None)
+        if stats is not None:
+            stats.observer = POOL_WAIT.labels(name).observe
+
+class ComponentCollector(Collector):
+    """
+    Métricas lidas na coleta a partir dos contadores que os componentes já mantêm.
+
+    Não custa nada no caminho das requisições: os valores só são lidos quando o Prometheus consulta
+    o servidor de métricas.
+    """
+
+    def describe(self) -> Iterable[Metric]:
+        """
+        Não descreve as métricas no registro, para não consultar os componentes na importação.
+
+        Returns:
+            Iterable[Metric]: Lista vazia.
+        """
+        return []
+
+    def collect(self) -> Iterable[Metric]:
+        """
+        Lê os contadores dos pools, do pool de senhas, do registro de tokens, dos caches e dos logs.
+
+        Returns:
+            Iterable[Metric]: As métricas com os valores atuais.
+        """
+        connections = GaugeMetricFamily(
+            'db_pool_connections', 'Conexões de cada pool por estado.', labels=('pool', 'state')
+        )
+        timeouts = CounterMetricFamily(
+            'db_pool_checkout_timeouts', 'Checkouts que esgotaram o tempo limite do pool.', labels=('pool',)
+        )
+        for name, bind in database.get_engines().items():
+            status = pool_status(bind)
+            for state in ('checked_out', 'checked_in', 'overflow'):
+                if state in status:
+                    connections.add_metric((name, state), max(status[state], 0))
+            if 'timeouts' in status:
+                timeouts.add_metric((name,), status['timeouts'])
+        yield connections
+        yield timeouts
+
+        yield GaugeMetricFamily(
+            'password_pool_in_flight', 'Operações de senha em execução ou na fila.', value=password_pool.in_flight
+        )
+        yield CounterMetricFamily(
+            'password_pool_rejected',
+            'Operações de senha recusadas com 503 por pool saturado.',
+            value=password_pool.rejected,
+        )
+        yield GaugeMetricFamily(
+            'token_ledger_circuit_open',
+            '1 se o disjuntor do Redis do registro de tokens estiver aberto.',
+            value=int(token_ledger.breaker.is_open),
+        )
+
+        cache_requests = CounterMetricFamily(
+            'cache_requests', 'Consultas aos caches em memória, por resultado.', labels=('cache', 'result')
+        )
+        for name, cache in (('menu', menu_cache), ('customer', customer_cache), ('jwt_claims', claims_cache)):
+            cache_requests.add_metric((name, 'hit'), cache.hits)
+            cache_requests.add_metric((name, 'miss'), cache.misses)
+        yield cache_requests
+
+        dropped = CounterMetricFamily(
+            'log_records_dropped',
+            'Registros de log descartados pela fila cheia, pela amostragem e pela supressão de repetições.',
+            labels=('reason',),
+        )
+        if app_logging.LOG_ASYNC:
+            dropped.add_metric(('queue_full',), app_logging.queue_handler.dropped)
+        dropped.add_metric(('sampled',), app_logging.log_sampler.sampled_out)
+        dropped.add_metric(('suppressed',), app_logging.log_sampler.suppressed)
+        yield dropped
+
+REGISTRY.register(ComponentCollector())
+
+_prometheus_app = make_wsgi_app(REGISTRY)
+
+def metrics_app(environ: Dict[str, Any], start_response: Callable[..., Any]) -> List[bytes]:
+    """Aplicação WSGI do servidor de métricas.
+
+    Serve o estado dos pools de conexão em `/status/pool`, em JSON, e as métricas do Prometheus nos
+    demais caminhos.
+
+    Args:
+        environ (Dict[str, Any]): O ambiente WSGI da requisição.
+        start_response (Callable[..., Any]): Callback WSGI que inicia a resposta.
+
+    Returns:
+        List[bytes]: O corpo da resposta.
+    """
+    if environ.get('PATH_INFO') == '/status/pool':
+        body = json.dumps(database.get_pool_status()).encode()
+        start_response('200 OK', [('Content-Type', 'application/json'), ('Content-Length', str(len(body)))])
+        return [body]
+    return _prometheus_app(environ, start_response)
+
+class _QuietHandler(WSGIRequestHandler):
+    """Não registra no log cada consulta do Prometheus."""
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+def start_metrics_server() -> None:
+    """Inicia o servidor de métricas em `METRICS_PORT`, uma vez por processo.
+
+    As métricas e o estado dos pools ficam fora da aplicação pública: a porta não é exposta pelo
+    Service nem pelo Ingress, só pelo pod, onde o Prometheus a consulta. No AWS Lambda não há processo
+    para consultar, e o servidor não é iniciado.
+
+    Returns:
+        None
+    """
+    global _server
+    if _server is not None or METRICS_PORT <= 0 or IS_LAMBDA:
+        return
+    try:
+        _server = make_server(METRICS_ADDR, METRICS_PORT, metrics_app, ThreadingWSGIServer, handler_class=_QuietHandler)
+    except OSError as e:
+        logger.warning('Metrics server not started on port %s: %s', METRICS_PORT, e)
+        return
+    threading.Thread(target=_server.serve_forever, daemon=True).start()
+    logger.info('Metrics server listening on port %s', METRICS_PORT)
+
+def stop_metrics_server() -> None:
+    """Encerra o servidor de métricas, se estiver em execução.
+
+    Returns:
+        None
+    """
+    global _server
+    if _server is None:
+        return
+    _server.shutdown()
+    _server.server_close()
+    _server = None
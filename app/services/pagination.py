@@ -0,0 +1,85 @@
+import base64
+import binascii
+import json
+from typing import Any, Callable, List, Optional, Sequence, Tuple, TypeVar
+
+from fastapi import HTTPException
+
+T = TypeVar('T')
+
+# Tamanho máximo de uma página das listagens
+MAX_PAGE_SIZE = 100
+
+# Cabeçalho com o cursor da próxima página nas rotas cuja resposta não tem um envelope
+NEXT_CURSOR_HEADER = 'X-Next-Cursor'
+
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Codifica a chave de ordenação do último item de uma página em um cursor opaco.
+
+    Args:
+        values (Sequence[Any]): Valores da chave (ex.: `created_at` em ISO 8601 e `id`), serializáveis em JSON.
+
+    Returns:
+        str: O cursor em base64 url-safe, sem padding.
+    """
+    raw = json.dumps(list(values), separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b'=').decode()
+
+def decode_cursor(cursor: str, *types: Callable[[Any], Any]) -> Tuple[Any, ...]:
+    """Decodifica um cursor gerado por `encode_cursor`.
+
+    Args:
+        cursor (str): O cursor recebido do cliente.
+        *types (Callable[[Any], Any]): Conversores de cada valor da chave (ex.: `datetime.fromisoformat`, `int`).
+
+    Returns:
+        Tuple[Any, ...]: Os valores da chave, já convertidos.
+
+    Raises:
+        ValueError: Se o cursor estiver malformado ou não corresponder à chave esperada.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(types):
+            raise ValueError('unexpected cursor key')
+        return tuple(convert(value) for convert, value in zip(types, values))
+    except (binascii.Error, TypeError, ValueError) as e:
+        raise ValueError(f'Cursor inválido: {cursor}') from e
+
+def parse_cursor(cursor: Optional[str], *types: Callable[[Any], Any]) -> Optional[Tuple[Any, ...]]:
+    """Decodifica o cursor recebido por uma rota.
+
+    Args:
+        cursor (Optional[str]): O parâmetro `cursor` da requisição.
+        *types (Callable[[Any], Any]): Conversores de cada valor da chave.
+
+    Returns:
+        Optional[Tuple[Any, ...]]: Os valores da chave, ou None se nenhum cursor foi enviado.
+
+    Raises:
+        HTTPException: Se o cursor for inválido.
+    """
+    if cursor is None:
+        return None
+    try:
+        return decode_cursor(cursor, *types)
+    except ValueError:
+        raise HTTPException(status_code=400, detail='Cursor inválido')
+
+def paginate(items: List[T], limit: int, key: Callable[[T], Sequence[Any]]) -> Tuple[List[T], Optional[str]]:
+    """Separa uma página dos itens lidos com `limit + 1` e gera o cursor da página seguinte.
+
+    Ler um item a mais indica se há próxima página sem uma consulta de contagem.
+
+    Args:
+        items (List[T]): Itens lidos do banco, no máximo `limit + 1`.
+        limit (int): Tamanho da página.
+        key (Callable[[T], Sequence[Any]]): Extrai a chave de ordenação de um item.
+
+    Returns:
+        Tuple[List[T], Optional[str]]: Os itens da página e o cursor da próxima, ou None na última página.
+    """
+    if limit <= 0 or len(items) <= limit:
+        return items[:max(limit, 0)], None
+    page = items[:limit]
+    return page, encode_cursor(key(page[-1]))
@@ -0,0 +1,132 @@
+import asyncio
+import math
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from os import environ as env
+from typing import Any, Callable, Optional, TypeVar
+
+from fastapi import HTTPException, status
+from passlib.hash import bcrypt
+
+from ..tools.logging import logger
+from . import security
+
+T = TypeVar('T')
+
+# Threads dedicadas ao bcrypt: ele libera o GIL, então as threads rodam em paralelo sem ocupar o
+# threadpool das rotas. Um pool de processos não compensa: o trabalho é curto e a biblioteca já é C.
+PASSWORD_POOL_SIZE = int(env.get('PASSWORD_POOL_SIZE', str(min(os.cpu_count() or 1, 4))))
+
+# Verificações aguardando uma thread livre; acima disso, a requisição é recusada com 503
+PASSWORD_QUEUE_SIZE = int(env.get('PASSWORD_QUEUE_SIZE', str(PASSWORD_POOL_SIZE * 8)))
+
+# Custo do bcrypt: fixo, se definido, ou ajustado na inicialização para levar cerca de PASSWORD_TARGET_MS
+BCRYPT_ROUNDS: Optional[int] = int(env['BCRYPT_ROUNDS']) if env.get('BCRYPT_ROUNDS') else None
+PASSWORD_TARGET_MS = float(env.get('PASSWORD_TARGET_MS', '250'))
+BCRYPT_MIN_ROUNDS = int(env.get('BCRYPT_MIN_ROUNDS', '10'))
+BCRYPT_MAX_ROUNDS = int(env.get('BCRYPT_MAX_ROUNDS', '14'))
+
+# Na AWS Lambda o Mangum executa o lifespan a cada invocação e cada ambiente mediria um custo diferente:
+# lá o custo vem só de BCRYPT_ROUNDS, sem medição
+IS_LAMBDA = bool(env.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+# Custo escolhido para este processo; None até a primeira configuração
+_configured_rounds: Optional[int] = None
+
+class PasswordPool:
+    """
+    Pool limitado para o trabalho de senha (hash e verificação com bcrypt).
+
+    Uma rajada de logins ocupa no máximo `size` threads, e só `queue_size` chamadas esperam por
+    uma delas; as demais são recusadas na hora com 503, em vez de esgotar o threadpool das outras
+    rotas ou acumular uma fila que excederia o tempo limite do cliente.
+
+    Attributes:
+        size: Número de threads do pool.
+        queue_size: Número máximo de chamadas aguardando uma thread livre.
+        in_flight: Chamadas em execução ou na fila.
+        rejected: Chamadas recusadas por pool saturado.
+    """
+
+    def __init__(self, size: int, queue_size: int):
+        """
+        Inicializa o pool; as threads são criadas sob demanda.
+
+        Args:
+            size: Número de threads do pool.
+            queue_size: Número máximo de chamadas aguardando uma thread livre.
+        """
+        self.size = size
+        self.queue_size = queue_size
+        self.in_flight = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='password')
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """
+        Executa uma função de senha no pool, se houver espaço.
+
+        Args:
+            fn: A função (ex.: `security.verify_password`).
+            *args: Argumentos da função.
+
+        Returns:
+            T: O resultado da função.
+
+        Raises:
+            HTTPException: 503, se o pool e a fila estiverem cheios.
+        """
+        if self.in_flight >= self.size + self.queue_size:
+            self.rejected += 1
+            logger.warning('Password pool saturated (%s in flight), rejecting request', self.in_flight)
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail='Servidor ocupado, tente novamente em instantes',
+                headers={'Retry-After': '1'},
+            )
+        self.in_flight += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.in_flight -= 1
+
+password_pool = PasswordPool(PASSWORD_POOL_SIZE, PASSWORD_QUEUE_SIZE)
+
+def tune_bcrypt_rounds(target_ms: float = PASSWORD_TARGET_MS) -> int:
+    """Escolhe o custo do bcrypt cujo hash leva cerca de `target_ms` nesta máquina.
+
+    Mede um hash com o custo mínimo e extrapola: cada unidade de custo dobra o tempo.
+
+    Args:
+        target_ms (float): Tempo desejado para um hash (e uma verificação), em milissegundos.
+
+    Returns:
+        int: O custo, entre `BCRYPT_MIN_ROUNDS` e `BCRYPT_MAX_ROUNDS`.
+    """
+    start = time.perf_counter()
+    bcrypt.using(rounds=BCRYPT_MIN_ROUNDS).hash('benchmark')
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    rounds = BCRYPT_MIN_ROUNDS + round(math.log2(max(target_ms / max(elapsed_ms, 0.001), 1)))
+    return min(rounds, BCRYPT_MAX_ROUNDS)
+
+def configure_password_hashing() -> None:
+    """Define o custo do bcrypt usado nos novos hashes: `BCRYPT_ROUNDS` ou o ajustado na inicialização.
+
+    O ajuste roda uma única vez por processo, mesmo que o lifespan seja executado a cada invocação
+    (Mangum na AWS Lambda). Na Lambda não há ajuste: sem `BCRYPT_ROUNDS`, o custo padrão do passlib
+    é mantido. Hashes existentes continuam válidos, pois cada um guarda o próprio custo.
+
+    Returns:
+        None
+    """
+    global _configured_rounds
+    if _configured_rounds is not None:
+        return
+    if BCRYPT_ROUNDS is None and IS_LAMBDA:
+        _configured_rounds = security.pwd_context.handler('bcrypt').default_rounds
+        logger.warning('BCRYPT_ROUNDS is not set on AWS Lambda, keeping the default bcrypt cost %d', _configured_rounds)
+        return
+    _configured_rounds = BCRYPT_ROUNDS or tune_bcrypt_rounds()
+    security.pwd_context.update(bcrypt__default_rounds=_configured_rounds)
+    logger.info('Password hashing configured with bcrypt cost %d', _configured_rounds)
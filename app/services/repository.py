@@ -1,9 +1,13 @@
 import os
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional
+from itertools import groupby
+from typing import Dict, List, Optional, Tuple
 from dotenv import load_dotenv
 from jose import jwt
-from sqlalchemy import text
+from sqlalchemy import JSON, Integer, Select, String, cast, delete, func, insert, literal_column, select, tuple_, update
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, joinedload
 
 from ..model import models, schemas
@@ -12,23 +16,34 @@ from . import security
 
 load_dotenv()
 
-def create_token(db: Session, token: str, user_id: int) -> models.Token:
+# Metadado com a versão do cardápio, incrementada a cada escrita em produtos ou categorias
+MENU_VERSION_KEY = 'menu_version'
+
+def create_token(db: Session, token: str, user_id: int, expires_at: Optional[datetime] = None) -> models.Token:
     """Cria um novo token para um usuário específico.
 
     Args:
         db (Session): Sessão do banco de dados.
         token (str): O token a ser criado.
         user_id (int): ID do usuário para o qual o token será criado.
+        expires_at (Optional[datetime]): Expiração do token. Se omitida, é lida da claim `exp` do JWT
+            ou, na falta dela, considerada a validade padrão de um token de acesso.
 
     Returns:
         models.Token: O token criado.
     """
-    logger.info(f'Creating token for user ID: {user_id}')
-    db_token = models.Token(token=token, user_id=user_id)
+    logger.info('Creating token for user ID: %s', user_id)
+    if expires_at is None:
+        exp = jwt.get_unverified_claims(token).get('exp')
+        expires_at = (
+            datetime.fromtimestamp(exp, timezone.utc)
+            if exp
+            else datetime.now(timezone.utc) + timedelta(minutes=security.ACCESS_TOKEN_EXPIRE_MINUTES)
+        )
+    db_token = models.Token(token=token, user_id=user_id, expires_at=expires_at)
     db.add(db_token)
     db.commit()
-    db.refresh(db_token)
-    logger.debug(f'Token created: {db_token.token}')
+    logger.debug('Token created with ID: %s', db_token.id)
     return db_token
 
 def mark_token_as_used(db: Session, token: str) -> models.Token:
@@ -41,15 +56,15 @@ def mark_token_as_used(db: Session, token: str) -> models.Token:
     Returns:
         models.Token: O token marcado como usado, ou None se o token não for encontrado.
     """
-    logger.info(f'Marking token as used: {token}')
-    db_token = db.query(models.Token).filter(models.Token.token == token).first()
+    logger.info('Marking token as used')
+    db_token = db.scalars(
+        update(models.Token).where(models.Token.token == token).values(is_used=True).returning(models.Token)
+    ).first()
     if db_token:
-        db_token.is_used = True
         db.commit()
-        db.refresh(db_token)
-        logger.debug(f'Token marked as used: {token}')
+        logger.debug('Token marked as used: %s', db_token.id)
     else:
-        logger.warning(f'Token not found: {token}')
+        logger.warning('Token not found')
     return db_token
 
 def is_token_used(db: Session, token: str) -> bool:
@@ -62,14 +77,187 @@ def is_token_used(db: Session, token: str) -> bool:
     Returns:
         bool: True se o token já foi usado, False caso contrário.
     """
-    logger.debug(f'Checking if token is used: {token}')
+    logger.debug('Checking if token is used')
     db_token = db.query(models.Token).filter(models.Token.token == token).first()
     if db_token and db_token.is_used:
-        logger.debug(f'Token is used: {token}')
+        logger.debug('Token is used: %s', db_token.id)
         return True
-    logger.debug(f'Token is not used: {token}')
+    logger.debug('Token is not used')
     return False
 
+def consume_token(db: Session, token: str) -> bool:
+    """Registra o uso de um token de uso único, se ele ainda não foi usado.
+
+    Um token sem registro na tabela é aceito sem escrita, como em `is_token_used` e
+    `mark_token_as_used`. A marcação só vale para quem a faz primeiro: duas requisições
+    concorrentes com o mesmo token não são aceitas juntas.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        token (str): O token apresentado.
+
+    Returns:
+        bool: True se o token pode ser usado, False se já foi usado.
+    """
+    is_used = db.scalar(select(models.Token.is_used).where(models.Token.token == token))
+    if is_used is None:
+        return True
+    if is_used:
+        logger.debug('Token is used')
+        return False
+    marked = db.scalar(
+        update(models.Token)
+        .where(models.Token.token == token, models.Token.is_used.is_(False))
+        .values(is_used=True)
+        .returning(models.Token.id)
+    )
+    db.commit()
+    return marked is not None
+
+def delete_expired_tokens(db: Session, before: datetime, batch_size: int = 500) -> int:
+    """Remove um lote de tokens de acesso expirados antes do instante informado.
+
+    Cada lote é uma transação curta: no PostgreSQL as linhas são escolhidas com `SKIP LOCKED`, então
+    réplicas limpando ao mesmo tempo não disputam as mesmas linhas nem bloqueiam a autenticação.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        before (datetime): Tokens expirados antes deste instante são removidos.
+        batch_size (int, optional): Número máximo de tokens removidos. Defaults to 500.
+
+    Returns:
+        int: Número de tokens removidos.
+    """
+    return _delete_expired(db, models.Token, before, batch_size)
+
+def delete_expired_refresh_tokens(db: Session, before: datetime, batch_size: int = 500) -> int:
+    """Remove um lote de tokens de atualização expirados antes do instante informado.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        before (datetime): Tokens expirados antes deste instante são removidos.
+        batch_size (int, optional): Número máximo de tokens removidos. Defaults to 500.
+
+    Returns:
+        int: Número de tokens removidos.
+    """
+    return _delete_expired(db, models.RefreshToken, before, batch_size)
+
+def _delete_expired(db: Session, model: type, before: datetime, batch_size: int) -> int:
+    """Remove, em uma transação curta, um lote de linhas com `expires_at` anterior ao instante informado.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        model (type): `models.Token` ou `models.RefreshToken`.
+        before (datetime): Linhas expiradas antes deste instante são removidas.
+        batch_size (int): Número máximo de linhas removidas.
+
+    Returns:
+        int: Número de linhas removidas.
+    """
+    batch = (
+        select(model.id)
+        .where(model.expires_at < before)
+        .order_by(model.expires_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    ids = db.scalars(batch).all()
+    if ids:
+        db.execute(delete(model).where(model.id.in_(ids)))
+    db.commit()
+    return len(ids)
+
+def create_refresh_token(
+    db: Session, token_hash: str, customer_id: int, expires_at: datetime, family_id: str
+) -> models.RefreshToken:
+    """Registra um token de atualização, iniciando uma sessão.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        token_hash (str): SHA-256 do token.
+        customer_id (int): ID do cliente dono da sessão.
+        expires_at (datetime): Data e hora em que o token deixa de ser aceito.
+        family_id (str): Identificador da sessão.
+
+    Returns:
+        models.RefreshToken: O token registrado.
+    """
+    logger.info('Creating refresh token for user ID: %s', customer_id)
+    db_token = models.RefreshToken(
+        token_hash=token_hash, family_id=family_id, customer_id=customer_id, expires_at=expires_at
+    )
+    db.add(db_token)
+    db.commit()
+    return db_token
+
+def revoke_refresh_family(db: Session, family_id: str) -> int:
+    """Revoga todos os tokens de atualização de uma sessão.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        family_id (str): Identificador da sessão.
+
+    Returns:
+        int: Número de tokens revogados.
+    """
+    result = db.execute(
+        update(models.RefreshToken)
+        .where(models.RefreshToken.family_id == family_id, models.RefreshToken.revoked.is_(False))
+        .values(revoked=True)
+    )
+    db.commit()
+    return result.rowcount
+
+def rotate_refresh_token(db: Session, token_hash: str, new_token_hash: str, expires_at: datetime) -> Optional[int]:
+    """Troca um token de atualização por um novo, da mesma sessão.
+
+    Cada token só pode ser trocado uma vez. Um token já trocado que volte a ser apresentado
+    (reutilização) indica que ele vazou: a sessão inteira é revogada, inclusive o token mais recente.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        token_hash (str): SHA-256 do token apresentado.
+        new_token_hash (str): SHA-256 do novo token.
+        expires_at (datetime): Data e hora em que o novo token deixa de ser aceito.
+
+    Returns:
+        Optional[int]: O ID do cliente dono da sessão, ou None se o token for desconhecido, expirado,
+        revogado ou reutilizado.
+    """
+    db_token = db.scalars(select(models.RefreshToken).where(models.RefreshToken.token_hash == token_hash)).first()
+    if db_token is None or db_token.revoked:
+        return None
+    customer_id, family_id = db_token.customer_id, db_token.family_id
+    now = datetime.now(timezone.utc)
+    if db_token.expires_at.replace(tzinfo=db_token.expires_at.tzinfo or timezone.utc) <= now:
+        logger.debug('Refresh token expired for user ID: %s', customer_id)
+        return None
+
+    # Só quem marca o token primeiro o troca; um uso anterior ou concorrente é reutilização
+    claimed = None
+    if db_token.used_at is None:
+        claimed = db.scalar(
+            update(models.RefreshToken)
+            .where(models.RefreshToken.id == db_token.id, models.RefreshToken.used_at.is_(None))
+            .values(used_at=now)
+            .returning(models.RefreshToken.id)
+        )
+    if claimed is None:
+        db.rollback()
+        revoked = revoke_refresh_family(db, family_id)
+        logger.warning('Refresh token reuse detected for user ID: %s, %s tokens revoked', customer_id, revoked)
+        return None
+
+    db.add(
+        models.RefreshToken(
+            token_hash=new_token_hash, family_id=family_id, customer_id=customer_id, expires_at=expires_at
+        )
+    )
+    db.commit()
+    logger.debug('Refresh token rotated for user ID: %s', customer_id)
+    return customer_id
+
 def create_access_token(data: dict, expires_delta: timedelta) -> str:
     """Cria um token de acesso JWT.
 
@@ -98,26 +286,30 @@ def get_user_by_email(db: Session, email: str) -> models.Customer:
     Returns:
         models.Customer: O usuário encontrado, ou None se nenhum usuário for encontrado.
     """
-    logger.info(f'Fetching user with email: {email}')
+    logger.info('Fetching user with email: %s', email)
     return db.query(models.Customer).filter(models.Customer.email == email).first()
 
-def create_user(db: Session, user: schemas.CustomerCreate) -> models.Customer:
+def create_user(
+    db: Session, user: schemas.CustomerCreate, hashed_password: Optional[str] = None
+) -> models.Customer:
     """Cria um novo usuário.
 
     Args:
         db (Session): Sessão do banco de dados.
         user (schemas.CustomerCreate): Os dados do usuário a ser criado.
+        hashed_password (Optional[str]): Hash da senha já calculado fora da sessão. Se omitido,
+            o hash é gerado a partir de `user.password`.
 
     Returns:
         models.Customer: O usuário criado.
     """
-    logger.debug(f'Creating user with email: {user.email}')
-    hashed_password = security.get_password_hash(user.password)
+    logger.debug('Creating user with email: %s', user.email)
+    if hashed_password is None:
+        hashed_password = security.get_password_hash(user.password)
     db_user = models.Customer(name=user.name, email=user.email, cpf=user.cpf, hashed_password=hashed_password)
     db.add(db_user)
     db.commit()
-    db.refresh(db_user)
-    logger.info(f'User created with ID: {db_user.id}')
+    logger.info('User created with ID: %s', db_user.id)
     return db_user
 
 def create_anonymous_customer(db: Session) -> models.Customer:
@@ -133,8 +325,7 @@ def create_anonymous_customer(db: Session) -> models.Customer:
     anonymous_customer = models.Customer(name='Anonymous', email=None, cpf=None, hashed_password=None)
     db.add(anonymous_customer)
     db.commit()
-    db.refresh(anonymous_customer)
-    logger.info(f'Anonymous customer created with ID: {anonymous_customer.id}')
+    logger.info('Anonymous customer created with ID: %s', anonymous_customer.id)
     return anonymous_customer
 
 def get_customer_by_cpf(db: Session, cpf: str) -> models.Customer:
@@ -147,7 +338,7 @@ def get_customer_by_cpf(db: Session, cpf: str) -> models.Customer:
     Returns:
         models.Customer: O cliente encontrado, ou None se nenhum cliente for encontrado.
     """
-    logger.debug(f'Fetching customer with CPF: {cpf}')
+    logger.debug('Fetching customer with CPF: %s', cpf)
     return db.query(models.Customer).filter(models.Customer.cpf == cpf).first()
 
 def create_admin_user(db: Session) -> None:
@@ -172,7 +363,7 @@ def create_admin_user(db: Session) -> None:
             logger.error('Admin user details are not set in environment variables.')
             return
 
-        logger.debug(f'Admin email: {admin_email}, Admin name: {admin_name}')
+        logger.debug('Admin email: %s, Admin name: %s', admin_email, admin_name)
 
         user = db.query(models.Customer).filter(models.Customer.email == admin_email).first()
         if not user:
@@ -182,12 +373,11 @@ def create_admin_user(db: Session) -> None:
             )
             db.add(admin_user)
             db.commit()
-            db.refresh(admin_user)
-            logger.debug(f'Admin user created with email: {admin_email}')
+            logger.debug('Admin user created with email: %s', admin_email)
         else:
-            logger.debug(f'Admin user already exists with email: {admin_email}')
+            logger.debug('Admin user already exists with email: %s', admin_email)
     except Exception as e:
-        logger.error(f'Error creating admin user: {e}')
+        logger.error('Error creating admin user: %s', e)
 
 def get_customers_count(db: Session) -> int:
     """Obtém a contagem total de clientes.
@@ -211,26 +401,30 @@ def get_customer(db: Session, customer_id: int) -> Optional[models.Customer]:
     Returns:
         Optional[models.Customer]: O cliente encontrado ou None se nenhum cliente for encontrado.
     """
-    logger.debug(f'Fetching customer with ID: {customer_id}')
+    logger.debug('Fetching customer with ID: %s', customer_id)
     try:
         return db.query(models.Customer).filter(models.Customer.id == customer_id).first()
     except Exception as e:
-        logger.error(f'Error fetching customer: {e}')
+        logger.error('Error fetching customer: %s', e)
         return None
 
-def get_customers(db: Session, skip: int = 0, limit: int = 10) -> List[models.Customer]:
-    """Obtém uma lista de clientes com paginação.
+def get_customers(db: Session, skip: int = 0, limit: int = 10, after: Optional[int] = None) -> List[models.Customer]:
+    """Obtém uma lista de clientes, ordenada pelo ID, com paginação.
 
     Args:
         db (Session): Sessão do banco de dados.
         skip (int, optional): Número de registros a pular. Defaults to 0.
         limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        after (Optional[int], optional): ID do último item da página anterior (paginação por cursor).
+            Quando informado, `skip` é ignorado. Defaults to None.
 
     Returns:
         List[models.Customer]: Lista de clientes.
     """
-    logger.debug(f'Fetching customers with skip: {skip}, limit: {limit}')
-    return db.query(models.Customer).offset(skip).limit(limit).all()
+    logger.debug('Fetching customers with skip: %s, limit: %s, after: %s', skip, limit, after)
+    query = db.query(models.Customer).order_by(models.Customer.id)
+    query = query.filter(models.Customer.id > after) if after is not None else query.offset(skip)
+    return query.limit(limit).all()
 
 def create_customer(db: Session, customer: schemas.CustomerCreate) -> models.Customer:
     """Cria um novo cliente.
@@ -242,14 +436,60 @@ def create_customer(db: Session, customer: schemas.CustomerCreate) -> models.Cus
     Returns:
         models.Customer: O cliente criado.
     """
-    logger.debug(f'Creating customer with email: {customer.email}')
+    logger.debug('Creating customer with email: %s', customer.email)
     db_customer = models.Customer(name=customer.name, email=customer.email, cpf=customer.cpf)
     db.add(db_customer)
     db.commit()
-    db.refresh(db_customer)
-    logger.info(f'Customer created with ID: {db_customer.id}')
+    logger.info('Customer created with ID: %s', db_customer.id)
     return db_customer
 
+def bump_menu_version(db: Session) -> None:
+    """Incrementa a versão do cardápio na transação corrente, sem commit.
+
+    A versão identifica o estado de produtos e categorias nos ETags das rotas do cardápio e muda
+    no mesmo commit que a escrita. Se o metadado não existir (ex.: removido manualmente), ele é
+    criado com a versão 1, em vez de deixar o ETag fixo em `'0'`.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+    """
+    dialect = db.get_bind().dialect.name
+    if dialect in {'postgresql', 'sqlite'}:
+        upsert = postgresql_insert if dialect == 'postgresql' else sqlite_insert
+        statement = upsert(models.AppMetadata).values(
+            key=MENU_VERSION_KEY, value='1', updated_at=datetime.now(timezone.utc)
+        )
+        db.execute(
+            statement.on_conflict_do_update(
+                index_elements=[models.AppMetadata.key],
+                set_={
+                    'value': cast(cast(models.AppMetadata.value, Integer) + 1, String),
+                    'updated_at': statement.excluded.updated_at,
+                },
+            )
+        )
+        return
+    result = db.execute(
+        update(models.AppMetadata)
+        .where(models.AppMetadata.key == MENU_VERSION_KEY)
+        .values(value=cast(cast(models.AppMetadata.value, Integer) + 1, String))
+    )
+    if result.rowcount == 0:
+        db.add(models.AppMetadata(key=MENU_VERSION_KEY, value='1'))
+        db.flush()
+
+def get_menu_version(db: Session) -> str:
+    """Obtém a versão atual do cardápio.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+
+    Returns:
+        str: A versão do cardápio.
+    """
+    version = db.scalar(select(models.AppMetadata.value).where(models.AppMetadata.key == MENU_VERSION_KEY))
+    return version or '0'
+
 def categorize_products(products: List[models.Product]) -> Dict[str, List[schemas.Product]]:
     """Categoriza produtos com base em sua categoria.
 
@@ -286,26 +526,35 @@ def get_product(db: Session, product_id: int) -> Optional[models.Product]:
     Returns:
         Optional[models.Product]: O produto encontrado ou None se nenhum produto for encontrado.
     """
-    logger.debug(f'Fetching product with ID: {product_id}')
+    logger.debug('Fetching product with ID: %s', product_id)
     try:
-        return db.query(models.Product).filter(models.Product.id == product_id).first()
+        return (
+            db.query(models.Product)
+            .options(joinedload(models.Product.category))
+            .filter(models.Product.id == product_id)
+            .first()
+        )
     except Exception as e:
-        logger.error(f'Error fetching product: {e}')
+        logger.error('Error fetching product: %s', e)
         return None
 
-def get_products(db: Session, skip: int = 0, limit: int = 10) -> List[models.Product]:
-    """Obtém uma lista de produtos com paginação.
+def get_products(db: Session, skip: int = 0, limit: int = 10, after: Optional[int] = None) -> List[models.Product]:
+    """Obtém uma lista de produtos, ordenada pelo ID, com paginação.
 
     Args:
         db (Session): Sessão do banco de dados.
         skip (int, optional): Número de registros a pular. Defaults to 0.
         limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        after (Optional[int], optional): ID do último item da página anterior (paginação por cursor).
+            Quando informado, `skip` é ignorado. Defaults to None.
 
     Returns:
         List[models.Product]: Lista de produtos.
     """
-    logger.debug(f'Fetching products with skip: {skip}, limit: {limit}')
-    return db.query(models.Product).offset(skip).limit(limit).all()
+    logger.debug('Fetching products with skip: %s, limit: %s, after: %s', skip, limit, after)
+    query = db.query(models.Product).options(joinedload(models.Product.category)).order_by(models.Product.id)
+    query = query.filter(models.Product.id > after) if after is not None else query.offset(skip)
+    return query.limit(limit).all()
 
 def create_product(db: Session, product: schemas.ProductCreate) -> models.Product:
     """Cria um novo produto.
@@ -317,17 +566,17 @@ def create_product(db: Session, product: schemas.ProductCreate) -> models.Produc
     Returns:
         models.Product: O produto criado.
     """
-    logger.debug(f'Creating product with name: {product.name}')
+    logger.debug('Creating product with name: %s', product.name)
 
     db_product = models.Product(
-        name=product.name, description=product.description, price=product.price, category=product.category
+        name=product.name, description=product.description, price=product.price, category_id=product.category_id
     )
 
     db.add(db_product)
+    bump_menu_version(db)
     db.commit()
-    db.refresh(db_product)
 
-    logger.info(f'Product created with ID: {db_product.id}')
+    logger.info('Product created with ID: %s', db_product.id)
 
     return db_product
 
@@ -342,14 +591,16 @@ def update_product(db: Session, db_product: models.Product, product: schemas.Pro
     Returns:
         models.Product: O produto atualizado.
     """
-    logger.debug(f'Updating product with name: {product.name}')
+    logger.debug('Updating product with name: %s', product.name)
     db_product.name = product.name
     db_product.description = product.description
     db_product.price = product.price
-    db_product.category = product.category
+    db_product.category_id = product.category_id
+    bump_menu_version(db)
     db.commit()
-    db.refresh(db_product)
-    logger.info(f'Product updated with ID: {db_product.id}')
+    # A sessão não expira os objetos no commit; apenas a relação com a categoria pode ter mudado
+    db.expire(db_product, ['category'])
+    logger.info('Product updated with ID: %s', db_product.id)
     return db_product
 
 def delete_product(db: Session, product_id: int) -> Optional[models.Product]:
@@ -362,22 +613,27 @@ def delete_product(db: Session, product_id: int) -> Optional[models.Product]:
     Returns:
         Optional[models.Product]: O produto deletado, ou None se não encontrado.
     """
-    logger.debug(f'Deleting product with ID: {product_id}')
+    logger.debug('Deleting product with ID: %s', product_id)
     try:
         db_product = db.query(models.Product).filter(models.Product.id == product_id).first()
         if db_product:
             db.delete(db_product)
+            bump_menu_version(db)
             db.commit()
-            logger.info(f'Product deleted: {db_product.name} - Category: {db_product.category}')
+            logger.info('Product deleted: %s - Category: %s', db_product.name, db_product.category)
         else:
-            logger.warning(f'Product not found: ID {product_id}')
+            logger.warning('Product not found: ID %s', product_id)
         return db_product
     except Exception as e:
-        logger.error(f'Error deleting product: {e}')
+        logger.error('Error deleting product: %s', e)
         return None
 
 def create_order(db: Session, order: schemas.OrderCreate) -> models.Order:
-    """Cria um novo pedido no banco de dados.
+    """Cria um novo pedido no banco de dados em uma única transação.
+
+    O pedido é inserido com RETURNING, os produtos em um único INSERT de múltiplas linhas e o
+    rastreamento inicial em seguida. Qualquer falha desfaz a transação inteira, sem deixar
+    pedidos parcialmente gravados.
 
     Args:
         db (Session): Sessão do banco de dados.
@@ -386,42 +642,43 @@ def create_order(db: Session, order: schemas.OrderCreate) -> models.Order:
     Returns:
         models.Order: O pedido criado.
     """
-    logger.debug(f'Creating order for customer ID: {order.customer_id}')
+    logger.debug('Creating order for customer ID: %s', order.customer_id)
+    now = datetime.now(timezone.utc)
     try:
-        customer_id_int = order.customer_id
-        db_order = models.Order(
-            status=order.status,
-            user_agent=order.user_agent,
-            ip_address=order.ip_address,
-            os=order.os,
-            browser=order.browser,
-            device=order.device,
-            comments=order.comments,
-            customer_id=customer_id_int,
-            payment_status=order.payment_status,
-            created_at=datetime.now(timezone.utc),
-            updated_at=datetime.now(timezone.utc),
-        )
-        db.add(db_order)
-        db.commit()
-        db.refresh(db_order)
-        logger.info(f'Order created with ID: {db_order.id}')
-
-        for product in order.products:
-            product_id_int = product.product_id
-            db_order_product = models.OrderProduct(
-                order_id=db_order.id, product_id=product_id_int, comment=product.comment
+        db_order = db.scalars(
+            insert(models.Order)
+            .values(
+                status=order.status,
+                user_agent=order.user_agent,
+                ip_address=order.ip_address,
+                os=order.os,
+                browser=order.browser,
+                device=order.device,
+                comments=order.comments,
+                customer_id=order.customer_id,
+                payment_status=order.payment_status,
+                created_at=now,
+                updated_at=now,
+            )
+            .returning(models.Order)
+        ).one()
+
+        if order.products:
+            db.execute(
+                insert(models.OrderProduct),
+                [
+                    {'order_id': db_order.id, 'product_id': product.product_id, 'comment': product.comment}
+                    for product in order.products
+                ],
             )
-            db.add(db_order_product)
-            db.commit()
-            db.refresh(db_order_product)
-            logger.info(f'Product {db_order_product.product_id} added to order {db_order.id}')
-
-        create_tracking(db, db_order.id, db_order.status)
 
+        db.execute(insert(models.Tracking).values(order_id=db_order.id, status=db_order.status, created_at=now))
+        db.commit()
+        logger.info('Order created with ID: %s and %s products', db_order.id, len(order.products))
         return db_order
     except Exception as e:
-        logger.error(f'Error creating order: {e}', exc_info=True)
+        db.rollback()
+        logger.error('Error creating order: %s', e, exc_info=True)
         raise
 
 def update_order_status(db: Session, order_id: int, status: str) -> Optional[models.Order]:
@@ -435,19 +692,19 @@ def update_order_status(db: Session, order_id: int, status: str) -> Optional[mod
     Returns:
         Optional[models.Order]: O pedido atualizado, ou None se não encontrado.
     """
-    logger.debug(f'Updating order status for order ID: {order_id} to {status}')
+    logger.debug('Updating order status for order ID: %s to %s', order_id, status)
     try:
         db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
         if db_order:
+            now = datetime.now(timezone.utc)
             db_order.status = status
-            db_order.updated_at = datetime.now(timezone.utc)
+            db_order.updated_at = now
+            db.add(models.Tracking(order_id=db_order.id, status=status, created_at=now))
             db.commit()
-            db.refresh(db_order)
-            logger.info(f'Order ID {db_order.id} status updated to {status}')
-            create_tracking(db, db_order.id, status)
+            logger.info('Order ID %s status updated to %s', db_order.id, status)
         return db_order
     except Exception as e:
-        logger.error(f'Error updating order status: {e}', exc_info=True)
+        logger.error('Error updating order status: %s', e, exc_info=True)
         raise
 
 def update_order_payment_status(db: Session, order_id: int, payment_status: str) -> Optional[models.Order]:
@@ -459,16 +716,16 @@ def update_order_payment_status(db: Session, order_id: int, payment_status: str)
     Returns:
         Optional[models.Order]: O pedido atualizado, ou None se não encontrado.
     """
-    logger.debug(f'Updating order payment status for order ID: {order_id} to {payment_status}')
+    logger.debug('Updating order payment status for order ID: %s to %s', order_id, payment_status)
     try:
         db_order = db.query(models.Order).filter(models.Order.id == order_id).first()
         if db_order:
+            now = datetime.now(timezone.utc)
             db_order.payment_status = payment_status
-            db_order.updated_at = datetime.now(timezone.utc)
+            db_order.updated_at = now
+            db.add(models.Tracking(order_id=db_order.id, status=payment_status, created_at=now))
             db.commit()
-            db.refresh(db_order)
-            logger.info(f'Order ID {db_order.id} payment status updated to {payment_status}')
-            create_tracking(db, db_order.id, payment_status)
+            logger.info('Order ID %s payment status updated to %s', db_order.id, payment_status)
 
             if payment_status.lower() == "pago" or payment_status.lower() == "recusado":
                 # Criando um schema do tipo WebhookCreate para passar para a função create_webhook
@@ -478,19 +735,20 @@ def update_order_payment_status(db: Session, order_id: int, payment_status: str)
                     customer_id=db_order.customer_id
                 )
                 create_webhook(db, webhook_data)
-                logger.info(f'Creating a webhook entry for order ID: {db_order.id} at {webhook_data.received_at}')
+                logger.info('Creating a webhook entry for order ID: %s at %s', db_order.id, webhook_data.received_at)
 
         return db_order
 
     except Exception as e:
-        logger.error(f'Error updating order payment status: {e}', exc_info=True)
+        logger.error('Error updating order payment status: %s', e, exc_info=True)
         raise
 
 def create_webhook(db: Session, webhook: schemas.WebhookCreate):
 
-    logger.debug(f'Creating a webhook entry for order ID: {webhook.order_id}')
+    logger.debug('Creating a webhook entry for order ID: %s', webhook.order_id)
     try:
-        order_search = db.query(models.Order).filter(models.Order.id == webhook.order_id).first()
+        # O pedido já está no identity map quando o webhook nasce de `update_order_payment_status`
+        order_search = db.get(models.Order, webhook.order_id)
         db_webhook = models.Webhook(
             order_id=order_search.id,
             received_at=webhook.received_at,
@@ -498,14 +756,12 @@ def create_webhook(db: Session, webhook: schemas.WebhookCreate):
             payment_status=order_search.payment_status,
             customer_id=webhook.customer_id
         )
-        db.query(models.Order).filter(models.Order.id == webhook.order_id).first()
         db.add(db_webhook)
         db.commit()
-        db.refresh(db_webhook)
-        logger.info(f'Webhook entry created with ID: {db_webhook.id}')
+        logger.info('Webhook entry created with ID: %s', db_webhook.id)
         return db_webhook
     except Exception as e:
-        logger.error(f'Error creating tracking entry: {e}', exc_info=True)
+        logger.error('Error creating tracking entry: %s', e, exc_info=True)
         raise
 
 def create_tracking(db: Session, order_id: int, status: str) -> models.Tracking:
@@ -519,44 +775,117 @@ def create_tracking(db: Session, order_id: int, status: str) -> models.Tracking:
     Returns:
         models.Tracking: A entrada de rastreamento criada.
     """
-    logger.debug(f'Creating tracking entry for order ID: {order_id} with status: {status}')
+    logger.debug('Creating tracking entry for order ID: %s with status: %s', order_id, status)
     try:
         db_tracking = models.Tracking(order_id=order_id, status=status, created_at=datetime.now(timezone.utc))
         db.add(db_tracking)
         db.commit()
-        db.refresh(db_tracking)
-        logger.info(f'Tracking entry created with ID: {db_tracking.id}')
+        logger.info('Tracking entry created with ID: %s', db_tracking.id)
         return db_tracking
     except Exception as e:
-        logger.error(f'Error creating tracking entry: {e}', exc_info=True)
+        logger.error('Error creating tracking entry: %s', e, exc_info=True)
         raise
 
-def get_orders(db: Session, skip: int = 0, limit: int = 10) -> List[models.Order]:
-    """Obtém uma lista de pedidos com paginação.
+def get_orders(
+    db: Session,
+    skip: int = 0,
+    limit: int = 10,
+    after: Optional[Tuple[datetime, int]] = None,
+    exclude_finished: bool = False,
+) -> List[models.Order]:
+    """Obtém uma lista de pedidos, ordenada por data de criação e ID, com paginação.
+
+    Com `after` a consulta continua a partir da chave (`created_at`, `id`) do último pedido já lido,
+    usando o índice `ix_orders_created_at_id`: o custo não cresce com a página, e pedidos criados
+    durante a navegação não deslocam os demais.
+
+    Pedidos sem `created_at` (inseridos fora da aplicação) não têm posição na chave e não são listados.
 
     Args:
         db (Session): Sessão do banco de dados.
         skip (int, optional): Número de registros a pular. Defaults to 0.
         limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        after (Optional[Tuple[datetime, int]], optional): `created_at` e `id` do último pedido da página
+            anterior. Quando informado, `skip` é ignorado. Defaults to None.
+        exclude_finished (bool, optional): Se True, omite os pedidos com status `Finalizado`. Defaults to False.
 
     Returns:
         List[models.Order]: Lista de pedidos.
     """
-    logger.debug(f'Fetching orders with skip: {skip}, limit: {limit}')
+    logger.debug('Fetching orders with skip: %s, limit: %s, after: %s', skip, limit, after)
     try:
-        orders = (
+        query = (
             db.query(models.Order)
-            .order_by(models.Order.created_at.asc())
-            .offset(skip)
-            .limit(limit)
-            .all()
+            .filter(models.Order.created_at.is_not(None))
+            .order_by(models.Order.created_at.asc(), models.Order.id.asc())
         )
+        if exclude_finished:
+            query = query.filter(models.Order.status != 'Finalizado')
+        if after is not None:
+            query = query.filter(tuple_(models.Order.created_at, models.Order.id) > tuple_(*after))
+        else:
+            query = query.offset(skip)
+        orders = query.limit(limit).all()
         logger.info('Orders fetched successfully')
         return orders
     except Exception as e:
-        logger.error(f'Error fetching orders: {e}', exc_info=True)
+        logger.error('Error fetching orders: %s', e, exc_info=True)
+        raise
+
+def get_active_orders(
+    db: Session, limit: int = 10, after: Optional[Tuple[int, datetime, int]] = None
+) -> List[models.Order]:
+    """Obtém a fila da cozinha: os pedidos ativos, por prioridade de status e data de criação.
+
+    A ordem é `Pronto` > `Em preparação` > `Recebido` e, dentro de cada status, do pedido mais antigo
+    ao mais recente. Filtro e ordenação são feitos no banco pelo índice parcial `ix_orders_active_queue`,
+    que não contém os pedidos finalizados. Pedidos sem `created_at` não têm posição na fila e não são listados.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        after (Optional[Tuple[int, datetime, int]], optional): Prioridade, `created_at` e `id` do último
+            pedido da página anterior. Defaults to None.
+
+    Returns:
+        List[models.Order]: Lista de pedidos ativos.
+    """
+    logger.debug('Fetching active orders with limit: %s, after: %s', limit, after)
+    try:
+        key = (models.ORDER_QUEUE_PRIORITY, models.Order.created_at, models.Order.id)
+        query = (
+            db.query(models.Order)
+            .filter(models.ACTIVE_ORDER_FILTER, models.Order.created_at.is_not(None))
+            .order_by(*key)
+        )
+        if after is not None:
+            query = query.filter(tuple_(*key) > tuple_(*after))
+        orders = query.limit(limit).all()
+        logger.info('Active orders fetched successfully')
+        return orders
+    except Exception as e:
+        logger.error('Error fetching active orders: %s', e, exc_info=True)
         raise
 
+def get_order_version(db: Session, order_id: int) -> Optional[Tuple[datetime, str]]:
+    """Obtém a versão de um pedido sem carregá-lo: a data da última atualização e a versão do cardápio.
+
+    A versão do cardápio entra porque a visão do pedido inclui os dados dos produtos.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        order_id (int): ID do pedido.
+
+    Returns:
+        Optional[Tuple[datetime, str]]: `updated_at` do pedido e a versão do cardápio, ou None se o pedido
+        não existir.
+    """
+    menu_version = (
+        select(models.AppMetadata.value).where(models.AppMetadata.key == MENU_VERSION_KEY).scalar_subquery()
+    )
+    row = db.execute(select(models.Order.updated_at, menu_version).where(models.Order.id == order_id)).first()
+    return (row[0], row[1] or '0') if row else None
+
 def get_order(db: Session, order_id: int) -> Optional[models.Order]:
     """Obtém um pedido pelo ID.
 
@@ -568,7 +897,7 @@ def get_order(db: Session, order_id: int) -> Optional[models.Order]:
         Optional[models.Order]: O pedido correspondente, ou None se não encontrado.
     """
 
-    logger.debug(f'Fetching order with ID: {order_id}')
+    logger.debug('Fetching order with ID: %s', order_id)
     try:
         order = db.query(models.Order).options(
             joinedload(models.Order.order_products)
@@ -579,50 +908,109 @@ def get_order(db: Session, order_id: int) -> Optional[models.Order]:
         logger.info('Order fetched successfully')
         return order
     except Exception as e:
-        logger.error(f'Error fetching order: {e}', exc_info=True)
+        logger.error('Error fetching order: %s', e, exc_info=True)
         raise
 
-def get_categories(db: Session, skip: int = 0, limit: int = 10) -> List[schemas.Category]:
-    """Obtém uma lista de categorias com paginação, incluindo os produtos associados.
+def _category_menu(db: Session, categories: Select) -> List[schemas.Category]:
+    """Monta categorias com seus produtos a partir de uma única consulta.
+
+    No PostgreSQL os produtos de cada categoria são agregados em JSON pelo próprio banco; nos demais
+    bancos (SQLite nos testes) a consulta é um LEFT JOIN e as linhas são agrupadas aqui.
 
     Args:
         db (Session): Sessão do banco de dados.
-        skip (int, optional): Número de registros a pular. Defaults to 0.
-        limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        categories (Select): Consulta que seleciona `id` e `name` das categorias desejadas.
 
     Returns:
-        List[schemas.Category]: Lista de categorias com seus produtos.
+        List[schemas.Category]: As categorias, ordenadas pelo ID, com seus produtos.
     """
-    logger.debug(f'Fetching categories with skip: {skip}, limit: {limit}')
-    categories = db.execute(
-        text('SELECT id, name FROM categories LIMIT :limit OFFSET :skip'), {'limit': limit, 'skip': skip}
-    ).fetchall()
+    page = categories.subquery()
+    product = models.Product
+    joined = page.outerjoin(product, product.category_id == page.c.id)
+
+    if db.get_bind().dialect.name == 'postgresql':
+        products = func.coalesce(
+            func.json_agg(
+                aggregate_order_by(
+                    func.json_build_object(
+                        'id', product.id,
+                        'name', product.name,
+                        'description', product.description,
+                        'price', product.price,
+                    ),
+                    product.id,
+                )
+            ).filter(product.id.isnot(None)),
+            literal_column("'[]'::json"),
+            type_=JSON,
+        )
+        rows = db.execute(
+            select(page.c.id, page.c.name, products.label('products'))
+            .select_from(joined)
+            .group_by(page.c.id, page.c.name)
+            .order_by(page.c.id)
+        ).all()
+        return [
+            schemas.Category(
+                id=row.id,
+                name=row.name,
+                products=[schemas.Product(**item, category=row.name) for item in row.products],
+            )
+            for row in rows
+        ]
 
+    rows = db.execute(
+        select(
+            page.c.id,
+            page.c.name,
+            product.id.label('product_id'),
+            product.name.label('product_name'),
+            product.description,
+            product.price,
+        )
+        .select_from(joined)
+        .order_by(page.c.id, product.id)
+    ).all()
     category_list = []
-    for category in categories:
-        category_id = category.id
-        products = db.execute(
-            text('SELECT id, name, description, price FROM products WHERE category_id = :category_id'),
-            {'category_id': category_id},
-        ).fetchall()
-
+    for (category_id, category_name), group in groupby(rows, key=lambda row: (row.id, row.name)):
         product_list = [
             schemas.Product(
-                id=product.id,
-                name=product.name,
-                description=product.description,
-                price=product.price,
-                category=category.name,
+                id=row.product_id,
+                name=row.product_name,
+                description=row.description,
+                price=row.price,
+                category=category_name,
             )
-            for product in products
+            for row in group
+            if row.product_id is not None
         ]
+        category_list.append(schemas.Category(id=category_id, name=category_name, products=product_list))
+    return category_list
 
-        category_list.append(schemas.Category(id=category.id, name=category.name, products=product_list))
+def get_categories(
+    db: Session, skip: int = 0, limit: int = 10, after: Optional[int] = None
+) -> List[schemas.Category]:
+    """Obtém uma lista de categorias com paginação, incluindo os produtos associados.
 
-    return category_list
+    As categorias e seus produtos são lidos em uma única consulta, qualquer que seja o tamanho do cardápio.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        skip (int, optional): Número de registros a pular. Defaults to 0.
+        limit (int, optional): Número máximo de registros a retornar. Defaults to 10.
+        after (Optional[int], optional): ID do último item da página anterior (paginação por cursor).
+            Quando informado, `skip` é ignorado. Defaults to None.
+
+    Returns:
+        List[schemas.Category]: Lista de categorias com seus produtos.
+    """
+    logger.debug('Fetching categories with skip: %s, limit: %s, after: %s', skip, limit, after)
+    categories = select(models.Category.id, models.Category.name).order_by(models.Category.id)
+    categories = categories.where(models.Category.id > after) if after is not None else categories.offset(skip)
+    return _category_menu(db, categories.limit(limit))
 
 def get_category_with_products(db: Session, category_id: int) -> Optional[schemas.Category]:
-    """Obtém uma categoria específica e seus produtos associados.
+    """Obtém uma categoria específica e seus produtos associados em uma única consulta.
 
     Args:
         db (Session): Sessão do banco de dados.
@@ -631,24 +1019,17 @@ def get_category_with_products(db: Session, category_id: int) -> Optional[schema
     Returns:
         Optional[schemas.Category]: A categoria com seus produtos, ou None se não encontrada.
     """
-    logger.debug(f'Fetching category with ID: {category_id}')
+    logger.debug('Fetching category with ID: %s', category_id)
     try:
-        result = db.execute(
-            text('SELECT * FROM categories WHERE id = :category_id'), {'category_id': category_id}
-        ).fetchone()
-        if result:
-            products = db.execute(
-                text('SELECT * FROM products WHERE category_id = :category_id'), {'category_id': category_id}
-            ).fetchall()
-
-            product_list = [schemas.Product(**dict(product)) for product in products]
-            return schemas.Category(**dict(result), products=product_list)
+        categories = select(models.Category.id, models.Category.name).where(models.Category.id == category_id)
+        menu = _category_menu(db, categories)
+        return menu[0] if menu else None
     except Exception as e:
-        logger.error(f'Error fetching category: {e}')
+        logger.error('Error fetching category: %s', e)
         return None
 
 def get_category(db: Session, category_id: int) -> Optional[models.Category]:
-    """Obtém uma categoria pelo ID.
+    """Obtém uma categoria pelo ID, sem carregar os produtos.
 
     Args:
         db (Session): Sessão do banco de dados.
@@ -657,14 +1038,44 @@ def get_category(db: Session, category_id: int) -> Optional[models.Category]:
     Returns:
         Optional[models.Category]: A categoria correspondente, ou None se não encontrada.
     """
-    logger.debug(f'Fetching category with ID: {category_id}')
+    logger.debug('Fetching category with ID: %s', category_id)
     try:
-        category = db.query(models.Category).filter(models.Category.id == category_id).first()
-        return category
+        return db.query(models.Category).filter(models.Category.id == category_id).first()
     except Exception as e:
-        logger.error(f'Error fetching category: {e}')
+        logger.error('Error fetching category: %s', e)
         return None
 
+def get_category_by_name(db: Session, name: str) -> Optional[models.Category]:
+    """Obtém uma categoria pelo nome.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        name (str): Nome da categoria.
+
+    Returns:
+        Optional[models.Category]: A categoria correspondente, ou None se não encontrada.
+    """
+    logger.debug('Fetching category with name: %s', name)
+    return db.query(models.Category).filter(models.Category.name == name).first()
+
+def create_category(db: Session, category: schemas.CategoryCreate) -> models.Category:
+    """Cria uma nova categoria.
+
+    Args:
+        db (Session): Sessão do banco de dados.
+        category (schemas.CategoryCreate): Dados da categoria a ser criada.
+
+    Returns:
+        models.Category: A categoria criada.
+    """
+    logger.debug('Creating category with name: %s', category.name)
+    db_category = models.Category(name=category.name)
+    db.add(db_category)
+    bump_menu_version(db)
+    db.commit()
+    logger.info('Category created with ID: %s', db_category.id)
+    return db_category
+
 def update_category(
     db: Session, db_category: models.Category, category: schemas.CategoryCreate
 ) -> (Optional)[models.Category]:
@@ -678,14 +1089,14 @@ def update_category(
     Returns:
         Optional[models.Category]: A categoria atualizada, ou None em caso de erro.
     """
-    logger.debug(f'Updating category with ID: {db_category.id}')
+    logger.debug('Updating category with ID: %s', db_category.id)
     try:
         db_category.name = category.name
+        bump_menu_version(db)
         db.commit()
-        db.refresh(db_category)
         return db_category
     except Exception as e:
-        logger.error(f'Error updating category: {e}')
+        logger.error('Error updating category: %s', e)
         return None
 
 def delete_category(db: Session, db_category: models.Category) -> Optional[models.Category]:
@@ -698,11 +1109,12 @@ def delete_category(db: Session, db_category: models.Category) -> Optional[model
     Returns:
         Optional[models.Category]: A categoria deletada, ou None em caso de erro.
     """
-    logger.debug(f'Deleting category with ID: {db_category.id}')
+    logger.debug('Deleting category with ID: %s', db_category.id)
     try:
         db.delete(db_category)
+        bump_menu_version(db)
         db.commit()
         return db_category
     except Exception as e:
-        logger.error(f'Error deleting category: {e}')
+        logger.error('Error deleting category: %s', e)
         return None
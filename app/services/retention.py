@@ -0,0 +1,88 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+from os import environ as env
+from typing import Dict, Optional
+
+from ..db.database import session_scope
+from ..tools.logging import logger
+from . import async_repository
+
+# Intervalo, em segundos, entre limpezas; 0 desabilita a limpeza em segundo plano
+TOKEN_CLEANUP_INTERVAL = float(env.get('TOKEN_CLEANUP_INTERVAL', '3600'))
+
+# Tokens removidos por transação e pausa entre transações: lotes pequenos seguram os locks por pouco tempo
+TOKEN_CLEANUP_BATCH = int(env.get('TOKEN_CLEANUP_BATCH', '500'))
+TOKEN_CLEANUP_PAUSE = float(env.get('TOKEN_CLEANUP_PAUSE', '0.05'))
+
+# Carência após a expiração, para diferenças de relógio entre réplicas
+TOKEN_RETENTION_GRACE = float(env.get('TOKEN_RETENTION_GRACE', '300'))
+
+_cleanup_task: Optional[asyncio.Task] = None
+
+async def purge_expired_tokens(
+    batch_size: int = TOKEN_CLEANUP_BATCH, pause: float = TOKEN_CLEANUP_PAUSE
+) -> Dict[str, int]:
+    """Remove, em lotes, os tokens de acesso e de atualização expirados.
+
+    Cada lote usa uma sessão e uma transação próprias, e entre os lotes há uma pausa para não
+    competir com as requisições pelo banco.
+
+    Args:
+        batch_size (int): Número máximo de tokens removidos por transação.
+        pause (float): Pausa, em segundos, entre lotes.
+
+    Returns:
+        Dict[str, int]: Número de tokens removidos de cada tabela.
+    """
+    before = datetime.now(timezone.utc) - timedelta(seconds=TOKEN_RETENTION_GRACE)
+    purges = {
+        'tokens': async_repository.delete_expired_tokens,
+        'refresh_tokens': async_repository.delete_expired_refresh_tokens,
+    }
+    removed = dict.fromkeys(purges, 0)
+    for table, purge in purges.items():
+        while True:
+            async with session_scope() as db:
+                count = await purge(db, before, batch_size)
+            removed[table] += count
+            if count < batch_size:
+                break
+            await asyncio.sleep(pause)
+    return removed
+
+async def _cleanup_loop() -> None:
+    """Executa a limpeza periodicamente até ser cancelada."""
+    while True:
+        # Intervalos aleatórios espalham as limpezas das réplicas
+        await asyncio.sleep(TOKEN_CLEANUP_INTERVAL * random.uniform(0.5, 1.0))
+        try:
+            removed = await purge_expired_tokens()
+            logger.info('Expired tokens purged: %s', removed)
+        except Exception as e:
+            logger.warning('Failed to purge expired tokens: %s', e)
+
+async def start_token_cleanup() -> None:
+    """Inicia a limpeza periódica dos tokens expirados, se habilitada.
+
+    Returns:
+        None
+    """
+    global _cleanup_task
+    if TOKEN_CLEANUP_INTERVAL > 0 and _cleanup_task is None:
+        _cleanup_task = asyncio.create_task(_cleanup_loop())
+
+async def stop_token_cleanup() -> None:
+    """Encerra a limpeza periódica dos tokens expirados.
+
+    Returns:
+        None
+    """
+    global _cleanup_task
+    if _cleanup_task is not None:
+        _cleanup_task.cancel()
+        try:
+            await _cleanup_task
+        except asyncio.CancelledError:
+            pass
+        _cleanup_task = None
@@ -1,3 +1,6 @@
+import hashlib
+import secrets
+import time
 from datetime import datetime, timedelta, timezone
 from os import environ as env
 from typing import Union
@@ -10,8 +13,9 @@ from sqlalchemy.orm import Session
 
 from ..db import database
 from ..model import schemas
-from ..tools.logging import logger
-from . import repository
+from ..tools.logging import get_logger
+from . import cache, repository
+from .token_ledger import token_ledger
 
 load_dotenv()
 
@@ -19,11 +23,15 @@ load_dotenv()
 SECRET_KEY = env.get('SECRET_KEY')
 ALGORITHM = 'HS256'
 ACCESS_TOKEN_EXPIRE_MINUTES = 5
+REFRESH_TOKEN_EXPIRE_DAYS = int(env.get('REFRESH_TOKEN_EXPIRE_DAYS', '7'))
 
 # Contexto para hash de senha e Token
 pwd_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='token')
 
+# Logger próprio, para regras de nível e de amostragem (`Application.security`) sem mudar o código
+logger = get_logger('security')
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """Verifica se a senha fornecida corresponde à senha criptografada.
 
@@ -83,16 +91,60 @@ def create_access_token(data: dict, expires_delta: Union[timedelta, None] = None
     else:
         expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     to_encode.update({'exp': expire})
-    logger.info(f'Creating access token with expiration: {expire.isoformat()}')
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
-    logger.info(f'JWT created: {encoded_jwt}')
+    logger.debug('Access token created with expiration: %s', expire)
     return encoded_jwt
 
-def get_current_user(db: Session = Depends(database.get_db), token: str = Depends(oauth2_scheme)) -> schemas.Customer:
+def create_refresh_token() -> str:
+    """Gera um token de atualização aleatório e opaco.
+
+    Returns:
+        str: O token, seguro para URLs.
+    """
+    return secrets.token_urlsafe(32)
+
+def hash_token(token: str) -> str:
+    """Calcula o hash com que um token é armazenado e procurado no banco.
+
+    Args:
+        token (str): O token.
+
+    Returns:
+        str: O SHA-256 do token, em hexadecimal.
+    """
+    return hashlib.sha256(token.encode()).hexdigest()
+
+def decode_token(token: str) -> dict:
+    """Verifica a assinatura e a expiração de um JWT e retorna as suas claims.
+
+    As claims de um token já verificado ficam em cache, pelo hash do token, até a expiração dele:
+    reapresentar o mesmo token não repete a verificação do HMAC nem o parse do JSON.
+
+    Args:
+        token (str): O token JWT.
+
+    Returns:
+        dict: As claims do token.
+
+    Raises:
+        JWTError: Se a assinatura for inválida ou o token estiver expirado.
+    """
+    key = ('jwt', hashlib.sha256(token.encode()).digest())
+    payload = cache.claims_cache.get(key)
+    if payload is None:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        exp = payload.get('exp')
+        if exp is not None:
+            cache.claims_cache.set(key, payload, ttl=exp - time.time())
+    return payload
+
+async def get_current_user(
+    db: database.DBSession = Depends(database.get_session), token: str = Depends(oauth2_scheme)
+) -> schemas.Customer:
     """Obtém o usuário atual com base no token JWT fornecido.
 
     Args:
-        db (Session, optional): Sessão do banco de dados. Defaults to Depends(database.get_db).
+        db (DBSession, optional): Sessão do banco de dados. Defaults to Depends(database.get_session).
         token (str, optional): Token JWT fornecido. Defaults to Depends(oauth2_scheme).
 
     Returns:
@@ -101,7 +153,7 @@ def get_current_user(db: Session = Depends(database.get_db), token: str = Depend
     Raises:
         HTTPException: Se o token for inválido, expirado ou o usuário não for encontrado.
     """
-    logger.info('Fetching current user from token')
+    logger.debug('Fetching current user from token')
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail='Could not validate credentials',
@@ -109,34 +161,29 @@ def get_current_user(db: Session = Depends(database.get_db), token: str = Depend
     )
 
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        payload = decode_token(token)
         user_id: int = payload.get('sub')
         exp: int = payload.get('exp')
-        current_time = datetime.now(timezone.utc)
-        logger.info(f'Token decoded, user_id: {user_id}, exp: {exp}, current_time: {current_time.isoformat()}')
+        logger.debug('Token decoded, user_id: %s, exp: %s', user_id, exp)
 
         if user_id is None:
             logger.warning('User ID not found in token payload')
             raise credentials_exception
 
     except JWTError as e:
-        logger.error(f'JWT Error decoding token: {e}')
+        logger.error('JWT Error decoding token: %s', e)
         raise credentials_exception
 
-    # Verifica se o token foi usado
-    if repository.is_token_used(db, token):
+    # Registra o uso do token: uma única operação atômica no Redis (ou no banco, sem o Redis)
+    if not await token_ledger.consume(db, token, exp):
         logger.warning('Token has already been used')
         raise HTTPException(status_code=401, detail='Token has already been used')
 
     # Busca o usuário pelo ID
-    user = repository.get_customer(db, customer_id=user_id)
+    user = await cache.get_customer(db, customer_id=user_id)
     if user is None:
-        logger.warning(f'User not found with ID: {user_id}')
+        logger.warning('User not found with ID: %s', user_id)
         raise credentials_exception
 
-    # Marca o token como usado
-    repository.mark_token_as_used(db, token)
-    logger.info(f'User authenticated: {user.email}')
-
-    # Retorna os dados do usuário
-    return schemas.Customer(id=user_id, name=user.name, email=user.email, cpf=user.cpf)
+    logger.debug('User authenticated: %s', user.id)
+    return user
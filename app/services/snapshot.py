@@ -0,0 +1,85 @@
+import gzip
+import json
+from typing import Any, Dict, Optional
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+class Snapshot:
+    """
+    Resposta JSON compilada uma única vez, em bytes, com a versão comprimida em gzip.
+
+    Servir um snapshot é só copiar bytes para a resposta: não há validação pelo `response_model`
+    nem serialização a cada requisição.
+
+    Attributes:
+        body: O JSON da resposta.
+        gzip_body: O JSON comprimido em gzip.
+        headers: Cabeçalhos próprios da resposta (ex.: `X-Next-Cursor`).
+    """
+
+    __slots__ = ('body', 'gzip_body', 'headers')
+
+    def __init__(self, content: Any, headers: Optional[Dict[str, str]] = None):
+        """
+        Compila o conteúdo em JSON, como a `JSONResponse` do FastAPI, e o comprime.
+
+        Args:
+            content: Conteúdo da resposta; modelos Pydantic são convertidos por `jsonable_encoder`.
+            headers: Cabeçalhos próprios da resposta.
+        """
+        self.body = json.dumps(
+            jsonable_encoder(content), ensure_ascii=False, allow_nan=False, separators=(',', ':')
+        ).encode('utf-8')
+        # mtime fixo: o mesmo conteúdo gera sempre os mesmos bytes
+        self.gzip_body = gzip.compress(self.body, compresslevel=9, mtime=0)
+        self.headers = headers or {}
+
+def accepts_gzip(request: Request) -> bool:
+    """Verifica se o cliente aceita respostas comprimidas em gzip.
+
+    Lê cada codificação de `Accept-Encoding` com o seu peso (`q`): `gzip` (ou `x-gzip`) com peso
+    maior que zero é aceito; sem ela na lista, vale o peso de `*`. Peso inválido conta como zero.
+
+    Args:
+        request (Request): A requisição atual.
+
+    Returns:
+        bool: True se `Accept-Encoding` aceita gzip.
+    """
+    wildcard = False
+    for item in request.headers.get('accept-encoding', '').lower().split(','):
+        coding, _, params = item.partition(';')
+        coding = coding.strip()
+        if coding not in ('gzip', 'x-gzip', '*'):
+            continue
+        weight = 1.0
+        for param in params.split(';'):
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    weight = float(value.strip())
+                except ValueError:
+                    weight = 0.0
+        if coding == '*':
+            wildcard = weight > 0
+        else:
+            return weight > 0
+    return wildcard
+
+def snapshot_response(request: Request, snapshot: Snapshot, headers: Optional[Dict[str, str]] = None) -> Response:
+    """Serve um snapshot, comprimido quando o cliente aceita gzip.
+
+    Args:
+        request (Request): A requisição atual.
+        snapshot (Snapshot): O snapshot a servir.
+        headers (Optional[Dict[str, str]]): Cabeçalhos adicionais (ex.: `ETag` e `Cache-Control`).
+
+    Returns:
+        Response: A resposta com o JSON pronto.
+    """
+    headers = {**snapshot.headers, **(headers or {}), 'Vary': 'Accept-Encoding'}
+    if accepts_gzip(request):
+        headers['Content-Encoding'] = 'gzip'
+        return Response(snapshot.gzip_body, media_type='application/json', headers=headers)
+    return Response(snapshot.body, media_type='application/json', headers=headers)
@@ -0,0 +1,121 @@
+import hashlib
+import time
+from os import environ as env
+from typing import Optional
+
+from aioredis import Redis, from_url
+from fastapi import HTTPException, status
+
+from ..db.database import DBSession
+from ..tools.circuit_breaker import CircuitBreaker
+from ..tools.logging import logger
+from . import async_repository
+
+# Prefixo das chaves no Redis; o token nunca é gravado, só o seu hash
+TOKEN_KEY_PREFIX = 'auth:token-used'
+
+IS_LAMBDA = bool(env.get('AWS_LAMBDA_FUNCTION_NAME'))
+
+class TokenLedger:
+    """
+    Registro dos tokens de uso único já apresentados.
+
+    Com o Redis configurado, ele é o registro de referência: cada uso é um único `SET NX` com a chave
+    derivada do hash do token e expiração igual à do JWT, atômico entre réplicas e sem escrita no
+    banco. Sem o Redis configurado, a verificação usa a tabela `tokens`.
+
+    Se uma chamada ao Redis falhar, ou com o disjuntor aberto, a requisição é recusada com 503: o banco
+    não conhece os usos registrados só no Redis, e verificar o token por ele aceitaria um token já usado.
+
+    Attributes:
+        redis_url: URL de conexão ao Redis; vazia para usar só o banco.
+        breaker: Disjuntor das chamadas ao Redis.
+        redis: Cliente Redis, criado no primeiro uso.
+    """
+
+    def __init__(self, redis_url: str, breaker: Optional[CircuitBreaker] = None):
+        """
+        Inicializa o registro; a conexão ao Redis é aberta no primeiro uso.
+
+        Args:
+            redis_url: URL de conexão ao Redis; vazia para usar só o banco.
+            breaker: Disjuntor das chamadas ao Redis; por padrão, 3 falhas o abrem por 30 segundos.
+        """
+        self.redis_url = redis_url
+        self.breaker = breaker or CircuitBreaker(name='registro de tokens')
+        self.redis: Optional[Redis] = None
+
+    @staticmethod
+    def key(token: str) -> str:
+        """
+        Calcula a chave do token no Redis.
+
+        Args:
+            token: O token JWT.
+
+        Returns:
+            str: A chave, com o SHA-256 do token.
+        """
+        return f'{TOKEN_KEY_PREFIX}:{hashlib.sha256(token.encode()).hexdigest()}'
+
+    async def consume(self, db: DBSession, token: str, exp: Optional[int]) -> bool:
+        """
+        Registra o uso do token, se ele ainda não foi usado.
+
+        Args:
+            db: Sessão do banco de dados, usada quando o Redis não está configurado.
+            token: O token JWT.
+            exp: Expiração do token (claim `exp`, em segundos desde a época).
+
+        Returns:
+            bool: True se este é o primeiro uso do token, False se ele já foi usado.
+
+        Raises:
+            HTTPException: 503, se o Redis estiver configurado e falhar ou o disjuntor estiver aberto.
+        """
+        if not self.redis_url:
+            return await async_repository.consume_token(db, token)
+        if not self.breaker.allow():
+            raise self._unavailable()
+
+        key = self.key(token)
+        # O registro só precisa durar enquanto o token for aceito
+        ttl = max(int(exp - time.time()), 1) if exp else None
+        try:
+            if self.redis is None:
+                self.redis = from_url(self.redis_url, decode_responses=True)
+            first_use = await self.redis.set(key, 1, ex=ttl, nx=True)
+        except Exception as e:
+            self.breaker.failure()
+            logger.warning('Token ledger unavailable, rejecting the request: %s', e)
+            raise self._unavailable()
+        self.breaker.success()
+        return bool(first_use)
+
+    def _unavailable(self) -> HTTPException:
+        """
+        Monta a resposta 503 dada enquanto o Redis não pode verificar os tokens.
+
+        Returns:
+            HTTPException: 503, com `Retry-After` igual ao tempo de reabertura do disjuntor.
+        """
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail='Serviço de autenticação indisponível, tente novamente em instantes',
+            headers={'Retry-After': str(max(int(self.breaker.reset_timeout), 1))},
+        )
+
+    async def close(self) -> None:
+        """
+        Fecha a conexão com o Redis, se aberta.
+
+        Na AWS Lambda não faz nada: o Mangum executa o lifespan a cada invocação, e fechar a conexão
+        obrigaria a próxima requisição a reconectar. A conexão dura o ambiente de execução.
+        """
+        if IS_LAMBDA:
+            return
+        if self.redis is not None:
+            await self.redis.close()
+            self.redis = None
+
+token_ledger = TokenLedger(env.get('REDIS_URL', ''))
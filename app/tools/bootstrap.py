@@ -0,0 +1,221 @@
+import hashlib
+import json
+from contextlib import contextmanager
+from os import environ as env
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+from alembic import command
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from ..db.database import engine
+from ..model import models
+from ..services.repository import bump_menu_version, create_admin_user
+from .initialize_db import SEED_CATEGORIES, SEED_PRODUCTS, initialize_db
+from .logging import logger
+
+ALEMBIC_DIR = Path(__file__).resolve().parents[2] / 'alembic'
+
+# Revisão mais recente em alembic/versions (um teste garante que não divergem)
+SCHEMA_HEAD = '0007'
+
+# Revisão que corresponde ao esquema criado por `create_all` antes do Alembic
+BASELINE_REVISION = '0001'
+
+SEED_FINGERPRINT_KEY = 'seed_fingerprint'
+
+# auto: migra e carrega os dados só quando necessário; force: sempre; off: não acessa o banco
+BOOTSTRAP_MODES = ('auto', 'force', 'off')
+
+# Estado do banco em uma única consulta: revisão do esquema e impressão digital dos dados iniciais
+STATE_QUERY = text(
+    'SELECT (SELECT version_num FROM alembic_version), '
+    '(SELECT value FROM app_metadata WHERE key = :key)'
+)
+
+# Lock consultivo que serializa migrações e carga dos dados entre réplicas iniciando ao mesmo tempo
+BOOTSTRAP_LOCK_KEY = 7_354_218_009
+ADVISORY_LOCK_DIALECTS = ('postgresql',)
+
+def seed_fingerprint() -> str:
+    """Calcula a impressão digital dos dados iniciais (categorias, produtos e administrador).
+
+    Returns:
+        str: Hash SHA-256 dos dados que `initialize_db` e `create_admin_user` gravam.
+    """
+    payload = {
+        'categories': SEED_CATEGORIES,
+        'products': SEED_PRODUCTS,
+        'admin': [env.get('ADMIN_EMAIL'), env.get('ADMIN_CPF'), env.get('ADMIN_NAME')],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def read_state(bind: Union[Engine, Connection]) -> Tuple[Optional[str], Optional[str]]:
+    """Lê a revisão do esquema e a impressão digital dos dados iniciais gravadas no banco.
+
+    Args:
+        bind (Union[Engine, Connection]): Engine do banco principal, ou uma conexão já aberta.
+
+    Returns:
+        Tuple[Optional[str], Optional[str]]: A revisão do Alembic e a impressão digital, ou None
+        para o que ainda não existir.
+    """
+    if isinstance(bind, Connection):
+        try:
+            version, fingerprint = bind.execute(STATE_QUERY, {'key': SEED_FINGERPRINT_KEY}).one()
+            bind.commit()
+            return version, fingerprint
+        except SQLAlchemyError:
+            # Tabelas ainda inexistentes: o banco é novo ou anterior ao Alembic
+            bind.rollback()
+            return None, None
+    try:
+        with bind.connect() as connection:
+            return read_state(connection)
+    except SQLAlchemyError:
+        return None, None
+
+@contextmanager
+def schema_lock(bind: Engine) -> Iterator[Connection]:
+    """Abre uma conexão que detém o lock de inicialização do banco até o fim do bloco.
+
+    No PostgreSQL é um `pg_advisory_lock` de sessão: réplicas iniciando juntas aplicam as migrações
+    e os dados iniciais uma de cada vez, e ele continua valendo nas migrações que rodam fora de
+    transação (`CREATE INDEX CONCURRENTLY`). Todo o trabalho usa a mesma conexão, para não esperar
+    por uma segunda conexão em pools de tamanho 1 (perfil `lambda`). Nos demais bancos não há lock.
+
+    Args:
+        bind (Engine): Engine do banco principal.
+
+    Yields:
+        Iterator[Connection]: A conexão que detém o lock.
+    """
+    with bind.connect() as connection:
+        locked = connection.dialect.name in ADVISORY_LOCK_DIALECTS
+        if locked:
+            connection.execute(text('SELECT pg_advisory_lock(:key)'), {'key': BOOTSTRAP_LOCK_KEY})
+            connection.commit()
+        try:
+            yield connection
+        finally:
+            if locked:
+                connection.rollback()
+                connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': BOOTSTRAP_LOCK_KEY})
+                connection.commit()
+
+def alembic_config(connection: Optional[Connection] = None) -> Config:
+    """Monta a configuração do Alembic sem depender do `alembic.ini` nem do diretório atual.
+
+    Args:
+        connection (Optional[Connection]): Conexão repassada para `alembic/env.py`.
+
+    Returns:
+        Config: A configuração apontando para `alembic/`.
+    """
+    config = Config()
+    config.set_main_option('script_location', str(ALEMBIC_DIR))
+    if connection is not None:
+        config.attributes['connection'] = connection
+    return config
+
+def migrate(bind: Engine) -> None:
+    """Aplica as migrações pendentes do Alembic, com o lock de inicialização do banco.
+
+    Args:
+        bind (Engine): Engine do banco principal.
+    """
+    with schema_lock(bind) as connection:
+        upgrade(connection)
+
+def upgrade(connection: Connection) -> None:
+    """Aplica as migrações pendentes do Alembic na conexão informada.
+
+    Bancos criados por `create_all`, sem a tabela `alembic_version`, são marcados com a revisão
+    de base antes da atualização, para que as tabelas existentes não sejam recriadas.
+
+    Args:
+        connection (Connection): Conexão com o banco principal, fora de uma transação.
+    """
+    current = MigrationContext.configure(connection).get_current_revision()
+    legacy = current is None and inspect(connection).has_table('customers')
+    # O Alembic controla as próprias transações (migrações com `autocommit_block` não rodam dentro de uma)
+    connection.commit()
+
+    config = alembic_config(connection)
+    if legacy:
+        logger.info(f'Existing schema without Alembic version, stamping {BASELINE_REVISION}')
+        command.stamp(config, BASELINE_REVISION)
+    command.upgrade(config, 'head')
+    connection.commit()
+
+def seed(bind: Union[Engine, Connection], fingerprint: str) -> None:
+    """Carrega o administrador e os dados iniciais e grava a impressão digital correspondente.
+
+    Args:
+        bind (Union[Engine, Connection]): Engine do banco principal, ou uma conexão fora de uma transação.
+        fingerprint (str): Impressão digital dos dados carregados.
+    """
+    with Session(bind=bind) as db:
+        create_admin_user(db)
+        initialize_db(db)
+        db.merge(models.AppMetadata(key=SEED_FINGERPRINT_KEY, value=fingerprint))
+        # Réplicas que já serviram o cardápio anterior não devem responder 304 para ele
+        bump_menu_version(db)
+        db.commit()
+
+def bootstrap(bind: Engine = engine, mode: Optional[str] = None) -> Dict[str, bool]:
+    """Prepara o banco na inicialização da aplicação.
+
+    No caso comum (esquema em `SCHEMA_HEAD` e dados iniciais inalterados) custa uma única consulta;
+    as migrações e a carga dos dados, incluindo o hash bcrypt do administrador, só rodam quando
+    o banco está desatualizado, com o lock de `schema_lock`, e o estado é relido depois de obtê-lo.
+
+    Args:
+        bind (Engine): Engine do banco principal.
+        mode (Optional[str]): `auto`, `force` ou `off`. Se omitido, usa `DB_BOOTSTRAP` (padrão `auto`).
+
+    Returns:
+        Dict[str, bool]: Se as migrações (`migrated`) e os dados iniciais (`seeded`) foram aplicados.
+
+    Raises:
+        ValueError: Se o modo não for conhecido.
+    """
+    mode = (mode or env.get('DB_BOOTSTRAP', 'auto')).lower()
+    if mode not in BOOTSTRAP_MODES:
+        raise ValueError(f'Modo de inicialização do banco desconhecido: {mode}. Use um de {BOOTSTRAP_MODES}')
+    if mode == 'off':
+        return {'migrated': False, 'seeded': False}
+
+    fingerprint = seed_fingerprint()
+
+    def pending(version: Optional[str], stored_fingerprint: Optional[str]) -> Dict[str, bool]:
+        """O que falta aplicar, dado o estado lido do banco."""
+        return {
+            'migrated': mode == 'force' or version != SCHEMA_HEAD,
+            'seeded': mode == 'force' or stored_fingerprint != fingerprint,
+        }
+
+    version, stored_fingerprint = read_state(bind)
+    result = pending(version, stored_fingerprint)
+    if not any(result.values()):
+        logger.debug('Database schema and initial data are current, skipping bootstrap')
+        return result
+
+    with schema_lock(bind) as connection:
+        # Outra réplica pode ter concluído o trabalho enquanto esta aguardava o lock
+        version, stored_fingerprint = read_state(connection)
+        result = pending(version, stored_fingerprint)
+        if result['migrated']:
+            logger.info(f'Migrating database schema from {version} to {SCHEMA_HEAD}')
+            upgrade(connection)
+        if result['seeded']:
+            logger.info('Loading initial data')
+            seed(connection, fingerprint)
+    if not any(result.values()):
+        logger.debug('Database schema and initial data were applied by another replica')
+    return result
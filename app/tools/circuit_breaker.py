@@ -0,0 +1,71 @@
+import time
+from typing import Optional
+
+from .logging import logger
+
+class CircuitBreaker:
+    """
+    Disjuntor para chamadas a um serviço externo, como o Redis.
+
+    Depois de `failure_threshold` falhas seguidas o circuito abre e as chamadas são evitadas por
+    `reset_timeout` segundos; em seguida uma única chamada de teste é liberada (meio-aberto) e o
+    resultado dela fecha ou reabre o circuito.
+
+    Attributes:
+        failure_threshold: Número de falhas seguidas que abre o circuito.
+        reset_timeout: Tempo, em segundos, com o circuito aberto antes da chamada de teste.
+        failures: Falhas seguidas desde o último sucesso.
+        opened_at: Instante (`time.monotonic`) em que o circuito abriu, ou None se fechado.
+        name: Quem usa o disjuntor, para os logs.
+    """
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 30.0, name: str = 'Redis'):
+        """
+        Inicializa o disjuntor fechado.
+
+        Args:
+            failure_threshold: Número de falhas seguidas que abre o circuito.
+            reset_timeout: Tempo, em segundos, com o circuito aberto antes da chamada de teste.
+            name: Quem usa o disjuntor, para os logs.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        """Indica se o circuito está aberto (ou meio-aberto, aguardando a chamada de teste)."""
+        return self.opened_at is not None
+
+    def allow(self) -> bool:
+        """
+        Verifica se uma chamada ao serviço pode ser feita agora.
+
+        Returns:
+            bool: True se o circuito está fechado ou se esta é a chamada de teste.
+        """
+        if self.opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self.opened_at < self.reset_timeout:
+            return False
+        # Meio-aberto: libera esta chamada e bloqueia as demais até o resultado dela
+        self.opened_at = now
+        return True
+
+    def success(self) -> None:
+        """Registra uma chamada bem-sucedida e fecha o circuito."""
+        if self.opened_at is not None:
+            logger.info('Circuito de %s fechado, serviço disponível novamente', self.name)
+        self.failures = 0
+        self.opened_at = None
+
+    def failure(self) -> None:
+        """Registra uma chamada com falha e abre o circuito ao atingir o limite de falhas seguidas."""
+        self.failures += 1
+        if self.failures >= self.failure_threshold:
+            if self.opened_at is None:
+                logger.warning('Circuito de %s aberto após %s falhas seguidas', self.name, self.failures)
+            self.opened_at = time.monotonic()
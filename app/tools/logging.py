@@ -1,25 +1,570 @@
+import atexit
+import copy
+import glob
+import gzip
+import json
 import logging
 import os
-from datetime import datetime
+import queue
+import random
+import shutil
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from fnmatch import fnmatchcase
+from logging.handlers import BaseRotatingHandler, QueueHandler, QueueListener
+from typing import Dict, List, Optional, Tuple
 
 # Criação do diretório de logs se não existir
-log_directory = '/tmp/logs'
+log_directory = os.environ.get('LOG_DIR', '/tmp/logs')
 if not os.path.exists(log_directory):
     os.makedirs(log_directory)
 
-# Configuração do nome do arquivo de log baseado na data atual
-log_filename = datetime.now().strftime('%Y-%m-%d') + '.log'
+# Arquivo ativo; os rotacionados recebem o horário da rotação no nome (ex.: `app.log.2024-05-01_00-00-00.gz`)
+log_filename = 'app.log'
 log_filepath = os.path.join(log_directory, log_filename)
 
-# Configuração do logger
-logging.basicConfig(
-    level=logging.INFO,
-    format=(
-        '%(asctime)s - %(filename)s - %(pathname)s - %(name)s - '
-        '%(lineno)s - %(levelname)s - %(funcName)s - %(threadName)s - %(message)s'
-    ),
-    handlers=[logging.FileHandler(log_filepath), logging.StreamHandler()],
+# Rotação a cada LOG_ROTATE_INTERVAL segundos (alinhada ao UTC: 86400 vira à meia-noite) ou ao
+# atingir LOG_MAX_BYTES; 0 desabilita o respectivo critério
+LOG_ROTATE_INTERVAL = int(os.environ.get('LOG_ROTATE_INTERVAL', '86400'))
+LOG_MAX_BYTES = int(os.environ.get('LOG_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Retenção dos arquivos rotacionados: os mais antigos são removidos acima de qualquer um dos limites
+LOG_BACKUP_COUNT = int(os.environ.get('LOG_BACKUP_COUNT', '14'))
+LOG_MAX_TOTAL_BYTES = int(os.environ.get('LOG_MAX_TOTAL_BYTES', str(256 * 1024 * 1024)))
+LOG_COMPRESS = os.environ.get('LOG_COMPRESS', 'true').lower() == 'true'
+
+# `text` (padrão) ou `json`, um objeto por linha, para agregadores de logs
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+
+# Os registros passam por uma fila e são gravados por uma única thread em segundo plano. Desligado por
+# padrão: no benchmark de `benchmarks/logging_overhead.py` a fila não reduziu a latência. Na AWS Lambda
+# nunca é usado: a thread congela entre invocações e o que estiver na fila pode se perder
+LOG_ASYNC = os.environ.get('LOG_ASYNC', 'false').lower() == 'true' and not os.environ.get('AWS_LAMBDA_FUNCTION_NAME')
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', '10000'))
+
+# Com a fila cheia: `drop` descarta o registro (e o conta); `block` espera espaço na fila
+LOG_QUEUE_POLICY = os.environ.get('LOG_QUEUE_POLICY', 'drop').lower()
+
+# Amostragem dos registros abaixo de WARNING: regras `padrão=fração`, separadas por vírgula. O padrão
+# é o nome de um logger, que vale também para os filhos (ex.: `Application.security=0.01`), ou, com o
+# prefixo `route:`, o método e o caminho da requisição, com curingas (ex.: `route:GET /orders*=0.1`)
+LOG_SAMPLING = os.environ.get('LOG_SAMPLING', '')
+
+# Nível por logger, ex.: `Application.security=WARNING,httpx=WARNING`
+LOG_LEVELS = os.environ.get('LOG_LEVELS', '')
+
+# Registros por segundo de cada linha de código, com rajadas de até LOG_RATE_BURST; os excedentes são
+# suprimidos e contados em um resumo a cada LOG_SUPPRESSION_SUMMARY segundos. 0 desabilita
+LOG_RATE_LIMIT = float(os.environ.get('LOG_RATE_LIMIT', '50'))
+LOG_RATE_BURST = float(os.environ.get('LOG_RATE_BURST', '100'))
+LOG_SUPPRESSION_SUMMARY = float(os.environ.get('LOG_SUPPRESSION_SUMMARY', '60'))
+
+# Método e caminho da requisição em andamento (ex.: `GET /orders/1`), para as regras `route:`
+request_route: ContextVar[str] = ContextVar('request_route', default='')
+
+TEXT_FORMAT = (
+    '%(asctime)s - %(filename)s - %(pathname)s - %(name)s - '
+    '%(lineno)s - %(levelname)s - %(funcName)s - %(threadName)s - %(message)s'
 )
 
+class JsonFormatter(logging.Formatter):
+    """
+    Formata cada registro como um objeto JSON em uma única linha.
+
+    Contém os mesmos campos do formato texto, com o horário em ISO 8601 (UTC) e, se houver, a
+    exceção formatada em `exc_info`.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        """
+        Formata o registro.
+
+        Args:
+            record: O registro de log.
+
+        Returns:
+            str: O registro em JSON.
+        """
+        entry = {
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'file': record.filename,
+            'line': record.lineno,
+            'function': record.funcName,
+            'thread': record.threadName,
+        }
+        if record.exc_info:
+            entry['exc_info'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry['exc_info'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class BoundedQueueHandler(QueueHandler):
+    """
+    Envia os registros para uma fila limitada, lida por um `QueueListener` em segundo plano.
+
+    A thread que registra só formata a mensagem e a coloca na fila; a escrita em arquivo e no
+    terminal fica com o listener. Se a fila encher, o registro é descartado (`drop`) ou a thread
+    espera espaço (`block`).
+
+    Attributes:
+        policy: `drop` ou `block`.
+        dropped: Número de registros descartados com a fila cheia.
+    """
+
+    def __init__(self, log_queue: queue.Queue, policy: str = 'drop'):
+        """
+        Inicializa o handler.
+
+        Args:
+            log_queue: A fila limitada compartilhada com o listener.
+            policy: `drop` ou `block`.
+        """
+        super().__init__(log_queue)
+        self.policy = policy
+        self.dropped = 0
+        self._exception_formatter = logging.Formatter()
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        """
+        Coloca o registro na fila, segundo a política para fila cheia.
+
+        Args:
+            record: O registro já preparado.
+        """
+        if self.policy == 'block':
+            self.queue.put(record)
+            return
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """
+        Prepara uma cópia do registro para a fila: a mensagem já interpolada e a exceção já
+        formatada, sem referências aos argumentos e ao traceback.
+
+        Args:
+            record: O registro de log.
+
+        Returns:
+            logging.LogRecord: A cópia do registro.
+        """
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or self._exception_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+class RotatingLogFileHandler(BaseRotatingHandler):
+    """
+    Grava os logs em um arquivo rotacionado por tempo e por tamanho, com retenção limitada.
+
+    Na rotação, o arquivo ativo só é renomeado; a compressão com gzip e a remoção dos arquivos
+    além da retenção ficam com uma thread própria, fora da thread que grava os registros.
+
+    Attributes:
+        interval: Segundos entre rotações por tempo; 0 desabilita.
+        max_bytes: Tamanho que dispara a rotação; 0 desabilita.
+        backup_count: Número máximo de arquivos rotacionados mantidos; 0 não limita.
+        max_total_bytes: Espaço máximo dos arquivos rotacionados somados ao ativo; 0 não limita.
+        compress: Se os arquivos rotacionados são comprimidos com gzip.
+        rollover_at: Instante (epoch) da próxima rotação por tempo.
+    """
+
+    def __init__(
+        self,
+        filename: str,
+        interval: int = LOG_ROTATE_INTERVAL,
+        max_bytes: int = LOG_MAX_BYTES,
+        backup_count: int = LOG_BACKUP_COUNT,
+        max_total_bytes: int = LOG_MAX_TOTAL_BYTES,
+        compress: bool = LOG_COMPRESS,
+    ):
+        """
+        Inicializa o handler e agenda a próxima rotação por tempo.
+
+        Um arquivo ativo deixado por uma execução anterior é rotacionado no primeiro registro se
+        tiver sido gravado antes do intervalo atual.
+
+        Args:
+            filename: Caminho do arquivo ativo.
+            interval: Segundos entre rotações por tempo; 0 desabilita.
+            max_bytes: Tamanho que dispara a rotação; 0 desabilita.
+            backup_count: Número máximo de arquivos rotacionados mantidos; 0 não limita.
+            max_total_bytes: Espaço máximo dos arquivos rotacionados somados ao ativo; 0 não limita.
+            compress: Se os arquivos rotacionados são comprimidos com gzip.
+        """
+        super().__init__(filename, 'a', encoding='utf-8')
+        self.interval = interval
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.max_total_bytes = max_total_bytes
+        self.compress = compress
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='log-rotation')
+        last_write = os.path.getmtime(filename) if os.path.exists(filename) else time.time()
+        self.rollover_at = self._next_rollover(last_write)
+
+    def _next_rollover(self, now: float) -> float:
+        """
+        Calcula o instante da próxima rotação por tempo, alinhado ao UTC.
+
+        Args:
+            now: O instante de referência (epoch).
+
+        Returns:
+            float: O instante da próxima rotação, ou infinito se a rotação por tempo estiver desabilitada.
+        """
+        if self.interval <= 0:
+            return float('inf')
+        return (now // self.interval + 1) * self.interval
+
+    def shouldRollover(self, record: logging.LogRecord) -> bool:
+        """
+        Indica se o arquivo deve ser rotacionado antes de gravar o registro.
+
+        Args:
+            record: O registro de log.
+
+        Returns:
+            bool: Se o intervalo terminou ou se o registro faria o arquivo passar de `max_bytes`.
+        """
+        if time.time() >= self.rollover_at:
+            return True
+        if self.max_bytes > 0:
+            if self.stream is None:
+                self.stream = self._open()
+            position = self.stream.tell()
+            return position > 0 and position + len(self.format(record)) + 1 >= self.max_bytes
+        return False
+
+    def doRollover(self) -> None:
+        """
+        Renomeia o arquivo ativo, abre um novo e agenda a compressão e a retenção em segundo plano.
+
+        Returns:
+            None
+        """
+        if self.stream:
+            self.stream.close()
+            self.stream = None
+        if os.path.exists(self.baseFilename) and os.path.getsize(self.baseFilename) > 0:
+            rotated = self._rotated_name()
+            os.rename(self.baseFilename, rotated)
+            self._executor.submit(self._compress_and_prune, rotated)
+        self.rollover_at = self._next_rollover(time.time())
+        self.stream = self._open()
+
+    def _rotated_name(self) -> str:
+        """
+        Gera o nome do arquivo rotacionado a partir do horário atual (UTC), sem repetir nomes.
+
+        Returns:
+            str: O caminho do arquivo rotacionado.
+        """
+        stamp = time.strftime('%Y-%m-%d_%H-%M-%S', time.gmtime())
+        rotated = f'{self.baseFilename}.{stamp}'
+        suffix = 1
+        while os.path.exists(rotated) or os.path.exists(rotated + '.gz'):
+            rotated = f'{self.baseFilename}.{stamp}.{suffix}'
+            suffix += 1
+        return rotated
+
+    def _compress_and_prune(self, rotated: str) -> None:
+        """
+        Comprime o arquivo rotacionado e remove os mais antigos além da retenção.
+
+        Args:
+            rotated: O caminho do arquivo rotacionado.
+        """
+        try:
+            if self.compress:
+                with open(rotated, 'rb') as source, gzip.open(rotated + '.gz', 'wb') as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(rotated)
+            self.prune()
+        except OSError as e:
+            logging.getLogger('Application').warning(f'Failed to compress or prune rotated log {rotated}: {e}')
+
+    def rotated_files(self) -> List[str]:
+        """
+        Lista os arquivos rotacionados, do mais antigo para o mais recente.
+
+        Returns:
+            List[str]: Os caminhos dos arquivos rotacionados.
+        """
+        return sorted(glob.glob(glob.escape(self.baseFilename) + '.*'), key=os.path.getmtime)
+
+    def prune(self) -> None:
+        """
+        Remove os arquivos rotacionados mais antigos até respeitar `backup_count` e `max_total_bytes`.
+
+        Returns:
+            None
+        """
+        rotated = self.rotated_files()
+        sizes = {path: os.path.getsize(path) for path in rotated}
+        active = os.path.getsize(self.baseFilename) if os.path.exists(self.baseFilename) else 0
+        total = active + sum(sizes.values())
+        for path in rotated:
+            over_count = self.backup_count > 0 and len(sizes) > self.backup_count
+            over_size = self.max_total_bytes > 0 and total > self.max_total_bytes
+            if not (over_count or over_size):
+                break
+            os.remove(path)
+            total -= sizes.pop(path)
+
+    def flush_rotation(self, timeout: Optional[float] = None) -> None:
+        """
+        Aguarda a compressão e a retenção já agendadas.
+
+        Args:
+            timeout: Tempo máximo de espera, em segundos.
+        """
+        self._executor.submit(lambda: None).result(timeout)
+
+    def close(self) -> None:
+        """
+        Fecha o arquivo e aguarda a compressão e a retenção pendentes.
+
+        Returns:
+            None
+        """
+        super().close()
+        self._executor.shutdown(wait=True)
+
+def parse_rules(spec: str) -> Dict[str, str]:
+    """Lê regras no formato `chave=valor`, separadas por vírgula.
+
+    Args:
+        spec (str): As regras, ex.: `Application.security=0.01,route:GET /orders*=0.1`.
+
+    Returns:
+        Dict[str, str]: O valor de cada chave; entradas sem `=` são ignoradas.
+    """
+    rules = {}
+    for entry in spec.split(','):
+        key, _, value = entry.strip().rpartition('=')
+        if key:
+            rules[key.strip()] = value.strip()
+    return rules
+
+class LogSampler(logging.Filter):
+    """
+    Filtra os registros antes de qualquer formatação: amostragem e supressão de repetições.
+
+    - Amostragem: registros abaixo de WARNING passam com a fração configurada para o logger (ou o
+      ancestral mais próximo com regra) e para a rota da requisição, prevalecendo a menor.
+    - Supressão: cada linha de código tem um balde de fichas (`rate` por segundo, rajadas de até
+      `burst`), em qualquer nível; os registros sem ficha são descartados e contados, e a cada
+      `summary_interval` segundos um aviso resume quantos foram suprimidos em cada linha.
+
+    Registros descartados nunca têm a mensagem interpolada: com argumentos no estilo
+    `logger.info('... %s', valor)`, o custo de um registro filtrado é só o da decisão. A decisão fica
+    no próprio registro, então a mesma instância pode filtrar vários handlers.
+
+    Attributes:
+        rate: Registros por segundo de cada linha de código; 0 desabilita a supressão.
+        burst: Tamanho máximo da rajada por linha de código.
+        summary_interval: Segundos entre os resumos de registros suprimidos.
+        sampled_out: Registros descartados pela amostragem.
+        suppressed: Registros descartados pela supressão.
+    """
+
+    def __init__(
+        self,
+        sampling: Dict[str, float],
+        rate: float = LOG_RATE_LIMIT,
+        burst: float = LOG_RATE_BURST,
+        summary_interval: float = LOG_SUPPRESSION_SUMMARY,
+    ):
+        """
+        Inicializa o filtro.
+
+        Args:
+            sampling: Fração de registros mantidos por logger ou, com o prefixo `route:`, por rota.
+            rate: Registros por segundo de cada linha de código; 0 desabilita a supressão.
+            burst: Tamanho máximo da rajada por linha de código.
+            summary_interval: Segundos entre os resumos de registros suprimidos.
+        """
+        super().__init__()
+        self.logger_rules = {name: rate for name, rate in sampling.items() if not name.startswith('route:')}
+        self.route_rules = [
+            (name[len('route:'):], rate) for name, rate in sampling.items() if name.startswith('route:')
+        ]
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.summary_interval = summary_interval
+        self.sampled_out = 0
+        self.suppressed = 0
+        self._logger_rates: Dict[str, float] = {}
+        self._route_rates: Dict[str, float] = {}
+        self._buckets: Dict[Tuple[str, int], List[float]] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._next_summary = time.monotonic() + summary_interval
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        """
+        Decide se o registro segue para o handler.
+
+        Args:
+            record: O registro de log.
+
+        Returns:
+            bool: Se o registro deve ser gravado.
+        """
+        decision = record.__dict__.get('_sampled')
+        if decision is None:
+            decision = record._sampled = self._decide(record)
+        return decision
+
+    def _decide(self, record: logging.LogRecord) -> bool:
+        """
+        Aplica a amostragem e a supressão ao registro.
+
+        Args:
+            record: O registro de log.
+
+        Returns:
+            bool: Se o registro deve ser gravado.
+        """
+        if getattr(self._local, 'summarizing', False):
+            return True
+        if record.levelno < logging.WARNING:
+            rate = self._sample_rate(record.name)
+            if rate < 1.0 and random.random() >= rate:
+                self.sampled_out += 1
+                return False
+        if self.rate <= 0:
+            return True
+
+        now = time.monotonic()
+        summary = None
+        with self._lock:
+            bucket = self._buckets.get((record.pathname, record.lineno))
+            if bucket is None:
+                bucket = self._buckets[(record.pathname, record.lineno)] = [self.burst, now, 0]
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            allowed = bucket[0] >= 1.0
+            if allowed:
+                bucket[0] -= 1.0
+            else:
+                bucket[2] += 1
+                self.suppressed += 1
+            if now >= self._next_summary:
+                self._next_summary = now + self.summary_interval
+                summary = [(site, bucket[2]) for site, bucket in self._buckets.items() if bucket[2]]
+                for site, _ in summary:
+                    self._buckets[site][2] = 0
+        if summary:
+            self._summarize(summary)
+        return allowed
+
+    def _sample_rate(self, name: str) -> float:
+        """
+        Calcula a fração de registros mantidos para o logger e a rota da requisição em andamento.
+
+        Args:
+            name: O nome do logger.
+
+        Returns:
+            float: A menor fração entre a do logger e a da rota; 1.0 sem regras.
+        """
+        rate = self._logger_rates.get(name)
+        if rate is None:
+            rate, prefix = 1.0, name
+            while prefix:
+                if prefix in self.logger_rules:
+                    rate = self.logger_rules[prefix]
+                    break
+                prefix = prefix.rpartition('.')[0]
+            self._logger_rates[name] = rate
+        if self.route_rules:
+            route = request_route.get()
+            route_rate = self._route_rates.get(route)
+            if route_rate is None:
+                route_rate = next((rate for pattern, rate in self.route_rules if fnmatchcase(route, pattern)), 1.0)
+                # Caminhos com identificadores não se repetem; o cache só evita refazer os padrões em rajadas
+                if len(self._route_rates) >= 1024:
+                    self._route_rates.clear()
+                self._route_rates[route] = route_rate
+            rate = min(rate, route_rate)
+        return rate
+
+    def _summarize(self, summary: List[Tuple[Tuple[str, int], int]]) -> None:
+        """
+        Registra, para cada linha de código, quantos registros foram suprimidos desde o último resumo.
+
+        Args:
+            summary: As linhas de código (arquivo e linha) e o número de registros suprimidos.
+        """
+        self._local.summarizing = True
+        try:
+            for (pathname, lineno), count in summary:
+                logging.getLogger('Application.logging').warning(
+                    'Suppressed %d repeated log records from %s:%d in the last %.0fs',
+                    count,
+                    os.path.basename(pathname),
+                    lineno,
+                    self.summary_interval,
+                )
+        finally:
+            self._local.summarizing = False
+
+def create_handlers(log_format: str = LOG_FORMAT) -> List[logging.Handler]:
+    """Cria os handlers que gravam os logs no arquivo rotacionado e no terminal.
+
+    Args:
+        log_format (str): `text` ou `json`.
+
+    Returns:
+        List[logging.Handler]: Os handlers de arquivo e de terminal, já com o formato.
+    """
+    formatter = JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [RotatingLogFileHandler(log_filepath), logging.StreamHandler()]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    return handlers
+
+def get_logger(name: str) -> logging.Logger:
+    """Retorna um logger filho de `Application`, para regras de nível e de amostragem por módulo.
+
+    Args:
+        name (str): O nome do filho, ex.: `security` para `Application.security`.
+
+    Returns:
+        logging.Logger: O logger.
+    """
+    return logging.getLogger(f'Application.{name}')
+
+# Configuração do logger
+log_sampler = LogSampler({name: float(rate) for name, rate in parse_rules(LOG_SAMPLING).items()})
+if LOG_ASYNC:
+    log_queue: queue.Queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+    queue_handler = BoundedQueueHandler(log_queue, LOG_QUEUE_POLICY)
+    queue_handler.addFilter(log_sampler)
+    log_listener = QueueListener(log_queue, *create_handlers(), respect_handler_level=True)
+    log_listener.start()
+    # Grava o que ainda estiver na fila ao encerrar o processo
+    atexit.register(log_listener.stop)
+    logging.basicConfig(level=logging.INFO, handlers=[queue_handler])
+else:
+    handlers = create_handlers()
+    for handler in handlers:
+        handler.addFilter(log_sampler)
+    logging.basicConfig(level=logging.INFO, handlers=handlers)
+
 logging.getLogger('passlib.registry').setLevel(logging.WARNING)
+for name, level in parse_rules(LOG_LEVELS).items():
+    logging.getLogger(name).setLevel(level.upper())
 logger = logging.getLogger('Application')
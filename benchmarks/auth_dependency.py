@@ -0,0 +1,74 @@
+"""Mede o custo da verificação do JWT em `get_current_user`, isolada das rotas e do banco.
+
+Compara, por chamada:
+
+- `jwt.decode`: a verificação completa (HMAC e parse do JSON), feita antes a cada requisição;
+- `decode_token` sem cache: a verificação completa e o registro no cache (primeira apresentação);
+- `decode_token` com cache: token já verificado, encontrado pelo hash (demais apresentações).
+
+Uso:
+
+    python -m benchmarks.auth_dependency -n 50000
+"""
+
+import argparse
+import os
+import statistics
+import time
+from datetime import timedelta
+from typing import Callable, Dict
+
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+
+from app.services import security  # noqa: E402
+from app.services.cache import claims_cache  # noqa: E402
+
+def measure(fn: Callable[[], object], iterations: int) -> Dict[str, float]:
+    """Executa a função repetidamente e mede a latência de cada chamada.
+
+    Args:
+        fn (Callable[[], object]): A função medida.
+        iterations (int): Número de chamadas.
+
+    Returns:
+        Dict[str, float]: Latências média, mediana e p99, em microssegundos.
+    """
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1_000_000)
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99)],
+    }
+
+def main(iterations: int) -> None:
+    """Mede os três cenários e imprime uma tabela com as latências.
+
+    Args:
+        iterations (int): Número de chamadas por cenário.
+    """
+    token = security.create_access_token({'sub': '1'}, timedelta(minutes=5))
+
+    def uncached() -> dict:
+        claims_cache.clear()
+        return security.decode_token(token)
+
+    scenarios = {
+        'jwt.decode': lambda: security.jwt.decode(token, security.SECRET_KEY, algorithms=[security.ALGORITHM]),
+        'sem cache': uncached,
+        'com cache': lambda: security.decode_token(token),
+    }
+    print(f"{'cenário':<12}{'média µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for name, fn in scenarios.items():
+        result = measure(fn, iterations)
+        print(f"{name:<12}{result['mean']:>10.1f}{result['p50']:>10.1f}{result['p99']:>10.1f}")
+    print(f'cache: {claims_cache.hits} acertos, {claims_cache.misses} falhas')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--iterations', type=int, default=50000)
+    main(parser.parse_args().iterations)
@@ -0,0 +1,117 @@
+"""Mede a latência das requisições com logs em INFO, com e sem a fila de logs.
+
+Uma rota registra `--records` mensagens em INFO por requisição, como as rotas e o repositório
+fazem. São comparados três cenários:
+
+- `sem logs`: o logger em WARNING, para a referência;
+- `direto`: arquivo e terminal gravados pela própria thread da requisição, como antes;
+- `fila`: os registros vão para a fila limitada e são gravados pela thread do listener.
+
+Os logs vão para `app.log` em `LOG_DIR` (padrão `/tmp/logs`) e para o stderr; descarte o stderr para que o
+terminal não distorça a medição.
+
+Uso:
+
+    python -m benchmarks.logging_overhead -n 2000 -c 20 2>/dev/null
+"""
+
+import argparse
+import asyncio
+import logging
+import queue
+import statistics
+import time
+from logging.handlers import QueueListener
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI
+
+from app.tools.logging import BoundedQueueHandler, create_handlers
+
+def build_app(log: logging.Logger, records: int) -> FastAPI:
+    """Cria a aplicação com uma rota que registra `records` mensagens por requisição.
+
+    Args:
+        log (logging.Logger): O logger usado pela rota.
+        records (int): Mensagens registradas por requisição.
+
+    Returns:
+        FastAPI: A aplicação, com a rota `GET /orders`.
+    """
+    app = FastAPI()
+
+    @app.get('/orders')
+    async def orders() -> dict:
+        for index in range(records):
+            log.info(f'Fetching order {index} with products and tracking')
+        return {'ok': True}
+
+    return app
+
+async def measure(app: FastAPI, requests: int, concurrency: int) -> Dict[str, float]:
+    """Dispara as requisições contra a aplicação e mede a latência de cada uma.
+
+    Args:
+        app (FastAPI): A aplicação.
+        requests (int): Número total de requisições.
+        concurrency (int): Número de requisições simultâneas.
+
+    Returns:
+        Dict[str, float]: Latências média, mediana e p99, em microssegundos.
+    """
+    samples: List[float] = []
+    pending = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for _ in pending:
+            start = time.perf_counter()
+            (await client.get('/orders')).raise_for_status()
+            samples.append((time.perf_counter() - start) * 1_000_000)
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99)],
+    }
+
+def main(args: argparse.Namespace) -> None:
+    """Mede cada cenário, em sequência, e imprime uma tabela com as latências.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+    """
+    print(f"{'cenário':<10}{'média µs':>10}{'p50 µs':>10}{'p99 µs':>10}")
+    for scenario in ('sem logs', 'direto', 'fila'):
+        log = logging.getLogger(f'benchmark.{scenario}')
+        log.propagate = False
+        log.setLevel(logging.WARNING if scenario == 'sem logs' else logging.INFO)
+        listener = None
+        if scenario == 'direto':
+            for handler in create_handlers(args.format):
+                log.addHandler(handler)
+        elif scenario == 'fila':
+            log_queue: queue.Queue = queue.Queue(maxsize=args.queue_size)
+            log.addHandler(BoundedQueueHandler(log_queue, 'block'))
+            listener = QueueListener(log_queue, *create_handlers(args.format))
+            listener.start()
+
+        result = asyncio.run(measure(build_app(log, args.records), args.requests, args.concurrency))
+        if listener is not None:
+            listener.stop()
+        print(f"{scenario:<10}{result['mean']:>10.0f}{result['p50']:>10.0f}{result['p99']:>10.0f}")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--requests', type=int, default=2000)
+    parser.add_argument('-c', '--concurrency', type=int, default=20)
+    parser.add_argument('--records', type=int, default=20, help='mensagens em INFO por requisição')
+    parser.add_argument('--format', choices=['text', 'json'], default='text')
+    parser.add_argument('--queue-size', type=int, default=10000)
+    # O httpx registra cada requisição em INFO, o que distorceria a medição
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    main(parser.parse_args())
@@ -0,0 +1,173 @@
+"""Mede o custo por requisição da pilha de middlewares de `app/main.py`.
+
+Monta a mesma pilha (CORS, `RateLimitMiddleware` e `ExceptionLoggingMiddleware`) sobre uma rota
+vazia, para que só os middlewares sejam medidos, e compara quatro cenários: sem middlewares, com as
+versões anteriores baseadas em `BaseHTTPMiddleware`, com as versões ASGI atuais e com as versões
+ASGI mais o `MetricsMiddleware`. O limitador de taxa é substituído por um que sempre permite, para
+não depender do Redis.
+
+Uso:
+
+    python -m benchmarks.middleware -n 20000 -c 50
+"""
+
+import argparse
+import asyncio
+import logging
+import statistics
+import time
+from typing import Dict, List
+
+import httpx
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from app.middleware import ExceptionLoggingMiddleware, MetricsMiddleware, RateLimitMiddleware
+from app.middleware.limiter import RateLimitResult
+from app.middleware.middleware import RATE_LIMIT_MESSAGE
+
+class AllowAll:
+    """Limitador que permite todas as requisições, sem acessar o Redis."""
+
+    async def hit(self, identity: str) -> RateLimitResult:
+        return RateLimitResult(True, 1, 0)
+
+class LegacyRateLimitMiddleware(BaseHTTPMiddleware):
+    """Reproduz o `RateLimitMiddleware` anterior, baseado em `BaseHTTPMiddleware`, para comparação."""
+
+    def __init__(self, app, rate_limit: int):
+        super().__init__(app)
+        self.rate_limit = rate_limit
+        self.limiter = AllowAll()
+
+    async def dispatch(self, request: Request, call_next):
+        result = await self.limiter.hit(request.client.host if request.client else 'unknown')
+        headers = {'X-RateLimit-Limit': str(self.rate_limit), 'X-RateLimit-Remaining': str(result.remaining)}
+        if not result.allowed:
+            return JSONResponse(
+                status_code=429, content={'status code': 429, 'msg': RATE_LIMIT_MESSAGE}, headers=headers
+            )
+        response = await call_next(request)
+        response.headers.update(headers)
+        return response
+
+class LegacyExceptionLoggingMiddleware(BaseHTTPMiddleware):
+    """Reproduz o `ExceptionLoggingMiddleware` anterior, baseado em `BaseHTTPMiddleware`, para comparação."""
+
+    async def dispatch(self, request: Request, call_next):  # noqa PLR6301
+        try:
+            return await call_next(request)
+        except Exception:
+            raise HTTPException(status_code=500, detail='Erro Interno do Servidor!!!')
+
+def build_app(stack: str) -> FastAPI:
+    """Cria a aplicação com a pilha de middlewares informada.
+
+    Args:
+        stack (str): `none`, `base_http`, `asgi` ou `metrics`.
+
+    Returns:
+        FastAPI: A aplicação, com uma rota `GET /ping`.
+    """
+    app = FastAPI()
+
+    @app.get('/ping')
+    def ping() -> dict:
+        return {'pong': True}
+
+    if stack == 'none':
+        return app
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=['http://localhost', 'http://localhost:8000'],
+        allow_credentials=True,
+        allow_methods=['*'],
+        allow_headers=['*'],
+    )
+    if stack == 'base_http':
+        app.add_middleware(LegacyRateLimitMiddleware, rate_limit=100)
+        app.add_middleware(LegacyExceptionLoggingMiddleware)
+    else:
+        app.add_middleware(
+            RateLimitMiddleware, redis_url='redis://localhost:6379', rate_limit=100, rate_limit_period=60
+        )
+        app.add_middleware(ExceptionLoggingMiddleware)
+    if stack == 'metrics':
+        app.add_middleware(MetricsMiddleware)
+    return app
+
+def patch_limiter(app: FastAPI) -> None:
+    """Troca o limitador do `RateLimitMiddleware`, já instanciado, pelo que sempre permite.
+
+    Args:
+        app (FastAPI): A aplicação, depois de montada a pilha de middlewares.
+    """
+    node = app.middleware_stack
+    while node is not None:
+        if isinstance(node, RateLimitMiddleware):
+            node.limiter = AllowAll()
+        node = getattr(node, 'app', None)
+
+async def measure(stack: str, requests: int, concurrency: int) -> Dict[str, float]:
+    """Dispara as requisições contra a aplicação e mede a latência de cada uma.
+
+    Args:
+        stack (str): `none`, `base_http`, `asgi` ou `metrics`.
+        requests (int): Número total de requisições.
+        concurrency (int): Número de requisições simultâneas.
+
+    Returns:
+        Dict[str, float]: Latências média, mediana e p99, em microssegundos.
+    """
+    app = build_app(stack)
+    app.middleware_stack = app.build_middleware_stack()
+    patch_limiter(app)
+    samples: List[float] = []
+    pending = iter(range(requests))
+
+    async def worker(client: httpx.AsyncClient) -> None:
+        for _ in pending:
+            start = time.perf_counter()
+            response = await client.get('/ping')
+            samples.append((time.perf_counter() - start) * 1_000_000)
+            response.raise_for_status()
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as client:
+        await asyncio.gather(*(client.get('/ping') for _ in range(concurrency)))
+        await asyncio.gather(*(worker(client) for _ in range(concurrency)))
+
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99)],
+    }
+
+def main(args: argparse.Namespace) -> None:
+    """Mede cada pilha, em sequência, e imprime uma tabela com as latências.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+    """
+    results = {
+        stack: asyncio.run(measure(stack, args.requests, args.concurrency))
+        for stack in ('none', 'base_http', 'asgi', 'metrics')
+    }
+    baseline = results['none']['mean']
+    print(f"{'pilha':<12}{'média µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'overhead µs':>13}")
+    for stack, result in results.items():
+        print(
+            f"{stack:<12}{result['mean']:>10.0f}{result['p50']:>10.0f}{result['p99']:>10.0f}"
+            f"{result['mean'] - baseline:>13.0f}"
+        )
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--requests', type=int, default=20000)
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    # O httpx registra cada requisição em INFO, o que distorceria a medição
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+    main(parser.parse_args())
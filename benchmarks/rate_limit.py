@@ -0,0 +1,125 @@
+"""Mede o custo por requisição de cada algoritmo do limitador de taxa no Redis.
+
+Compara os scripts Lua (uma ida ao Redis por requisição) com a sequência de comandos usada antes
+(ZREMRANGEBYSCORE, ZCARD, ZADD e EXPIRE, quatro idas). As requisições vêm de um conjunto de IPs
+para que parte delas seja recusada, como em produção.
+
+Uso (com um Redis acessível):
+
+    REDIS_URL=redis://localhost:6379 python -m benchmarks.rate_limit -n 20000 -c 50
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+from typing import Awaitable, Callable, Dict, List
+
+from aioredis import Redis, from_url
+
+from app.middleware.limiter import ALGORITHMS, RateLimiter
+
+async def legacy_hit(redis: Redis, ip: str, limit: int, period: int) -> bool:
+    """Reproduz a verificação anterior do `RateLimitMiddleware`, para comparação.
+
+    Args:
+        redis (Redis): Cliente Redis.
+        ip (str): IP do cliente.
+        limit (int): Número máximo de requisições por janela.
+        period (int): Duração da janela, em segundos.
+
+    Returns:
+        bool: Se a requisição foi permitida.
+    """
+    key = f'ratelimit:legacy:{ip}'
+    now = int(time.time())
+    await redis.zremrangebyscore(key, 0, now - period)
+    if await redis.zcard(key) >= limit:
+        return False
+    await redis.zadd(key, {str(now): now})
+    await redis.expire(key, period)
+    return True
+
+async def measure(
+    hit: Callable[[str], Awaitable[bool]], requests: int, concurrency: int, ips: int
+) -> Dict[str, float]:
+    """Dispara as verificações com a concorrência informada e mede a latência de cada uma.
+
+    Args:
+        hit (Callable[[str], Awaitable[bool]]): Verifica uma requisição do IP informado.
+        requests (int): Número total de verificações.
+        concurrency (int): Número de verificações simultâneas.
+        ips (int): Número de IPs distintos.
+
+    Returns:
+        Dict[str, float]: Latências média, mediana e p99 (em microssegundos) e a fração de recusas.
+    """
+    samples: List[float] = []
+    rejected = 0
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        nonlocal rejected
+        for index in pending:
+            start = time.perf_counter()
+            allowed = await hit(f'10.0.{index % ips // 256}.{index % 256}')
+            samples.append((time.perf_counter() - start) * 1_000_000)
+            rejected += not allowed
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    samples.sort()
+    return {
+        'mean': statistics.fmean(samples),
+        'p50': samples[len(samples) // 2],
+        'p99': samples[int(len(samples) * 0.99)],
+        'rejected': rejected / requests,
+    }
+
+async def allowed(limiter: RateLimiter, ip: str) -> bool:
+    """Verifica uma requisição com o limitador.
+
+    Args:
+        limiter (RateLimiter): O limitador.
+        ip (str): IP do cliente.
+
+    Returns:
+        bool: Se a requisição foi permitida.
+    """
+    return (await limiter.hit(ip)).allowed
+
+async def main(args: argparse.Namespace) -> None:
+    """Mede cada algoritmo, em sequência, e imprime uma tabela com as latências.
+
+    Args:
+        args (argparse.Namespace): Argumentos da linha de comando.
+    """
+    redis = from_url(args.redis_url, decode_responses=True)
+    if args.flush:
+        await redis.flushdb()
+    scenarios: Dict[str, Callable[[str], Awaitable[bool]]] = {
+        'legacy (4 comandos)': lambda ip: legacy_hit(redis, ip, args.limit, args.period),
+    }
+    for algorithm in ALGORITHMS:
+        limiter = RateLimiter(redis, args.limit, args.period, algorithm)
+        scenarios[algorithm] = lambda ip, limiter=limiter: allowed(limiter, ip)
+
+    print(f"{'algoritmo':<22}{'média µs':>10}{'p50 µs':>10}{'p99 µs':>10}{'recusadas':>11}")
+    for name, hit in scenarios.items():
+        result = await measure(hit, args.requests, args.concurrency, args.ips)
+        print(
+            f"{name:<22}{result['mean']:>10.0f}{result['p50']:>10.0f}{result['p99']:>10.0f}"
+            f"{result['rejected']:>10.1%}"
+        )
+    await redis.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--redis-url', default=os.environ.get('REDIS_URL', 'redis://localhost:6379'))
+    parser.add_argument('-n', '--requests', type=int, default=20000)
+    parser.add_argument('-c', '--concurrency', type=int, default=50)
+    parser.add_argument('--ips', type=int, default=500, help='IPs distintos entre as requisições')
+    parser.add_argument('--limit', type=int, default=30, help='requisições por janela e por IP')
+    parser.add_argument('--period', type=int, default=60, help='duração da janela, em segundos')
+    parser.add_argument('--flush', action='store_true', help='esvazia o banco do Redis antes de medir')
+    asyncio.run(main(parser.parse_args()))
@@ -3,6 +3,6 @@ from app.main import app
 
 handler = Mangum(
   app,
-  lifespan="off",
+  lifespan="auto",
   api_gateway_base_path=''
   )
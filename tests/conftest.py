@@ -1,2 +1,69 @@
 import os
-os.environ["DATABASE_URL"] = "sqlite:///./test.db"
\ No newline at end of file
+os.environ["DATABASE_URL"] = "sqlite:///./test.db"
+# Sem recompilação do cardápio em segundo plano: os testes contam os comandos SQL de cada requisição
+os.environ["MENU_SNAPSHOT_REBUILD"] = "false"
+
+import pytest  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+
+
+@pytest.fixture(scope='session', autouse=True)
+def database_schema():
+    """Cria o esquema do banco de testes pelas migrações do Alembic"""
+    from app.db.database import engine
+    from app.tools.bootstrap import migrate
+
+    migrate(engine)
+
+
+@pytest.fixture
+def sql_statements():
+    """Coleta os comandos SQL enviados ao banco principal durante o teste"""
+    from app.db.database import engine
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+@pytest.fixture
+def authenticated():
+    """Autentica as requisições do teste como o administrador, sem token"""
+    from app.main import app
+    from app.model import schemas
+    from app.services import security
+
+    app.dependency_overrides[security.get_current_user] = lambda: schemas.Customer(
+        id=1, name='Admin', email='admin@example.com', cpf='00000000000'
+    )
+    yield
+    app.dependency_overrides.pop(security.get_current_user)
+
+
+@pytest.fixture
+def order_payload():
+    """Corpo de um pedido de totem sem produtos, para `POST /orders/`"""
+    return {
+        'status': 'Recebido',
+        'payment_status': 'pendente',
+        'user_agent': 'kiosk',
+        'ip_address': '10.0.0.1',
+        'os': 'linux',
+        'browser': 'chromium',
+        'device': 'totem',
+        'customer_id': 1,
+        'products': [],
+    }
+
+
+@pytest.fixture(autouse=True)
+def empty_menu_cache():
+    """Começa cada teste com o cache do cardápio vazio"""
+    from app.services.cache import menu_cache
+
+    menu_cache.clear()
@@ -0,0 +1,111 @@
+import pytest
+from alembic.autogenerate import compare_metadata
+from alembic.runtime.migration import MigrationContext
+from alembic.script import ScriptDirectory
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import Engine
+
+from app import main
+from app.db.database import Base
+from app.model import models
+from app.tools import bootstrap
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/bootstrap.db')
+    yield engine
+    engine.dispose()
+
+
+def test_schema_head_matches_alembic_head():
+    script = ScriptDirectory.from_config(bootstrap.alembic_config())
+    assert script.get_current_head() == bootstrap.SCHEMA_HEAD
+
+
+def test_migrations_match_models(engine):
+    bootstrap.migrate(engine)
+    with engine.connect() as connection:
+        assert compare_metadata(MigrationContext.configure(connection), Base.metadata) == []
+
+
+def test_bootstrap_skips_when_current(engine):
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': True, 'seeded': True}
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': False, 'seeded': False}
+    assert len(statements) == 1
+
+    assert bootstrap.bootstrap(engine, mode='force') == {'migrated': True, 'seeded': True}
+    assert bootstrap.bootstrap(engine, mode='off') == {'migrated': False, 'seeded': False}
+
+
+def test_bootstrap_reseeds_when_seed_data_changes(engine, monkeypatch):
+    bootstrap.bootstrap(engine, mode='auto')
+    monkeypatch.setattr(bootstrap, 'SEED_CATEGORIES', [*bootstrap.SEED_CATEGORIES, {'name': 'Combos'}])
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': False, 'seeded': True}
+
+
+def test_bootstrap_runs_under_the_advisory_lock(engine, monkeypatch):
+    calls = []
+
+    @event.listens_for(engine, 'connect')
+    def register_lock_functions(dbapi_connection, connection_record):
+        dbapi_connection.create_function('pg_advisory_lock', 1, lambda key: calls.append(('lock', key)))
+        dbapi_connection.create_function('pg_advisory_unlock', 1, lambda key: calls.append(('unlock', key)))
+
+    monkeypatch.setattr(bootstrap, 'ADVISORY_LOCK_DIALECTS', ('sqlite',))
+    key = bootstrap.BOOTSTRAP_LOCK_KEY
+
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': True, 'seeded': True}
+    assert calls == [('lock', key), ('unlock', key)]
+
+    # Banco em dia: nenhum lock na inicialização
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': False, 'seeded': False}
+    assert calls == [('lock', key), ('unlock', key)]
+
+    bootstrap.migrate(engine)
+    assert calls == [('lock', key), ('unlock', key)] * 2
+
+
+def test_bootstrap_rereads_the_state_after_the_lock(engine, monkeypatch):
+    bootstrap.bootstrap(engine, mode='auto')
+    state = bootstrap.read_state(engine)
+    # Simula outra réplica que concluiu a inicialização enquanto esta aguardava o lock
+    monkeypatch.setattr(bootstrap, 'read_state', lambda bind: (None, None) if isinstance(bind, Engine) else state)
+
+    assert bootstrap.bootstrap(engine, mode='auto') == {'migrated': False, 'seeded': False}
+
+
+def test_migrate_stamps_schema_created_without_alembic(engine):
+    with engine.begin() as connection:
+        bootstrap.command.upgrade(bootstrap.alembic_config(connection), bootstrap.BASELINE_REVISION)
+        connection.execute(text('DROP TABLE alembic_version'))
+
+    bootstrap.migrate(engine)
+    assert bootstrap.read_state(engine)[0] == bootstrap.SCHEMA_HEAD
+    assert inspect(engine).has_table(models.AppMetadata.__tablename__)
+
+
+def test_bootstrap_rejects_unknown_mode(engine):
+    with pytest.raises(ValueError):
+        bootstrap.bootstrap(engine, mode='sometimes')
+
+
+def test_startup_bootstraps_once_per_process(monkeypatch):
+    calls = []
+
+    def failing():
+        calls.append('failed')
+        raise RuntimeError('database unavailable')
+
+    monkeypatch.setattr(main, '_bootstrapped', False)
+    monkeypatch.setattr(main, 'bootstrap', failing)
+    with pytest.raises(RuntimeError):
+        main.bootstrap_database()
+
+    monkeypatch.setattr(main, 'bootstrap', lambda: calls.append('ok'))
+    main.bootstrap_database()
+    main.bootstrap_database()
+    assert calls == ['failed', 'ok']
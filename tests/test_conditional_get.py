@@ -0,0 +1,71 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.main import app
+from app.db.database import SessionLocal
+from app.model import models
+from app.services import conditional, repository
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures('authenticated')
+
+
+@pytest.mark.parametrize(
+    'path, cache_control',
+    [('/category/', conditional.MENU_CACHE_CONTROL), ('/products/', conditional.PRIVATE_MENU_CACHE_CONTROL)],
+)
+def test_menu_returns_304_until_it_changes(sql_statements, path, cache_control):
+    response = client.get(path)
+    etag = response.headers['etag']
+    assert response.headers['cache-control'] == cache_control
+
+    sql_statements.clear()
+    response = client.get(path, headers={'If-None-Match': f'"other", W/{etag}'})
+    assert response.status_code == 304
+    assert response.content == b''
+    assert response.headers['etag'] == etag
+    assert response.headers['cache-control'] == cache_control
+    assert sql_statements == []
+
+    client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'})
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['etag'] != etag
+
+
+def test_order_returns_304_until_it_changes(sql_statements, order_payload):
+    order_id = client.post('/orders/', json=order_payload).json()['id']
+    response = client.get(f'/orders/{order_id}')
+    etag = response.headers['etag']
+    assert response.headers['cache-control'] == conditional.ORDER_CACHE_CONTROL
+
+    # Só a versão do pedido é consultada; o pedido não é carregado
+    sql_statements.clear()
+    assert client.get(f'/orders/{order_id}', headers={'If-None-Match': etag}).status_code == 304
+    assert len(sql_statements) == 1
+
+    client.put(f'/orders/{order_id}/status', json={'status': 'Pronto'})
+    response = client.get(f'/orders/{order_id}', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.json()['status'] == 'Pronto'
+
+
+def test_menu_version_is_recreated_when_missing():
+    db = SessionLocal()
+    try:
+        db.query(models.AppMetadata).filter(models.AppMetadata.key == repository.MENU_VERSION_KEY).delete()
+        db.commit()
+        assert repository.get_menu_version(db) == '0'
+
+        repository.bump_menu_version(db)
+        db.commit()
+        assert repository.get_menu_version(db) == '1'
+
+        repository.bump_menu_version(db)
+        db.commit()
+        assert repository.get_menu_version(db) == '2'
+    finally:
+        db.close()
@@ -0,0 +1,237 @@
+import asyncio
+import os
+import subprocess
+import sys
+
+import pytest
+from fastapi import Depends, FastAPI
+from fastapi.testclient import TestClient
+from jose import jwt
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.orm import sessionmaker
+from starlette.requests import Request
+from starlette.responses import Response
+
+from app.db import database, pool, replica
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_to_async_url_postgres():
+    url = 'postgresql://postgres:secret@db:5432/challenge'
+    assert database.to_async_url(url) == 'postgresql+asyncpg://postgres:secret@db:5432/challenge'
+    assert database.to_async_url('postgres://u@h/db') == 'postgresql+asyncpg://u@h/db'
+
+
+def test_to_async_url_sqlite_and_unknown():
+    assert database.to_async_url('sqlite:///./test.db') == 'sqlite+aiosqlite:///./test.db'
+    assert database.to_async_url('mysql://u@h/db') == 'mysql://u@h/db'
+    assert database.to_async_url('') == ''
+
+
+def test_sync_mode_is_default():
+    assert database.DATABASE_MODE == 'sync'
+    assert database.get_session is database.get_db
+
+
+# Executado em outro processo: o modo e os engines são definidos na importação de `app.db.database`
+ASYNC_MODE_CHECK = """
+from fastapi.testclient import TestClient
+
+from app.db import database
+from app.main import app
+from app.tools.bootstrap import migrate
+
+assert database.get_session is database.get_async_db
+assert database.async_engine.dialect.driver == 'aiosqlite'
+migrate(database.engine)
+response = TestClient(app).post('/customers/anonymous')
+assert response.status_code == 200, response.text
+assert response.json()['id']
+"""
+
+
+def test_async_mode_with_sqlite(tmp_path):
+    env = {**os.environ, 'DATABASE_MODE': 'async', 'DATABASE_URL': f'sqlite:///{tmp_path}/async.db'}
+    result = subprocess.run(
+        [sys.executable, '-c', ASYNC_MODE_CHECK], env=env, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_run_db_with_sync_session_uses_threadpool():
+    """Funções do repositório recebem a sessão síncrona como primeiro argumento"""
+    db = database.SessionLocal()
+    try:
+        result = asyncio.run(database.run_db(db, lambda session, value: (session, value), value=42))
+    finally:
+        db.close()
+    assert result == (db, 42)
+
+
+def test_resolve_pool_profile(monkeypatch):
+    monkeypatch.delenv('DB_POOL_PROFILE', raising=False)
+    monkeypatch.delenv('KUBERNETES_SERVICE_HOST', raising=False)
+    monkeypatch.setenv('AWS_LAMBDA_FUNCTION_NAME', 'tech-challenge-api')
+    assert pool.resolve_pool_profile() == 'lambda'
+
+    monkeypatch.delenv('AWS_LAMBDA_FUNCTION_NAME')
+    monkeypatch.setenv('KUBERNETES_SERVICE_HOST', '10.0.0.1')
+    assert pool.resolve_pool_profile() == 'k8s'
+
+    monkeypatch.setenv('DB_POOL_PROFILE', 'Default')
+    assert pool.resolve_pool_profile() == 'default'
+
+    monkeypatch.setenv('DB_POOL_PROFILE', 'unknown')
+    with pytest.raises(ValueError):
+        pool.resolve_pool_profile()
+
+
+POSTGRES_URL = 'postgresql://postgres:secret@db:5432/challenge'
+
+
+def test_pool_options_with_overrides(monkeypatch):
+    monkeypatch.setenv('DB_POOL_SIZE', '3')
+    options = pool.pool_options('lambda', POSTGRES_URL)
+    assert options['pool_size'] == 3
+    assert options['max_overflow'] == 0
+    assert options['pool_pre_ping'] is True
+    assert options['poolclass'] is pool.TimedQueuePool
+    assert pool.pool_options('k8s', POSTGRES_URL, is_async=True)['poolclass'] is pool.TimedAsyncQueuePool
+
+
+def test_pool_options_keep_the_sqlite_pool():
+    assert pool.pool_options('k8s', 'sqlite:///./test.db') == {}
+    engine = create_engine('sqlite://', **pool.pool_options('k8s', 'sqlite://'))
+    with engine.connect():
+        assert pool.pool_status(engine) == {}
+
+
+def test_pool_status_reports_checkouts_and_wait():
+    engine = create_engine('sqlite://', poolclass=pool.TimedQueuePool, pool_size=1, max_overflow=0, pool_timeout=0.01)
+    with engine.connect():
+        status = pool.pool_status(engine)
+        assert status['checked_out'] == 1
+        assert status['checkouts'] == 1
+        with pytest.raises(TimeoutError):
+            engine.connect()
+
+    engine.dispose()
+    status = pool.pool_status(engine)
+    assert status['checked_out'] == 0
+    assert status['timeouts'] == 1
+    assert status['wait_max_ms'] >= 10
+    assert pool.pool_status(None) is None
+
+
+def test_pool_counts_only_checkout_timeouts():
+    def refuse():
+        raise ConnectionRefusedError('db down')
+
+    engine = create_engine('sqlite://', creator=refuse, poolclass=pool.TimedQueuePool)
+    with pytest.raises(ConnectionRefusedError):
+        engine.connect()
+    assert pool.pool_status(engine)['timeouts'] == 0
+
+
+def make_request(method='GET', token=None, client=('10.0.0.7', 5000), cookie=None):
+    headers = [(b'authorization', f'Bearer {token}'.encode())] if token else []
+    if cookie:
+        headers.append((b'cookie', cookie.encode()))
+    return Request({'type': 'http', 'method': method, 'headers': headers, 'client': client})
+
+
+def test_request_identity_prefers_token_subject():
+    token = jwt.encode({'sub': '42'}, 'any-secret', algorithm='HS256')
+    assert replica.request_identity(make_request(token=token)) == 'sub:42'
+    assert replica.request_identity(make_request(token='not-a-jwt')) == 'ip:10.0.0.7'
+    assert replica.request_identity(make_request(token='a.b.c')) == 'ip:10.0.0.7'
+    assert replica.request_identity(make_request(client=None)) is None
+    assert replica.request_identity(None) is None
+
+
+def test_primary_stickiness_window():
+    stickiness = replica.PrimaryStickiness(window=60, max_entries=1)
+    stickiness.mark('sub:1')
+    stickiness.mark('sub:2')
+    assert stickiness.is_sticky('sub:2')
+    assert not stickiness.is_sticky('sub:3')
+    assert not stickiness.is_sticky(None)
+
+    disabled = replica.PrimaryStickiness(window=0)
+    disabled.mark('sub:1')
+    assert not disabled.is_sticky('sub:1')
+
+
+def test_replica_lag_monitor(tmp_path):
+    healthy = replica.ReplicaLagMonitor(create_engine(f'sqlite:///{tmp_path}/replica.db'), max_lag=5, interval=60)
+    assert healthy.is_stale()
+    assert healthy.is_healthy()
+    assert healthy.lag == 0
+    assert not healthy.is_stale()
+
+    broken = replica.ReplicaLagMonitor(create_engine(f'sqlite:///{tmp_path}/missing/replica.db'), max_lag=5, interval=0)
+    assert not broken.is_healthy()
+    assert broken.lag == float('inf')
+
+
+def test_read_session_routing(monkeypatch, tmp_path):
+    replica_engine = create_engine(f'sqlite:///{tmp_path}/replica.db')
+    monkeypatch.setattr(database, 'ReplicaSessionLocal', sessionmaker(bind=replica_engine))
+    monkeypatch.setattr(database, 'replica_monitor', replica.ReplicaLagMonitor(replica_engine, max_lag=5, interval=60))
+    monkeypatch.setattr(database, 'primary_stickiness', replica.PrimaryStickiness(window=60))
+    token = jwt.encode({'sub': '7'}, 'any-secret', algorithm='HS256')
+
+    reader = database.get_read_db(make_request(token=token))
+    assert next(reader).get_bind() is replica_engine
+    reader.close()
+
+    # Uma escrita fixa o cliente no primário; leituras de outros clientes seguem na réplica
+    writer = database.get_db(make_request(method='POST', token=token))
+    next(writer)
+    writer.close()
+    primary = database.SessionLocal()
+    reader = database.get_read_db(make_request(token=token), primary)
+    assert next(reader) is primary
+    reader.close()
+    primary.close()
+    assert database.use_replica(make_request(client=('10.0.0.8', 5000)))
+
+    status = database.get_pool_status()
+    assert status['replica'] == {'lag_seconds': 0.0, 'healthy': True}
+
+
+def test_read_session_reuses_the_primary_session_without_replica():
+    probe = FastAPI()
+
+    @probe.get('/')
+    def read(db=Depends(database.get_db), reader=Depends(database.get_read_db)) -> dict:
+        return {'shared': reader is db}
+
+    assert TestClient(probe).get('/').json() == {'shared': True}
+
+
+def test_primary_cookie_spans_pods(monkeypatch, tmp_path):
+    replica_engine = create_engine(f'sqlite:///{tmp_path}/replica.db')
+    monkeypatch.setattr(database, 'replica_monitor', replica.ReplicaLagMonitor(replica_engine, max_lag=5, interval=60))
+    monkeypatch.setattr(database, 'primary_stickiness', replica.PrimaryStickiness(window=60))
+
+    response = Response()
+    writer = database.get_db(make_request(method='POST'), response)
+    next(writer)
+    writer.close()
+    cookie = response.headers['set-cookie'].split(';')[0]
+    assert cookie.startswith(f'{replica.PRIMARY_STICKY_COOKIE}=')
+
+    # Outro pod não tem a marca em memória, mas lê o cookie devolvido pelo cliente
+    monkeypatch.setattr(database, 'primary_stickiness', replica.PrimaryStickiness(window=60))
+    assert not database.use_replica(make_request(client=('10.0.0.9', 5000), cookie=cookie))
+    assert database.use_replica(make_request(client=('10.0.0.9', 5000)))
+    assert database.use_replica(make_request(cookie=f'{replica.PRIMARY_STICKY_COOKIE}=9999999999'))
+    assert database.use_replica(make_request(cookie=f'{replica.PRIMARY_STICKY_COOKIE}=invalid'))
+
+    response = Response()
+    next(database.get_db(make_request(), response))
+    assert 'set-cookie' not in response.headers
@@ -0,0 +1,97 @@
+import gzip
+import json
+import logging
+import os
+import queue
+
+from app.tools.logging import BoundedQueueHandler, JsonFormatter, LogSampler, RotatingLogFileHandler, request_route
+
+
+def record(msg, *args, exc_info=None):
+    return logging.LogRecord('Application', logging.ERROR, 'repository.py', 10, msg, args, exc_info, 'get_order')
+
+
+def test_json_formatter_writes_one_object_per_line():
+    try:
+        raise ValueError('pedido inválido')
+    except ValueError as e:
+        line = JsonFormatter().format(record('Erro no pedido %s', 42, exc_info=(type(e), e, e.__traceback__)))
+
+    entry = json.loads(line)
+    assert '\n' not in line
+    assert entry['message'] == 'Erro no pedido 42'
+    assert entry['level'] == 'ERROR'
+    assert entry['function'] == 'get_order'
+    assert 'ValueError: pedido inválido' in entry['exc_info']
+
+
+def test_full_queue_drops_records_and_counts_them():
+    handler = BoundedQueueHandler(queue.Queue(maxsize=2), policy='drop')
+
+    for index in range(5):
+        handler.emit(record('registro %s', index))
+
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
+    assert handler.queue.get_nowait().msg == 'registro 0'
+
+
+def test_rotation_by_size_compresses_and_keeps_only_the_newest_files(tmp_path):
+    handler = RotatingLogFileHandler(str(tmp_path / 'app.log'), interval=0, max_bytes=200, backup_count=2)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+
+    for index in range(20):
+        handler.emit(record('registro %s com texto suficiente para encher o arquivo', index))
+    handler.flush_rotation()
+    handler.close()
+
+    rotated = handler.rotated_files()
+    assert len(rotated) == 2
+    assert all(path.endswith('.gz') for path in rotated)
+    assert os.path.getsize(tmp_path / 'app.log') < 200
+    with gzip.open(rotated[-1], 'rt') as f:
+        assert 'registro' in f.read()
+
+
+def test_rotation_by_time_starts_a_new_file(tmp_path, monkeypatch):
+    handler = RotatingLogFileHandler(str(tmp_path / 'app.log'), interval=60, max_bytes=0, compress=False)
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    handler.emit(record('antes da rotação'))
+
+    monkeypatch.setattr(handler, 'rollover_at', 0)
+    handler.emit(record('depois da rotação'))
+    handler.close()
+
+    [rotated] = handler.rotated_files()
+    assert open(rotated).read() == 'antes da rotação\n'
+    assert (tmp_path / 'app.log').read_text() == 'depois da rotação\n'
+    assert handler.rollover_at % 60 == 0
+
+
+def test_sampler_applies_the_closest_logger_rule_and_the_route_rule():
+    sampler = LogSampler({'Application.security': 0.0, 'route:GET /orders*': 0.0}, rate=0)
+
+    assert not sampler.filter(logging.makeLogRecord({'name': 'Application.security.jwt', 'levelno': logging.INFO}))
+    assert sampler.filter(logging.makeLogRecord({'name': 'Application.security', 'levelno': logging.WARNING}))
+    assert sampler.filter(logging.makeLogRecord({'name': 'Application', 'levelno': logging.INFO}))
+
+    token = request_route.set('GET /orders/1')
+    try:
+        assert not sampler.filter(logging.makeLogRecord({'name': 'Application', 'levelno': logging.INFO}))
+    finally:
+        request_route.reset(token)
+    assert sampler.sampled_out == 2
+
+
+def test_sampler_suppresses_repeated_records_and_summarizes_them(monkeypatch):
+    summaries = []
+    sampler = LogSampler({}, rate=0.001, burst=3, summary_interval=60)
+    monkeypatch.setattr(sampler, '_summarize', summaries.extend)
+
+    decisions = [sampler.filter(record('registro repetido %s', index)) for index in range(10)]
+    monkeypatch.setattr(sampler, '_next_summary', 0)
+    sampler.filter(record('registro repetido'))
+
+    assert decisions == [True] * 3 + [False] * 7
+    assert sampler.suppressed == 8
+    assert summaries == [(('repository.py', 10), 8)]
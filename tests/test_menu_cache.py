@@ -0,0 +1,146 @@
+import asyncio
+import gzip
+import json
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from app.main import app
+from app.services import cache, pagination
+from app.services.cache import RedisInvalidation, TTLCache
+from app.services.snapshot import accepts_gzip
+
+client = TestClient(app)
+
+
+pytestmark = pytest.mark.usefixtures('authenticated')
+
+
+def test_ttl_cache_expires_and_evicts(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    menu = TTLCache(maxsize=2, ttl=10)
+    menu.set('a', 1)
+    menu.set('b', 2)
+    assert menu.get('a') == 1
+    menu.set('c', 3)
+    # 'b' foi a entrada usada há mais tempo
+    assert menu.get('b') is None
+    assert len(menu) == 2
+
+    now[0] += 10
+    assert menu.get('a') is None
+    assert len(menu) == 1
+
+
+def test_ttl_cache_invalidates_by_tag():
+    menu = TTLCache(maxsize=10, ttl=60)
+    menu.set('page-1', 1, ['product:1', 'category:1'])
+    menu.set('page-2', 2, ['product:2', 'category:1'])
+    menu.set('page-3', 3, ['product:3', 'category:2'])
+    assert menu.invalidate('product:2') == ['page-2']
+    assert menu.invalidate('category:1') == ['page-1']
+    assert menu.get('page-3') == 3
+
+
+def test_ttl_cache_skips_values_read_before_an_invalidation():
+    menu = TTLCache(maxsize=10, ttl=60)
+    generation = menu.generation
+    menu.invalidate('category:1')
+    menu.set('page', 'stale', ['category:1'], generation=generation)
+    assert menu.get('page') is None
+
+
+def test_remote_invalidation_ignores_own_messages():
+    menu = TTLCache(maxsize=10, ttl=60)
+    invalidation = RedisInvalidation(menu, 'redis://localhost')
+    menu.set('page', 1, ['category:1'])
+    invalidation.apply(json.dumps({'origin': invalidation.origin, 'tags': ['category:1']}))
+    assert menu.get('page') == 1
+    invalidation.apply(json.dumps({'origin': 'other', 'tags': ['category:1']}))
+    assert menu.get('page') is None
+
+
+def test_remote_invalidation_is_not_subscribed_on_lambda(monkeypatch):
+    invalidation = RedisInvalidation(TTLCache(maxsize=10, ttl=60), 'redis://localhost')
+    monkeypatch.setattr(cache, 'menu_invalidation', invalidation)
+    monkeypatch.setattr(cache, 'IS_LAMBDA', True)
+    asyncio.run(cache.start_menu_invalidation())
+    assert invalidation.redis is None
+    assert invalidation._listener is None
+
+
+def test_menu_reads_are_cached_until_a_write(sql_statements):
+    category = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'}).json()
+    other = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'}).json()
+    client.post('/products/', json={'name': 'Suco', 'description': 'x', 'price': 5.0, 'category_id': other['id']})
+    path = f"/category/{category['id']}"
+    assert client.get(path).json()['products'] == []
+    assert client.get(f"/category/{other['id']}").status_code == 200
+
+    sql_statements.clear()
+    assert client.get(path).status_code == 200
+    assert sql_statements == []
+
+    # Um produto novo invalida só a categoria em que entrou (e a versão do cardápio, usada no ETag)
+    client.post('/products/', json={'name': 'Chá', 'description': 'x', 'price': 4.0, 'category_id': category['id']})
+    sql_statements.clear()
+    assert client.get(f"/category/{other['id']}").status_code == 200
+    assert len(sql_statements) == 1 and 'app_metadata' in sql_statements[0]
+    assert [product['name'] for product in client.get(path).json()['products']] == ['Chá']
+
+    client.put(path, json={'name': f"{category['name']} (novo)"})
+    assert client.get(path).json()['name'] == f"{category['name']} (novo)"
+
+
+def test_menu_pages_are_served_from_snapshots():
+    client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'})
+    plain = client.get('/category/', params={'limit': 2}, headers={'Accept-Encoding': 'identity'})
+    compressed = client.get('/category/', params={'limit': 2}, headers={'Accept-Encoding': 'gzip'})
+    assert plain.headers.get('content-encoding') is None
+    assert compressed.headers['content-encoding'] == 'gzip'
+    assert compressed.headers['vary'] == 'Accept-Encoding'
+    assert compressed.json() == plain.json()
+    assert compressed.headers['etag'] != plain.headers['etag']
+    assert plain.json()['next_cursor'] == plain.headers[pagination.NEXT_CURSOR_HEADER]
+
+    snapshot = cache.menu_cache.get(('categories', 0, 2, None))
+    assert gzip.decompress(snapshot.gzip_body) == snapshot.body == plain.content
+
+
+@pytest.mark.parametrize(
+    ('accept_encoding', 'expected'),
+    [
+        ('gzip', True),
+        ('deflate, GZIP;q=0.5', True),
+        ('x-gzip', True),
+        ('*', True),
+        ('br, *;q=0.1', True),
+        ('', False),
+        ('gzip;q=0', False),
+        ('gzip; q=0.000', False),
+        ('gzip;q=invalid', False),
+        ('x-gzip-foo', False),
+        ('gzip;q=0, *', False),
+        ('*;q=0', False),
+    ],
+)
+def test_accepts_gzip_reads_quality_values(accept_encoding, expected):
+    request = Request({'type': 'http', 'headers': [(b'accept-encoding', accept_encoding.encode())]})
+    assert accepts_gzip(request) is expected
+
+
+def test_invalidated_pages_are_rebuilt_in_background(sql_statements):
+    category = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'}).json()
+    key = ('products', 0, 100, None)
+    client.get('/products/', params={'limit': 100})
+    removed = cache.menu_cache.invalidate(f"category:{category['id']}", 'products:tail')
+    assert key in removed
+
+    asyncio.run(cache.rebuild_menu(removed))
+    sql_statements.clear()
+    assert client.get('/products/', params={'limit': 100}).status_code == 200
+    assert sql_statements == []
+    assert cache.menu_cache.get(key) is not None
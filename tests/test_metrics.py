@@ -0,0 +1,58 @@
+import socket
+
+import httpx
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+
+from app.db import database
+from app.main import app
+from app.services import metrics
+
+client = TestClient(app)
+
+
+def sample(name, **labels):
+    return REGISTRY.get_sample_value(name, labels) or 0
+
+
+def test_requests_are_measured_by_route_template_and_status():
+    labels = {'method': 'GET', 'route': '/category/{category_id}'}
+    before = sample('http_request_duration_seconds_count', status='404', **labels)
+    statements = sample('http_request_sql_statements_count', **labels)
+
+    assert client.get('/category/987654').status_code == 404
+    assert client.get('/nao-existe').status_code == 404
+
+    assert sample('http_request_duration_seconds_count', status='404', **labels) == before + 1
+    assert sample('http_request_sql_statements_count', **labels) == statements + 1
+    assert sample('http_request_duration_seconds_count', method='GET', route='unmatched', status='404') >= 1
+
+
+def test_metrics_are_not_served_by_the_public_app():
+    assert client.get('/metrics').status_code == 404
+    assert client.get('/status/pool').status_code == 404
+
+
+def test_metrics_server_exposes_the_prometheus_text_format(monkeypatch):
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        port = sock.getsockname()[1]
+    monkeypatch.setattr(metrics, 'METRICS_PORT', port)
+    monkeypatch.setattr(metrics, 'METRICS_ADDR', '127.0.0.1')
+    client.get('/')
+
+    metrics.start_metrics_server()
+    try:
+        response = httpx.get(f'http://127.0.0.1:{port}/metrics')
+        pools = httpx.get(f'http://127.0.0.1:{port}/status/pool').json()
+    finally:
+        metrics.stop_metrics_server()
+
+    assert pools['profile'] == database.POOL_PROFILE
+    assert {'checked_out', 'overflow'} <= set(pools['pools']['primary'])
+
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in response.text
+    assert '# TYPE db_pool_checkout_wait_seconds histogram' in response.text
+    assert 'cache_requests_total{cache="menu",result="hit"}' in response.text
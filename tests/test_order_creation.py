@@ -0,0 +1,57 @@
+import pytest
+from sqlalchemy import create_engine, event, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.db.database import Base, SessionLocal
+from app.model import models, schemas
+from app.services import repository
+
+
+def make_order(products):
+    return schemas.OrderCreate(
+        status='Recebido',
+        payment_status='pendente',
+        user_agent='kiosk',
+        ip_address='10.0.0.1',
+        os='linux',
+        browser='chromium',
+        device='totem',
+        customer_id=1,
+        products=[schemas.OrderProductCreate(product_id=product_id) for product_id in products],
+    )
+
+
+def test_create_order_uses_one_insert_per_table(sql_statements):
+    db = SessionLocal()
+    try:
+        db_order = repository.create_order(db, make_order(range(1, 11)))
+        inserts = [statement for statement in sql_statements if statement.lstrip().upper().startswith('INSERT')]
+        assert len(inserts) == 3
+        assert 'RETURNING' in inserts[0].upper()
+
+        products = db.scalars(select(models.OrderProduct).filter_by(order_id=db_order.id)).all()
+        tracking = db.scalars(select(models.Tracking).filter_by(order_id=db_order.id)).all()
+        assert [product.product_id for product in products] == list(range(1, 11))
+        assert [entry.status for entry in tracking] == ['Recebido']
+    finally:
+        db.close()
+
+
+def test_create_order_rolls_back_on_failure(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path}/orders.db')
+    event.listen(engine, 'connect', lambda connection, _: connection.execute('PRAGMA foreign_keys=ON'))
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    try:
+        db.add(models.Customer(id=1, name='Cliente'))
+        db.commit()
+
+        # O produto inexistente viola a chave estrangeira no INSERT de order_products
+        with pytest.raises(IntegrityError):
+            repository.create_order(db, make_order([999]))
+
+        assert db.scalar(select(func.count()).select_from(models.Order)) == 0
+        assert db.scalar(select(func.count()).select_from(models.Tracking)) == 0
+    finally:
+        db.close()
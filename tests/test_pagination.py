@@ -0,0 +1,125 @@
+from datetime import datetime
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.database import SessionLocal
+from app.main import app
+from app.model import models
+from app.services import pagination
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures('authenticated')
+
+
+def test_cursor_round_trip():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123456)
+    cursor = pagination.encode_cursor([created_at.isoformat(), 42])
+    assert pagination.decode_cursor(cursor, datetime.fromisoformat, int) == (created_at, 42)
+
+
+@pytest.mark.parametrize('cursor', ['not base64!', pagination.encode_cursor([1, 2]), pagination.encode_cursor(['x'])])
+def test_decode_cursor_rejects_invalid(cursor):
+    with pytest.raises(ValueError):
+        pagination.decode_cursor(cursor, int)
+
+
+def test_paginate_reads_one_extra_item():
+    assert pagination.paginate([1, 2], 2, lambda item: [item]) == ([1, 2], None)
+    page, cursor = pagination.paginate([1, 2, 3], 2, lambda item: [item])
+    assert page == [1, 2]
+    assert pagination.decode_cursor(cursor, int) == (2,)
+    assert pagination.paginate([], 2, lambda item: [item]) == ([], None)
+    assert pagination.paginate([1], 0, lambda item: [item]) == ([], None)
+
+
+def walk(path, key):
+    items, cursor, pages = [], None, 0
+    while True:
+        response = client.get(path, params={'limit': 2, **({'cursor': cursor} if cursor else {})})
+        assert response.status_code == 200
+        body = response.json()
+        items.extend(body[key] if key else body)
+        cursor = response.headers.get(pagination.NEXT_CURSOR_HEADER)
+        if key:
+            assert body['next_cursor'] == cursor
+        pages += 1
+        if cursor is None:
+            return items, pages
+
+
+def test_orders_cursor_walk_is_stable_while_orders_arrive(order_payload):
+    for _ in range(5):
+        assert client.post('/orders/', json=order_payload).status_code == 200
+
+    first = client.get('/orders/', params={'limit': 2}).json()
+    # Pedidos novos entram no fim da ordenação e não deslocam as páginas já entregues
+    assert client.post('/orders/', json=order_payload).status_code == 200
+    second = client.get('/orders/', params={'limit': 2, 'cursor': first['next_cursor']}).json()
+    assert not {order['id'] for order in first['orders']} & {order['id'] for order in second['orders']}
+
+    orders, _ = walk('/orders/', 'orders')
+    ids = [order['id'] for order in orders]
+    assert len(ids) == len(set(ids))
+
+
+def test_customers_and_categories_cursor_walk():
+    for _ in range(3):
+        client.post('/customers/anonymous')
+    customers, pages = walk('/customers/', None)
+    ids = [customer['id'] for customer in customers]
+    assert ids == sorted(set(ids))
+    assert pages >= 2
+
+    categories, _ = walk('/category/', 'categories')
+    ids = [category['id'] for category in categories]
+    assert ids == sorted(set(ids))
+
+
+def test_invalid_cursor_returns_400():
+    for path in ('/orders/', '/products/', '/customers/', '/category/'):
+        response = client.get(path, params={'cursor': 'bm90LWpzb24'})
+        assert response.status_code == 400
+
+
+@pytest.mark.parametrize('path', ['/orders/', '/orders/active', '/products/', '/customers/', '/category/'])
+@pytest.mark.parametrize('limit', [0, -1, 101])
+def test_page_size_is_bounded(path, limit):
+    assert client.get(path, params={'limit': limit}).status_code == 422
+
+
+def test_orders_without_created_at_are_not_listed(order_payload):
+    order = client.post('/orders/', json=order_payload).json()
+    with SessionLocal() as db:
+        db.query(models.Order).filter(models.Order.id == order['id']).update({'created_at': None})
+        db.commit()
+
+    for path in ('/orders/', '/orders/active'):
+        orders, _ = walk(path, 'orders')
+        assert order['id'] not in {listed['id'] for listed in orders}
+
+
+def test_skip_is_still_supported():
+    response = client.get('/customers/', params={'skip': 1, 'limit': 1})
+    assert response.status_code == 200
+    assert len(response.json()) <= 1
+
+
+def test_active_orders_are_sorted_by_status_priority(order_payload):
+    for status in ('Recebido', 'Finalizado', 'Pronto', 'Em preparação', 'Recebido', 'Pronto'):
+        order = client.post('/orders/', json=order_payload).json()
+        assert client.put(f"/orders/{order['id']}/status", json={'status': status}).status_code == 200
+
+    orders, pages = walk('/orders/active', 'orders')
+    statuses = [order['status'] for order in orders]
+    assert 'Finalizado' not in statuses
+    priorities = [('Pronto', 'Em preparação', 'Recebido').index(status) for status in statuses]
+    assert priorities == sorted(priorities)
+    for priority in set(priorities):
+        created = [order['created_at'] for order, p in zip(orders, priorities) if p == priority]
+        assert created == sorted(created)
+    assert pages >= 2
+
+    listed, _ = walk('/orders/', 'orders')
+    assert 'Finalizado' not in {order['status'] for order in listed}
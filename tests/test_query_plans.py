@@ -0,0 +1,22 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app.tools.bootstrap import migrate
+from benchmarks.query_plans import HOT_QUERIES, seed_orders, used_indexes
+
+
+@pytest.fixture(scope='module')
+def seeded_engine(tmp_path_factory):
+    engine = create_engine(f"sqlite:///{tmp_path_factory.mktemp('plans')}/plans.db")
+    migrate(engine)
+    with engine.begin() as connection:
+        seed_orders(connection, orders=5000, products=1000)
+    yield engine
+    engine.dispose()
+
+
+@pytest.mark.parametrize('name', sorted(HOT_QUERIES))
+def test_hot_query_uses_index(seeded_engine, name):
+    statement, expected = HOT_QUERIES[name]
+    with seeded_engine.connect() as connection:
+        assert expected in used_indexes(connection, statement)
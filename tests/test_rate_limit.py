@@ -0,0 +1,136 @@
+import asyncio
+
+import pytest
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.middleware.limiter import CircuitBreaker, RateLimiter, RateLimitResult, TwoTierRateLimiter
+from app.middleware.middleware import RATE_LIMIT_MESSAGE, RateLimitMiddleware
+
+app = FastAPI()
+# Nenhuma conexão é aberta: o limitador é substituído em cada teste
+app.add_middleware(RateLimitMiddleware, redis_url='redis://localhost:6390', rate_limit=2, rate_limit_period=60)
+
+
+@app.get('/ping')
+def ping():
+    return {'pong': True}
+
+
+@app.get('/stream')
+def stream():
+    return StreamingResponse(iter([b'a', b'b', b'c']), media_type='text/plain')
+
+
+client = TestClient(app)
+
+
+def fake_hit(*results):
+    calls = iter(results)
+
+    async def hit(self, identity):
+        result = next(calls)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return hit
+
+
+def test_allowed_requests_report_remaining(monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'hit', fake_hit(RateLimitResult(True, 1, 0)))
+
+    response = client.get('/ping')
+
+    assert response.status_code == 200
+    assert response.headers['x-ratelimit-limit'] == '2'
+    assert response.headers['x-ratelimit-remaining'] == '1'
+
+
+def test_streaming_responses_pass_through_with_headers(monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'hit', fake_hit(RateLimitResult(True, 0, 0)))
+
+    response = client.get('/stream')
+
+    assert response.text == 'abc'
+    assert response.headers['x-ratelimit-remaining'] == '0'
+
+
+def test_rejected_request_returns_429_with_retry_after(monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'hit', fake_hit(RateLimitResult(False, 0, 12.3)))
+
+    response = client.get('/ping')
+
+    assert response.status_code == 429
+    assert response.json() == {'status code': 429, 'msg': RATE_LIMIT_MESSAGE}
+    assert response.headers['retry-after'] == '13'
+    assert response.headers['x-ratelimit-remaining'] == '0'
+
+
+def test_redis_failure_lets_the_request_through(monkeypatch):
+    monkeypatch.setattr(RateLimiter, 'hit', fake_hit(ConnectionError('redis fora do ar')))
+
+    response = client.get('/ping')
+
+    assert response.status_code == 200
+    assert 'x-ratelimit-limit' not in response.headers
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        RateLimiter(None, 10, 60, 'leaky_bucket')
+
+
+class FakeRedis:
+    """Simula o script de sincronização: um saldo global fixo e os lotes recebidos, ou uma falha."""
+
+    def __init__(self, tokens=None):
+        self.tokens = tokens
+        self.batches = []
+
+    def register_script(self, script):
+        async def run(keys, args):
+            if self.tokens is None:
+                raise ConnectionError('redis fora do ar')
+            self.batches.append(args[2])
+            return str(self.tokens)
+
+        return run
+
+
+async def hits(limiter, count):
+    results = []
+    for _ in range(count):
+        results.append(await limiter.hit('10.0.0.1'))
+        # Deixa as sincronizações em segundo plano terminarem
+        await asyncio.sleep(0)
+    return [result.allowed for result in results]
+
+
+def test_two_tier_adopts_the_global_balance_in_batches():
+    redis = FakeRedis(tokens=3)
+    limiter = TwoTierRateLimiter(redis, limit=100, period=60, error_margin=0.05, sync_interval=60)
+
+    allowed = asyncio.run(hits(limiter, 6))
+
+    # A primeira requisição sincroniza e traz o saldo global: restam 3, decididas localmente
+    assert allowed == [True, True, True, True, False, False]
+    assert redis.batches == [1]
+
+
+def test_two_tier_divides_the_margin_between_replicas():
+    assert TwoTierRateLimiter(FakeRedis(), limit=100, period=60, error_margin=0.1, replicas=1).batch_size == 10
+    assert TwoTierRateLimiter(FakeRedis(), limit=100, period=60, error_margin=0.1, replicas=4).batch_size == 2
+    assert TwoTierRateLimiter(FakeRedis(), limit=100, period=60, error_margin=0.1, replicas=50).batch_size == 1
+
+
+def test_two_tier_limits_locally_while_redis_is_down():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=60)
+    limiter = TwoTierRateLimiter(FakeRedis(), limit=5, period=60, error_margin=0.2, breaker=breaker)
+
+    allowed = asyncio.run(hits(limiter, 8))
+
+    assert allowed == [True] * 5 + [False] * 3
+    assert breaker.is_open
+    assert not breaker.allow()
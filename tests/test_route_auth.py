@@ -1,8 +1,11 @@
 from types import SimpleNamespace
+from uuid import uuid4
 from fastapi import status
 from fastapi.testclient import TestClient
 
 from app.main import app
+from app.services import passwords
+from app.services.passwords import password_pool
 
 client = TestClient(app)
 
@@ -12,14 +15,20 @@ def test_auth_success(mocker):
     mocker.patch('app.services.repository.get_user_by_email', return_value=mock_user)
     mocker.patch('app.services.security.verify_password', return_value=True)
     mocker.patch('app.services.security.create_access_token', return_value='bearer mock_access_token')
+    # O hash do token de atualização é único na tabela, e o test.db persiste entre execuções
+    refresh_token = uuid4().hex
+    mocker.patch('app.services.security.create_refresh_token', return_value=refresh_token)
 
     form_data = {'username': 'user@example.com', 'password': 'valid_password'}
 
     response = client.post('/token', data=form_data)
 
     assert response.status_code == status.HTTP_200_OK
-    print('Response JSON:', response.json())
-    assert response.json() == {'access_token': 'bearer mock_access_token', 'customer_id': mock_user.id}
+    assert response.json() == {
+        'access_token': 'bearer mock_access_token',
+        'customer_id': mock_user.id,
+        'refresh_token': refresh_token,
+    }
 
 
 def test_auth_invalid_credentials(mocker):
@@ -32,3 +41,79 @@ def test_auth_invalid_credentials(mocker):
 
     assert response.status_code == status.HTTP_400_BAD_REQUEST
     assert response.json() == {'msg': 'Nome de usuário ou senha incorretos', 'status code': 400}
+
+
+def login(mocker):
+    mock_user = SimpleNamespace(id=1, email='user@example.com', hashed_password='$2b$12$125as3fd45gdas5')
+    mocker.patch('app.services.repository.get_user_by_email', return_value=mock_user)
+    mocker.patch('app.services.security.verify_password', return_value=True)
+    mocker.patch('app.services.security.SECRET_KEY', 'chave-de-teste')
+    response = client.post('/token', data={'username': 'user@example.com', 'password': 'valid_password'})
+    return response.json()['refresh_token']
+
+
+def test_refresh_rotates_without_checking_the_password(mocker):
+    refresh_token = login(mocker)
+    verify_password = mocker.patch('app.services.security.verify_password')
+
+    response = client.post('/token/refresh', json={'refresh_token': refresh_token})
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['customer_id'] == 1
+    assert response.json()['refresh_token'] != refresh_token
+    verify_password.assert_not_called()
+    assert client.post('/token/refresh', json={'refresh_token': response.json()['refresh_token']}).status_code == 200
+
+
+def test_refresh_token_reuse_revokes_the_session(mocker):
+    stolen = login(mocker)
+    latest = client.post('/token/refresh', json={'refresh_token': stolen}).json()['refresh_token']
+
+    replay = client.post('/token/refresh', json={'refresh_token': stolen})
+
+    assert replay.status_code == status.HTTP_401_UNAUTHORIZED
+    # O token legítimo mais recente também deixa de valer
+    assert client.post('/token/refresh', json={'refresh_token': latest}).status_code == 401
+
+
+def test_refresh_with_unknown_token(mocker):
+    response = client.post('/token/refresh', json={'refresh_token': 'desconhecido'})
+
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == {'msg': 'Token de atualização inválido ou expirado', 'status code': 401}
+
+
+def test_login_is_rejected_with_503_when_the_password_pool_is_saturated(mocker):
+    mock_user = SimpleNamespace(id=1, email='user@example.com', hashed_password='$2b$12$125as3fd45gdas5')
+    mocker.patch('app.services.repository.get_user_by_email', return_value=mock_user)
+    verify_password = mocker.patch('app.services.security.verify_password', return_value=True)
+    mocker.patch.object(password_pool, 'in_flight', password_pool.size + password_pool.queue_size)
+
+    response = client.post('/token', data={'username': 'user@example.com', 'password': 'valid_password'})
+
+    assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+    assert response.headers['retry-after'] == '1'
+    verify_password.assert_not_called()
+
+
+def test_bcrypt_cost_is_tuned_within_bounds():
+    assert passwords.tune_bcrypt_rounds(target_ms=0.001) == passwords.BCRYPT_MIN_ROUNDS
+    assert passwords.tune_bcrypt_rounds(target_ms=10**9) == passwords.BCRYPT_MAX_ROUNDS
+
+
+def test_bcrypt_cost_is_tuned_once_per_process_and_never_on_lambda(monkeypatch, mocker):
+    monkeypatch.setattr(passwords, '_configured_rounds', None)
+    monkeypatch.setattr(passwords, 'BCRYPT_ROUNDS', None)
+    tune = mocker.patch('app.services.passwords.tune_bcrypt_rounds', return_value=4)
+    update = mocker.patch.object(passwords.security.pwd_context, 'update')
+
+    passwords.configure_password_hashing()
+    passwords.configure_password_hashing()
+    assert tune.call_count == 1
+    update.assert_called_once_with(bcrypt__default_rounds=4)
+
+    monkeypatch.setattr(passwords, '_configured_rounds', None)
+    monkeypatch.setattr(passwords, 'IS_LAMBDA', True)
+    passwords.configure_password_hashing()
+    assert tune.call_count == 1
+    assert update.call_count == 1
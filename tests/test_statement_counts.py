@@ -0,0 +1,120 @@
+import uuid
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.database import SessionLocal
+from app.main import app
+from app.model import models
+from app.services.cache import menu_cache
+
+client = TestClient(app)
+
+pytestmark = pytest.mark.usefixtures('authenticated')
+
+
+@pytest.fixture
+def category():
+    response = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def product_id(category):
+    name = f'Produto {uuid.uuid4().hex}'
+    response = client.post(
+        '/products/', json={'name': name, 'description': 'x', 'price': 10.0, 'category_id': category['id']}
+    )
+    assert response.status_code == 200
+    db = SessionLocal()
+    try:
+        return db.query(models.Product.id).filter(models.Product.name == name).scalar()
+    finally:
+        db.close()
+
+
+@pytest.fixture
+def order_id(product_id, order_payload):
+    response = client.post('/orders/', json={**order_payload, 'products': [{'product_id': product_id}]})
+    assert response.status_code == 200
+    return response.json()['id']
+
+
+def verbs(statements):
+    return [statement.split(None, 1)[0].upper() for statement in statements]
+
+
+def test_create_category_statements(sql_statements):
+    response = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'})
+    assert response.status_code == 200
+    # O INSERT ... ON CONFLICT incrementa a versão do cardápio, na mesma transação
+    assert verbs(sql_statements) == ['SELECT', 'INSERT', 'INSERT']
+
+
+def test_update_product_statements(sql_statements, category, product_id):
+    sql_statements.clear()
+    response = client.put(
+        f'/products/{product_id}',
+        json={'name': 'Novo nome', 'description': 'y', 'price': 12.5, 'category_id': category['id']},
+    )
+    assert response.status_code == 200
+    assert response.json()['price'] == 12.5
+    assert verbs(sql_statements) == ['SELECT', 'SELECT', 'INSERT', 'UPDATE']
+
+
+def test_update_category_statements(sql_statements, category, product_id):
+    sql_statements.clear()
+    response = client.put(f"/category/{category['id']}", json={'name': f'Categoria {uuid.uuid4().hex}'})
+    assert response.status_code == 200
+    assert len(response.json()['products']) == 1
+    assert verbs(sql_statements) == ['SELECT', 'INSERT', 'UPDATE', 'SELECT']
+
+
+def test_menu_statements_do_not_grow_with_menu_size(sql_statements, category, product_id):
+    for path in ('/category/?limit=100', f"/category/{category['id']}", '/products/?limit=100'):
+        menu_cache.clear()
+        sql_statements.clear()
+        assert client.get(path).status_code == 200
+        before = len(sql_statements)
+
+        for _ in range(3):
+            new_category = client.post('/category/', json={'name': f'Categoria {uuid.uuid4().hex}'}).json()
+            for category_id in (category['id'], new_category['id']):
+                client.post(
+                    '/products/', json={'name': 'Extra', 'description': 'x', 'price': 1.0, 'category_id': category_id}
+                )
+
+        sql_statements.clear()
+        response = client.get(path)
+        assert response.status_code == 200
+        # A versão do cardápio (usada no ETag) e o cardápio
+        assert len(sql_statements) == before == 2
+
+
+def test_create_order_statements(sql_statements, product_id, order_payload):
+    sql_statements.clear()
+    response = client.post('/orders/', json={**order_payload, 'products': [{'product_id': product_id}] * 3})
+    assert response.status_code == 200
+    assert verbs(sql_statements) == ['INSERT', 'INSERT', 'INSERT']
+
+
+def test_update_order_statements(sql_statements, order_id):
+    sql_statements.clear()
+    response = client.put(f'/orders/{order_id}/status', json={'status': 'Em preparação'})
+    assert response.status_code == 200
+    assert response.json()['status'] == 'Em preparação'
+    assert verbs(sql_statements) == ['SELECT', 'UPDATE', 'INSERT']
+
+    # O webhook reaproveita o pedido já carregado na sessão
+    sql_statements.clear()
+    response = client.patch(f'/orders/{order_id}/payment', json={'payment_status': 'pago'})
+    assert response.status_code == 200
+    assert verbs(sql_statements) == ['SELECT', 'UPDATE', 'INSERT', 'INSERT']
+
+
+def test_create_anonymous_customer_statements(sql_statements):
+    response = client.post('/customers/anonymous')
+    assert response.status_code == 200
+    assert response.json()['id'] > 0
+    assert verbs(sql_statements) == ['INSERT']
@@ -0,0 +1,146 @@
+import asyncio
+import hashlib
+import time
+import uuid
+from datetime import timedelta
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.db.database import SessionLocal
+from app.main import app
+from app.model import models
+from app.services import security
+from app.services.cache import claims_cache, customer_cache
+from app.services.token_ledger import TokenLedger, token_ledger
+from app.tools.circuit_breaker import CircuitBreaker
+
+client = TestClient(app)
+
+
+class FakeRedis:
+    """Simula o `SET NX` do Redis, ou uma falha de conexão."""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.keys = {}
+
+    async def set(self, name, value, ex=None, nx=False):
+        if self.down:
+            raise ConnectionError('redis fora do ar')
+        if nx and name in self.keys:
+            return None
+        self.keys[name] = ex
+        return True
+
+
+@pytest.fixture(autouse=True)
+def secret_key(monkeypatch):
+    monkeypatch.setattr(security, 'SECRET_KEY', 'chave-de-teste')
+    customer_cache.clear()
+    claims_cache.clear()
+
+
+@pytest.fixture
+def customer_id():
+    suffix = uuid.uuid4().hex
+    db = SessionLocal()
+    try:
+        customer = models.Customer(name='Cliente', email=f'{suffix}@example.com', cpf=suffix[:11])
+        db.add(customer)
+        db.commit()
+        return customer.id
+    finally:
+        db.close()
+
+
+def bearer(customer_id):
+    token = security.create_access_token({'sub': str(customer_id)}, timedelta(minutes=5))
+    return {'Authorization': f'Bearer {token}'}, token
+
+
+def test_database_fallback_costs_one_statement_once_the_customer_is_cached(sql_statements, customer_id):
+    sql_statements.clear()
+    headers, _ = bearer(customer_id)
+    assert client.get('/users/me', headers=headers).json()['id'] == customer_id
+    # Ledger (tokens) e cliente
+    assert len(sql_statements) == 2
+
+    sql_statements.clear()
+    headers, _ = bearer(customer_id)
+    assert client.get('/users/me', headers=headers).status_code == 200
+    assert len(sql_statements) == 1
+
+
+def test_redis_ledger_rejects_a_reused_token_without_sql(monkeypatch, sql_statements, customer_id):
+    redis = FakeRedis()
+    monkeypatch.setattr(token_ledger, 'redis_url', 'redis://ledger')
+    monkeypatch.setattr(token_ledger, 'redis', redis)
+    headers, token = bearer(customer_id)
+
+    assert client.get('/users/me', headers=headers).status_code == 200
+    sql_statements.clear()
+    response = client.get('/users/me', headers=headers)
+
+    assert response.status_code == 401
+    assert sql_statements == []
+    assert 0 < redis.keys[TokenLedger.key(token)] <= 300
+    assert token not in TokenLedger.key(token)
+
+
+def test_redis_failure_fails_closed(monkeypatch, sql_statements, customer_id):
+    monkeypatch.setattr(token_ledger, 'redis_url', 'redis://ledger')
+    monkeypatch.setattr(token_ledger, 'redis', FakeRedis(down=True))
+    monkeypatch.setattr(token_ledger, 'breaker', CircuitBreaker(failure_threshold=2, reset_timeout=60))
+    headers, _ = bearer(customer_id)
+    sql_statements.clear()
+
+    # O disjuntor ainda fechado: a falha do Redis já recusa a requisição, sem consultar o banco
+    response = client.get('/users/me', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '60'
+    assert not token_ledger.breaker.is_open
+    assert not any('tokens' in statement for statement in sql_statements)
+
+
+def test_open_breaker_fails_closed_until_redis_recovers(monkeypatch, customer_id):
+    redis = FakeRedis(down=True)
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=60)
+    monkeypatch.setattr(token_ledger, 'redis_url', 'redis://ledger')
+    monkeypatch.setattr(token_ledger, 'redis', redis)
+    monkeypatch.setattr(token_ledger, 'breaker', breaker)
+    headers, token = bearer(customer_id)
+
+    assert client.get('/users/me', headers=headers).status_code == 503
+    assert breaker.is_open
+    redis.down = False
+    assert client.get('/users/me', headers=headers).status_code == 503
+
+    monkeypatch.setattr(breaker, 'opened_at', time.monotonic() - 61)
+    assert client.get('/users/me', headers=headers).status_code == 200
+    assert TokenLedger.key(token) in redis.keys
+    assert client.get('/users/me', headers=headers).status_code == 401
+
+
+def test_verified_claims_are_cached_until_the_token_expires(mocker):
+    token = security.create_access_token({'sub': '1'}, timedelta(seconds=30))
+    decode = mocker.spy(security.jwt, 'decode')
+    hits = claims_cache.hits
+
+    assert security.decode_token(token)['sub'] == '1'
+    assert security.decode_token(token)['sub'] == '1'
+
+    assert decode.call_count == 1
+    assert claims_cache.hits == hits + 1
+    expires_at = claims_cache._entries[('jwt', hashlib.sha256(token.encode()).digest())][0]
+    assert expires_at - time.monotonic() <= 30
+
+
+def test_close_keeps_the_connection_on_lambda(monkeypatch):
+    ledger = TokenLedger('redis://ledger')
+    ledger.redis = FakeRedis()
+    monkeypatch.setattr('app.services.token_ledger.IS_LAMBDA', True)
+
+    asyncio.run(ledger.close())
+
+    assert ledger.redis is not None
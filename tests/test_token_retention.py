@@ -0,0 +1,48 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.db.database import SessionLocal
+from app.model import models
+from app.services import repository, retention
+
+
+def test_expired_tokens_are_purged_in_batches(sql_statements):
+    now = datetime.now(timezone.utc)
+    expired = [f'expirado-{uuid.uuid4().hex}' for _ in range(5)]
+    valid = f'valido-{uuid.uuid4().hex}'
+    db = SessionLocal()
+    try:
+        for token in expired:
+            db.add(models.Token(token=token, user_id=1, expires_at=now - timedelta(hours=1)))
+        db.add(models.Token(token=valid, user_id=1, expires_at=now + timedelta(minutes=5)))
+        db.commit()
+    finally:
+        db.close()
+    sql_statements.clear()
+
+    removed = asyncio.run(retention.purge_expired_tokens(batch_size=2, pause=0))
+
+    assert removed['tokens'] >= 5
+    # Um SELECT e um DELETE por lote cheio, e o SELECT do último lote, que vem incompleto
+    assert sum(statement.startswith('DELETE') for statement in sql_statements) >= 3
+    db = SessionLocal()
+    try:
+        rows = db.query(models.Token.token).filter(models.Token.token.in_([*expired, valid]))
+        remaining = {token for (token,) in rows}
+    finally:
+        db.close()
+    assert remaining == {valid}
+
+
+def test_create_token_records_the_jwt_expiration(monkeypatch):
+    monkeypatch.setattr(repository.security, 'SECRET_KEY', 'chave-de-teste')
+    token = repository.create_access_token({'sub': '1'}, timedelta(minutes=5))
+    db = SessionLocal()
+    try:
+        expires_at = repository.create_token(db, token, user_id=1).expires_at
+    finally:
+        db.close()
+
+    lifetime = expires_at.replace(tzinfo=timezone.utc) - datetime.now(timezone.utc)
+    assert timedelta(minutes=4) < lifetime <= timedelta(minutes=5)